@@ -0,0 +1,168 @@
+import sqlite3
+import time
+from collections import Counter
+
+# Each entry upgrades the schema by one version (tracked in PRAGMA user_version);
+# entries are SQL scripts or functions taking the connection
+MIGRATIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user TEXT NOT NULL DEFAULT '',
+        start_ts INTEGER NOT NULL,
+        end_ts INTEGER NOT NULL,
+        mouse_clicks INTEGER NOT NULL DEFAULT 0,
+        key_strokes INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_sessions_user_start ON sessions(user, start_ts);
+    CREATE INDEX IF NOT EXISTS idx_sessions_start ON sessions(start_ts);
+    CREATE TABLE IF NOT EXISTS activity_minutes (
+        user TEXT NOT NULL,
+        minute INTEGER NOT NULL,
+        mouse_clicks INTEGER NOT NULL DEFAULT 0,
+        key_strokes INTEGER NOT NULL DEFAULT 0,
+        active_seconds INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user, minute)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_activity_minutes_minute ON activity_minutes(minute);
+    CREATE TABLE IF NOT EXISTS key_counts (
+        session_id INTEGER NOT NULL,
+        key TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (session_id, key)
+    ) WITHOUT ROWID;
+    """,
+]
+
+
+def _migrate_legacy_logs(conn):
+    """
+    Move rows of the old logs table (time.ctime text, comma-joined keys) into the new tables
+    Old sessions have no per-minute detail: their counts are spread evenly over their minutes.
+    Rows whose times cannot be read are kept in a logs_unmigrated table.
+    """
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'logs'").fetchone():
+        return
+
+    sessions = []
+    skipped = []
+    for row in conn.execute(
+        "SELECT id, user, start_time, end_time, mouse_clicks, key_strokes, keys_pressed FROM logs"
+    ):
+        log_id, user, start_time, end_time, clicks, strokes, keys_pressed = row
+        try:
+            start = int(time.mktime(time.strptime(start_time)))
+            end = int(time.mktime(time.strptime(end_time)))
+        except (TypeError, ValueError):
+            print(f"Skipping log {log_id} with unreadable times")
+            skipped.append(log_id)
+            continue
+        keys = Counter(key for key in (keys_pressed or '').split(', ') if key)
+        sessions.append({
+            'id': log_id, 'user': user or '', 'start': start, 'end': max(start, end),
+            'mouse_clicks': clicks or 0, 'key_strokes': strokes or 0,
+            'key_counts': dict(keys), 'minutes': spread_evenly(start, max(start, end), clicks or 0, strokes or 0),
+        })
+    insert_sessions(conn, sessions)
+    if skipped:
+        conn.execute(
+            f"DELETE FROM logs WHERE id NOT IN ({', '.join('?' for _ in skipped)})", skipped
+        )
+        conn.execute("ALTER TABLE logs RENAME TO logs_unmigrated")
+    else:
+        conn.execute("DROP TABLE logs")
+
+
+MIGRATIONS.append(_migrate_legacy_logs)
+
+
+def spread_evenly(start, end, clicks, strokes):
+    """{minute: [clicks, key_strokes, active_seconds]} sharing counts over [start, end) by time"""
+    minutes = {}
+    duration = end - start
+    minute = start - start % 60
+    covered = 0
+    while minute < end or not minutes:
+        overlap = min(end, minute + 60) - max(start, minute)
+        # Rounding the running share keeps the totals exact
+        before = covered / duration if duration else 0.0
+        covered += overlap
+        after = covered / duration if duration else 1.0
+        minutes[minute] = [
+            round(clicks * after) - round(clicks * before),
+            round(strokes * after) - round(strokes * before),
+            overlap,
+        ]
+        minute += 60
+    return minutes
+
+
+def connect(path="activity_logger.db"):
+    """Open the database in WAL mode with the schema up to date"""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for index in range(version, len(MIGRATIONS)):
+        with conn:
+            migration = MIGRATIONS[index]
+            if callable(migration):
+                migration(conn)
+            else:
+                conn.executescript(migration)
+            conn.execute(f"PRAGMA user_version = {index + 1}")
+    return conn
+
+
+def insert_sessions(conn, sessions):
+    """
+    Insert a batch of sessions with their per-minute buckets and key counts (no commit)
+    Each session: user, start, end (epoch seconds), mouse_clicks, key_strokes,
+    key_counts {key: count}, minutes {minute epoch: [clicks, key_strokes, active_seconds]},
+    and optionally id. Returns the new session ids.
+    """
+    ids = []
+    key_rows = []
+    minute_rows = []
+    for session in sessions:
+        cursor = conn.execute(
+            "INSERT INTO sessions (id, user, start_ts, end_ts, mouse_clicks, key_strokes) VALUES (?, ?, ?, ?, ?, ?)",
+            (session.get('id'), session['user'] or '', int(session['start']), int(session['end']),
+             session['mouse_clicks'], session['key_strokes'])
+        )
+        ids.append(cursor.lastrowid)
+        key_rows.extend((cursor.lastrowid, key, count) for key, count in session['key_counts'].items())
+        minute_rows.extend(
+            (session['user'] or '', minute, clicks, strokes, active)
+            for minute, (clicks, strokes, active) in session['minutes'].items()
+        )
+
+    conn.executemany("INSERT INTO key_counts (session_id, key, count) VALUES (?, ?, ?)", key_rows)
+    # Sessions of the same user may share a minute
+    conn.executemany(
+        """
+        INSERT INTO activity_minutes (user, minute, mouse_clicks, key_strokes, active_seconds)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (user, minute) DO UPDATE SET
+            mouse_clicks = mouse_clicks + excluded.mouse_clicks,
+            key_strokes = key_strokes + excluded.key_strokes,
+            active_seconds = MIN(60, active_seconds + excluded.active_seconds)
+        """,
+        minute_rows
+    )
+    return ids
+
+
+def activity_by_period(conn, user, start, end, period=3600):
+    """
+    [(period start, mouse_clicks, key_strokes, active_seconds)] for one user over [start, end)
+    start/end: epoch seconds; period: bucket size in seconds (a multiple of 60)
+    A range scan of the (user, minute) primary key.
+    """
+    return conn.execute(
+        """
+        SELECT minute - minute % ? AS period, SUM(mouse_clicks), SUM(key_strokes), SUM(active_seconds)
+        FROM activity_minutes WHERE user = ? AND minute >= ? AND minute < ?
+        GROUP BY period ORDER BY period
+        """,
+        (period, user, start, end)
+    ).fetchall()
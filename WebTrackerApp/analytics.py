@@ -0,0 +1,57 @@
+import numpy as np
+
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+
+def fill_days(dates, values):
+    """
+    Daily rollup totals with empty days filled in
+    dates: sorted datetimes of the day buckets (RollupFollower.series())
+    Returns (days as datetime64[D], totals as float64)
+    """
+    if not len(dates):
+        return np.array([], dtype='datetime64[D]'), np.array([], dtype=np.float64)
+    days = np.array(dates, dtype='datetime64[D]').astype(np.int64)
+    first = days[0]
+    totals = np.bincount(days - first, weights=np.asarray(values, dtype=np.float64))
+    return np.arange(first, first + len(totals)).astype('datetime64[D]'), totals
+
+
+def hour_of_week_totals(hours, values):
+    """7 x 24 array (Monday first) of hourly rollup totals; hours: datetimes of the hour buckets"""
+    heatmap = np.zeros(7 * 24, dtype=np.float64)
+    if len(hours):
+        hour = np.array(hours, dtype='datetime64[h]').astype(np.int64)
+        # The epoch (day 0) was a Thursday
+        slot = ((hour // 24 + 3) % 7) * 24 + hour % 24
+        heatmap += np.bincount(slot, weights=np.asarray(values, dtype=np.float64), minlength=7 * 24)
+    return heatmap.reshape(7, 24)
+
+
+def rolling_mean(values, window):
+    """Trailing moving average; the first window-1 points average what is available"""
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values) or window <= 1:
+        return values
+    sums = np.cumsum(values)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts = np.minimum(np.arange(1, len(values) + 1), window)
+    return sums / counts
+
+
+def rolling_sum(values, window):
+    """Trailing moving sum over window points"""
+    values = np.asarray(values, dtype=np.float64)
+    sums = np.cumsum(values)
+    sums[window:] = sums[window:] - sums[:-window]
+    return sums
+
+
+def window_shares(window_totals):
+    """Percent of the total time per window from a {window: seconds} dict"""
+    if not window_totals:
+        return {}
+    seconds = np.fromiter(window_totals.values(), dtype=np.float64, count=len(window_totals))
+    total = seconds.sum()
+    shares = seconds / total * 100 if total > 0 else np.zeros_like(seconds)
+    return dict(zip(window_totals, shares.tolist()))
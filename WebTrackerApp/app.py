@@ -1,97 +1,214 @@
 import tkinter as tk
 from tkinter import messagebox
+import queue
 import threading
 import time
 from pynput import mouse, keyboard
-import sqlite3
+import activity_store
+from key_stats import KeyStats
+from session_store import TIME_FORMAT
+from uploader import create_uploader, session_record
 
 # Initialize global variables
 mouse_clicks = 0
 key_strokes = 0
-keys_pressed = []
-
-# SQLite database setup
+# Per-key counts, remembering the last 5 keys for display
+key_stats = KeyStats(recent_capacity=5)
+# {minute epoch: [clicks, key_strokes, active_seconds, last active second]} of the running session
+minutes = {}
+# The listeners run for the whole process; they only count while this is set
+is_logging = False
+# Held by the listener threads while counting and by stop_logger() while taking the totals
+counter_lock = threading.Lock()
+mouse_listener = None
+keyboard_listener = None
+
+# SQLite database setup (creates the schema or migrates an old logs table)
 def setup_database():
-    conn = sqlite3.connect("activity_logger.db")
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user TEXT,
-            start_time TEXT,
-            end_time TEXT,
-            total_minutes REAL,
-            mouse_clicks INTEGER,
-            key_strokes INTEGER,
-            keys_pressed TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-# Track mouse clicks
+    activity_store.connect("activity_logger.db").close()
+
+class SessionWriter:
+    """
+    Saves finished sessions on a background thread over one persistent connection
+    Sessions queued together are inserted in one transaction. Results are queued
+    as (log_id, session, error) for the Tk thread to pick up.
+    """
+
+    def __init__(self, path="activity_logger.db"):
+        self.path = path
+        self.sessions = queue.Queue()
+        self.results = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, session):
+        """Queue one session dict (see activity_store.insert_sessions)"""
+        self.sessions.put(session)
+
+    def close(self):
+        """Save everything queued, then stop the thread"""
+        self.sessions.put(None)
+        self.thread.join()
+
+    def _run(self):
+        conn = activity_store.connect(self.path)
+        stopping = False
+        while not stopping:
+            batch = [self.sessions.get()]
+            while True:
+                try:
+                    batch.append(self.sessions.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                stopping = True
+                batch = [session for session in batch if session is not None]
+            if not batch:
+                continue
+            
+            try:
+                with conn:
+                    log_ids = activity_store.insert_sessions(conn, batch)
+            except Exception as e:
+                for session in batch:
+                    self.results.put((None, session, e))
+                continue
+
+            for log_id, session in zip(log_ids, batch):
+                upload_session(log_id, session)
+                self.results.put((log_id, session, None))
+        conn.close()
+
+def upload_session(log_id, session):
+    """Send the session to the team server (when WEBTRACKER_UPLOAD_URL is set)"""
+    if uploader is None:
+        return
+    try:
+        uploader.submit(session_record({
+            'id': log_id,
+            'start_time': time.strftime(TIME_FORMAT, time.localtime(session['start'])),
+            'end_time': time.strftime(TIME_FORMAT, time.localtime(session['end'])),
+            'mouse_clicks': session['mouse_clicks'],
+            'key_strokes': session['key_strokes'],
+        }, source="app", user=session['user'] or None))
+    except Exception as e:
+        print(f"Error queueing session upload: {e}")
+
+def count_minute(now, clicks, strokes):
+    """Add input to the running session's per-minute bucket (caller holds counter_lock)"""
+    second = int(now)
+    bucket = minutes.get(second - second % 60)
+    if bucket is None:
+        bucket = minutes[second - second % 60] = [0, 0, 0, None]
+    bucket[0] += clicks
+    bucket[1] += strokes
+    # A second with any input counts as active
+    if bucket[3] != second:
+        bucket[2] += 1
+        bucket[3] = second
+
+# Listener threads only count; refresh_labels() shows the counts on the Tk thread
 def on_click(x, y, button, pressed):
     global mouse_clicks
-    if pressed:
-        mouse_clicks += 1
-        mouse_clicks_var.set(f"Mouse Clicks: {mouse_clicks}")
+    if not pressed:
+        return
+    # Checked under the lock: stop_logger() cannot take its totals between the check and the count
+    with counter_lock:
+        if is_logging:
+            mouse_clicks += 1
+            count_minute(time.time(), 1, 0)
 
-# Track keystrokes
 def on_press(key):
-    global key_strokes, keys_pressed
-    key_strokes += 1
-    keys_pressed.append(str(key))
-    key_strokes_var.set(f"Keystrokes: {key_strokes}")
-    keys_pressed_var.set(f"Keys Pressed: {', '.join(keys_pressed[-5:])}")  # Display last 5 keys
+    global key_strokes
+    with counter_lock:
+        if is_logging:
+            key_strokes += 1
+            key_stats.add(key)
+            count_minute(time.time(), 0, 1)
+
+def ensure_listeners():
+    """Start the mouse and keyboard listeners once per process; they are reused across sessions"""
+    global mouse_listener, keyboard_listener
+    if mouse_listener is None or not mouse_listener.is_alive():
+        mouse_listener = mouse.Listener(on_click=on_click)
+        mouse_listener.daemon = True
+        mouse_listener.start()
+    if keyboard_listener is None or not keyboard_listener.is_alive():
+        keyboard_listener = keyboard.Listener(on_press=on_press)
+        keyboard_listener.daemon = True
+        keyboard_listener.start()
+
+def refresh_labels():
+    """Copy the counters into the labels and report saved sessions (runs on the Tk thread)"""
+    with counter_lock:
+        clicks, strokes, last_keys = mouse_clicks, key_strokes, key_stats.recent_keys()
+    
+    for var, text in (
+        (mouse_clicks_var, f"Mouse Clicks: {clicks}"),
+        (key_strokes_var, f"Keystrokes: {strokes}"),
+        (keys_pressed_var, f"Keys Pressed: {', '.join(last_keys) if last_keys else 'None'}"),  # Display last 5 keys
+    ):
+        if var.get() != text:
+            var.set(text)
+    
+    while True:
+        try:
+            log_id, session, error = writer.results.get_nowait()
+        except queue.Empty:
+            break
+        if error is not None:
+            messagebox.showerror("Activity Logger", f"Failed to save activity: {error}")
+        else:
+            messagebox.showinfo("Activity Logger", "Activity logged successfully!")
+    
+    app.after(100, refresh_labels)
 
 # Start activity logger
 def start_logger():
-    global start_time
-    start_time = time.time()
+    global start_time, is_logging
     start_button.config(state=tk.DISABLED)
     stop_button.config(state=tk.NORMAL)
 
-    # Start mouse and keyboard listeners
-    mouse_listener = mouse.Listener(on_click=on_click)
-    keyboard_listener = keyboard.Listener(on_press=on_press)
-    mouse_listener.start()
-    keyboard_listener.start()
-
-    # Keep the listeners alive in a separate thread
-    def keep_listeners_alive():
-        mouse_listener.join()
-        keyboard_listener.join()
-
-    threading.Thread(target=keep_listeners_alive, daemon=True).start()
+    try:
+        ensure_listeners()
+    except Exception as e:
+        messagebox.showerror("Activity Logger", f"Failed to start input tracking: {e}")
+    with counter_lock:
+        start_time = time.time()
+        is_logging = True
 
 # Stop activity logger
 def stop_logger():
-    global start_time, mouse_clicks, key_strokes, keys_pressed
-    end_time = time.time()
-    total_minutes = (end_time - start_time) / 60
-    user = user_entry.get()
-
-    # Save data to database
-    conn = sqlite3.connect("activity_logger.db")
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO logs (user, start_time, end_time, total_minutes, mouse_clicks, key_strokes, keys_pressed)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (user, time.ctime(start_time), time.ctime(end_time), total_minutes, mouse_clicks, key_strokes, ', '.join(keys_pressed)))
-    conn.commit()
-    conn.close()
-
-    # Reset variables and GUI elements
-    messagebox.showinfo("Activity Logger", "Activity logged successfully!")
-    mouse_clicks = 0
-    key_strokes = 0
-    keys_pressed = []
-    mouse_clicks_var.set("Mouse Clicks: 0")
-    key_strokes_var.set("Keystrokes: 0")
-    keys_pressed_var.set("Keys Pressed: None")
+    global is_logging, mouse_clicks, key_strokes, minutes
+
+    # Stop counting, take the totals and reset them in one step, so no event is counted twice or lost
+    with counter_lock:
+        is_logging = False
+        end_time = time.time()
+        session = {
+            'user': user_entry.get(),
+            'start': start_time,
+            'end': end_time,
+            'mouse_clicks': mouse_clicks,
+            'key_strokes': key_strokes,
+            'key_counts': key_stats.to_dict(),
+            'minutes': {minute: bucket[:3] for minute, bucket in minutes.items()},
+        }
+        mouse_clicks = 0
+        key_strokes = 0
+        key_stats.clear()
+        minutes = {}
+
+    # Saved off the Tk thread; refresh_labels() reports the result
+    writer.submit(session)
     start_button.config(state=tk.NORMAL)
     stop_button.config(state=tk.DISABLED)
 
+def on_close():
+    # Sessions still queued are saved before exiting
+    writer.close()
+    app.destroy()
+
 # GUI Setup
 app = tk.Tk()
 app.title("Activity Logger")
@@ -119,6 +236,10 @@ stop_button.pack(pady=10)
 
 # Initialize database
 setup_database()
+uploader = create_uploader()
+writer = SessionWriter()
 
 # Run the GUI
+app.protocol("WM_DELETE_WINDOW", on_close)
+refresh_labels()
 app.mainloop()
@@ -0,0 +1,134 @@
+"""
+Cold-start benchmark for the WebTracker GUI
+
+Measures, each in a fresh interpreter:
+  - import time of every module on the startup path (python -X importtime)
+  - time from launching webtracker.py to its first drawn frame, in an empty
+    temporary directory with its own collector address, so the app never
+    touches the real database, journal, daemon or upload server
+
+Usage:
+  python benchmarks/cold_start.py [--runs 5] [--output results.json]
+                                  [--baseline results.json] [--max-regression 0.2]
+
+With --baseline the script exits with status 1 when the median time to first
+frame is more than max-regression slower than the baseline's.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+# Modules imported while the Current Session tab is built
+STARTUP_MODULES = [
+    'tkinter',
+    'ttkbootstrap',
+    'PIL.Image',
+    'session_store',
+    'screenshots',
+    'ipc',
+    'collector',
+    'matplotlib.pyplot',  # Analytics tab only, shown for comparison
+]
+
+IMPORT_TIME_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def import_time(module):
+    """Cumulative import time of a module in a fresh interpreter, in seconds"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=APP_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return None
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        # The top-level entry of the module itself has no indentation
+        if match and match.group(4) == module and len(match.group(3)) == 1:
+            return int(match.group(2)) / 1e6
+    return None
+
+
+def isolated_env(workdir):
+    """Environment running the app against workdir only: no daemon to attach to, no uploads"""
+    env = dict(os.environ)
+    env.pop('WEBTRACKER_UPLOAD_URL', None)
+    if sys.platform == 'win32':
+        env['WEBTRACKER_IPC_ADDRESS'] = r'\\.\pipe\webtracker-benchmark-' + str(os.getpid())
+    else:
+        env['WEBTRACKER_IPC_ADDRESS'] = os.path.join(workdir, 'collector.sock')
+    return env
+
+
+def time_to_first_frame(timeout=60):
+    """Seconds from launching webtracker.py until its window is first drawn"""
+    # The app keeps its store, journal and screenshots in the working directory
+    with tempfile.TemporaryDirectory() as workdir:
+        env = isolated_env(workdir)
+        env['WEBTRACKER_STARTUP_PROBE'] = repr(time.time())
+        result = subprocess.run(
+            [sys.executable, str(APP_DIR / 'webtracker.py')],
+            cwd=workdir, env=env, capture_output=True, text=True, timeout=timeout
+        )
+    for line in result.stdout.splitlines():
+        if line.startswith('first_frame '):
+            return float(line.split()[1])
+    raise RuntimeError(f"webtracker.py did not report a first frame:\n{result.stderr}")
+
+
+def run(runs):
+    imports = {}
+    for module in STARTUP_MODULES:
+        samples = [import_time(module) for _ in range(runs)]
+        samples = [sample for sample in samples if sample is not None]
+        imports[module] = round(statistics.median(samples), 4) if samples else None
+
+    frames = [time_to_first_frame() for _ in range(runs)]
+    return {
+        'python': sys.version.split()[0],
+        'platform': sys.platform,
+        'runs': runs,
+        'import_seconds': imports,
+        'first_frame_seconds': {
+            'median': round(statistics.median(frames), 4),
+            'min': round(min(frames), 4),
+            'max': round(max(frames), 4),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebTracker cold-start benchmark")
+    parser.add_argument('--runs', type=int, default=5, help="launches per measurement")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help="allowed slowdown of the median first frame (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = run(args.runs)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)['first_frame_seconds']['median']
+        current = results['first_frame_seconds']['median']
+        if current > baseline * (1 + args.max_regression):
+            print(f"Regression: first frame {current:.3f}s vs baseline {baseline:.3f}s")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
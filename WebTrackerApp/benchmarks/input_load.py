@@ -0,0 +1,177 @@
+"""
+Synthetic load benchmark for the collector's input and window tracking paths
+
+Replays keystrokes, clicks and window switches in real time against a
+Collector using the fake window backend (no display or input hooks needed)
+and reports hook latency percentiles, throughput, peak memory and the time
+taken to save the session.
+
+Usage:
+  python benchmarks/input_load.py [--duration 10] [--key-rate 50] [--burst 2 --pause 1]
+                                  [--click-rate 2] [--switch-rate 1000] [--windows 50]
+                                  [--output results.json]
+"""
+import argparse
+import json
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from collector import Collector
+from event_timeline import EventTimeline
+from session_journal import SessionJournal
+from session_store import SessionStore
+from window_events import FakeWindowEventSource
+
+KEYS = [chr(c) for c in range(ord('a'), ord('z') + 1)] + ['space', 'enter', 'backspace', 'shift', 'ctrl']
+
+
+def schedule(duration, key_rate, burst, pause, click_rate, switch_rate):
+    """Return (offset, kind) events sorted by offset seconds; kind is 'key', 'click' or 'switch'"""
+    events = []
+
+    # Keys arrive in bursts of `burst` seconds at key_rate, separated by `pause` seconds
+    offset = 0.0
+    while offset < duration:
+        burst_end = min(offset + burst, duration)
+        while offset < burst_end:
+            events.append((offset, 'key'))
+            offset += 1 / key_rate
+        offset = burst_end + pause
+
+    for rate, kind in ((click_rate, 'click'), (switch_rate / 60, 'switch')):
+        if rate > 0:
+            events.extend((i / rate, kind) for i in range(int(duration * rate)))
+
+    events.sort()
+    return events
+
+
+def percentiles(samples):
+    if not samples:
+        return None
+    samples = sorted(samples)
+
+    def at(fraction):
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+    return {
+        'count': len(samples),
+        'p50_us': round(at(0.50) / 1000, 2),
+        'p90_us': round(at(0.90) / 1000, 2),
+        'p99_us': round(at(0.99) / 1000, 2),
+        'max_us': round(samples[-1] / 1000, 2),
+        'mean_us': round(statistics.fmean(samples) / 1000, 2),
+    }
+
+
+def run(args):
+    random.seed(args.seed)
+    workdir = Path(tempfile.mkdtemp(prefix="webtracker_bench_"))
+    store = SessionStore(str(workdir / "bench.db"), legacy_log=None)
+    source = FakeWindowEventSource()
+    # Benchmark sessions are never uploaded, whatever WEBTRACKER_UPLOAD_URL says
+    collector = Collector(store, source, SessionJournal(str(workdir / "journal.log")),
+                          uploader=None, timeline=EventTimeline(str(workdir / "timeline")))
+    # Events are injected directly instead of through the global hooks
+    collector.install_hooks = lambda: None
+    collector.remove_hooks = lambda: None
+    collector.configure(publish_rate=args.publish_rate)
+
+    windows = [(f"app{i % 10}.exe", f"Document {i}") for i in range(args.windows)]
+    key_events = [SimpleNamespace(name=key) for key in KEYS]
+    events = schedule(args.duration, args.key_rate, args.burst, args.pause,
+                      args.click_rate, args.switch_rate)
+
+    tracemalloc.start()
+    collector.start()
+    collector.start_session("Benchmark", "Load", "synthetic input")
+
+    latencies = {'key': [], 'click': [], 'switch': []}
+    lag = []
+    perf_counter_ns = time.perf_counter_ns
+    start = time.perf_counter()
+    for offset, kind in events:
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            lag.append(-delay)
+
+        if kind == 'key':
+            event = random.choice(key_events)
+            t0 = perf_counter_ns()
+            collector.on_key_press(event)
+        elif kind == 'click':
+            t0 = perf_counter_ns()
+            collector.on_mouse_click()
+        else:
+            process, title = random.choice(windows)
+            t0 = perf_counter_ns()
+            source.switch_to(process, title)
+        latencies[kind].append(perf_counter_ns() - t0)
+    elapsed = time.perf_counter() - start
+
+    t0 = time.perf_counter()
+    summary = collector.stop_session()
+    save_seconds = time.perf_counter() - t0
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    store.close()
+    collector.journal.close()
+    collector.timeline.close()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    sent = len(latencies['key']) + len(latencies['click'])
+    counted = summary['key_strokes'] + summary['mouse_clicks']
+    return {
+        'python': sys.version.split()[0],
+        'platform': sys.platform,
+        'config': vars(args),
+        'elapsed_seconds': round(elapsed, 3),
+        'events': len(events),
+        'events_per_second': round(len(events) / elapsed, 1),
+        'input_events_lost': sent - counted,
+        'replay_lag_ms_max': round(max(lag) * 1000, 2) if lag else 0.0,
+        'latency': {
+            'on_key_press': percentiles(latencies['key']),
+            'on_mouse_click': percentiles(latencies['click']),
+            'window_switch': percentiles(latencies['switch']),
+        },
+        'window_intervals': len(collector.logger.window_usage),
+        'peak_memory_bytes': peak_bytes,
+        'save_session_seconds': round(save_seconds, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebTracker synthetic input benchmark")
+    parser.add_argument('--duration', type=float, default=10, help="seconds of input to replay")
+    parser.add_argument('--key-rate', type=float, default=50, help="keys per second during a burst")
+    parser.add_argument('--burst', type=float, default=2, help="seconds per typing burst")
+    parser.add_argument('--pause', type=float, default=1, help="seconds between typing bursts")
+    parser.add_argument('--click-rate', type=float, default=2, help="clicks per second")
+    parser.add_argument('--switch-rate', type=float, default=1000, help="window switches per minute")
+    parser.add_argument('--windows', type=int, default=50, help="distinct windows switched between")
+    parser.add_argument('--publish-rate', type=int, default=10, help="collector counter updates per second")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
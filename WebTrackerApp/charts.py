@@ -0,0 +1,246 @@
+import numpy as np
+
+# Lines show markers only while this few points are visible
+MARKER_LIMIT = 120
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling of a line to threshold points
+    Keeps the first and last point and, per bucket, the point forming the
+    largest triangle with the previously kept point and the next bucket's mean.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    bucket_size = (n - 2) / (threshold - 2)
+    edges = (np.arange(threshold - 1) * bucket_size).astype(np.int64) + 1
+    edges[-1] = n - 1
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0] = 0
+    kept[-1] = n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        mean_x = x[end:next_end].mean()
+        mean_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[previous] - mean_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (mean_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        kept[i + 1] = previous
+    return x[kept], y[kept]
+
+
+def bucket_max(edges, values, buckets):
+    """
+    Merge consecutive bins into at most `buckets` bins, keeping each group's
+    maximum so peaks stay visible; returns (edges, values)
+    """
+    n = len(values)
+    if n <= buckets or buckets < 1:
+        return edges, values
+    size = -(-n // buckets)
+    padded = np.full(-(-n // size) * size, -np.inf)
+    padded[:n] = values
+    return np.append(edges[:-1:size], edges[-1]), padded.reshape(-1, size).max(axis=1)
+
+
+def nice_ceiling(value):
+    """Smallest 1, 2 or 5 times a power of ten at or above value, so axis limits change rarely"""
+    if value <= 1:
+        return 1.0
+    magnitude = 10 ** np.floor(np.log10(value))
+    for step in (1, 2, 5, 10):
+        if step * magnitude >= value:
+            return float(step * magnitude)
+
+
+class AnalyticsCharts:
+    """
+    The Analytics tab's charts with their artists created once
+    update() only swaps the artists' data, downsampled to the visible range and
+    the axes' pixel width. When the axis limits are unchanged the artists are
+    blitted over a cached background instead of redrawing the whole figure.
+    """
+
+    def __init__(self, figure, trend_axes, idle_axes, heatmap_axes, weekdays, density=None):
+        """
+        density: optional callable(low, high, bins) returning event counts in `bins` equal
+                 bins over [low, high) date numbers, drawn behind the trends for the visible range
+        """
+        self.figure = figure
+        self.canvas = figure.canvas
+        self.trend_axes = trend_axes
+        self.idle_axes = idle_axes
+        self.heatmap_axes = heatmap_axes
+
+        # Plot 1: Activity over time
+        self.lines = {}
+        for name, label, marker, style in (
+            ('mouse_clicks', 'Mouse Clicks', 'o', '-'),
+            ('key_strokes', 'Keystrokes', 's', '-'),
+            ('key_strokes_avg', 'Keystrokes (7-day avg)', '', '--'),
+        ):
+            line, = trend_axes.plot([], [], label=label, marker=marker, linestyle=style, animated=True)
+            self.lines[name] = (line, marker)
+        trend_axes.set_title('Activity Trends', color='white')
+        trend_axes.set_ylabel('Count', color='white')
+        trend_axes.legend(loc='upper left')
+
+        # Input and focus events of the visible range, at any zoom from months to seconds
+        self.density = density
+        self.density_range = None
+        self.density_stairs = None
+        if density is not None:
+            density_axes = trend_axes.twinx()
+            self.density_stairs = density_axes.stairs(
+                [0], [0, 1], fill=True, alpha=0.25, color='tab:cyan', label='Events', animated=True
+            )
+            density_axes.set_yticks([])
+            density_axes.legend(loc='upper right')
+
+        # Plot 2: Idle Time Analysis
+        self.idle = idle_axes.stairs(
+            [0], [0, 1], fill=True, alpha=0.7, label='Idle Time (minutes)', animated=True
+        )
+        idle_axes.set_title('Idle Time Analysis', color='white')
+        idle_axes.set_xlabel('Date', color='white')
+        idle_axes.set_ylabel('Minutes', color='white')
+        idle_axes.legend(loc='upper left')
+
+        for axes in (trend_axes, idle_axes):
+            axes.xaxis_date()
+            axes.grid(True, alpha=0.3)
+            axes.tick_params(colors='white')
+            axes.tick_params(axis='x', labelrotation=45)
+
+        # Plot 3: When the user is active, in hours per weekday and hour of day
+        self.heatmap = heatmap_axes.imshow(
+            np.zeros((7, 24)), aspect='auto', cmap='magma', animated=True
+        )
+        heatmap_axes.set_title('Active Hours by Weekday and Hour', color='white')
+        heatmap_axes.set_xlabel('Hour of Day', color='white')
+        heatmap_axes.set_yticks(range(7))
+        heatmap_axes.set_yticklabels(weekdays)
+        heatmap_axes.set_xticks(range(0, 24, 3))
+        heatmap_axes.tick_params(colors='white')
+
+        self.empty_texts = [
+            axes.text(0.5, 0.5, 'No activity data available', transform=axes.transAxes,
+                      horizontalalignment='center', verticalalignment='center', color='white')
+            for axes in (trend_axes, idle_axes, heatmap_axes)
+        ]
+
+        self.series = {}
+        self.idle_bins = (np.array([0.0, 1.0]), np.zeros(1))
+        self.limits = None
+        self.auto_xlim = None
+        self.background = None
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+        self.canvas.mpl_connect('resize_event', lambda event: self._apply_visible())
+        # Zooming or panning (toolbar) re-downsamples the newly visible range
+        trend_axes.callbacks.connect('xlim_changed', lambda axes: self._apply_visible())
+
+    def _animated(self):
+        artists = [line for line, _ in self.lines.values()] + [self.idle, self.heatmap]
+        if self.density_stairs is not None:
+            artists.append(self.density_stairs)
+        return artists
+
+    def _on_draw(self, event):
+        # A full draw leaves out animated artists: keep it as the blit background
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        for artist in self._animated():
+            self.figure.draw_artist(artist)
+
+    def _apply_visible(self):
+        """Give each artist the downsampled part of its series inside the current x range"""
+        low, high = self.trend_axes.get_xlim()
+        width = max(3, int(self.trend_axes.bbox.width))
+
+        for name, (line, marker) in self.lines.items():
+            x, y = self.series.get(name, (np.empty(0), np.empty(0)))
+            first = max(0, np.searchsorted(x, low) - 1)
+            last = np.searchsorted(x, high) + 1
+            x, y = lttb(x[first:last], y[first:last], width)
+            line.set_data(x, y)
+            line.set_marker(marker if len(x) <= MARKER_LIMIT else '')
+
+        edges, values = self.idle_bins
+        first = max(0, np.searchsorted(edges, low) - 1)
+        last = min(len(values), np.searchsorted(edges, high) + 1)
+        if last > first:
+            edges, values = bucket_max(edges[first:last + 1], values[first:last], width // 2)
+        self.idle.set_data(values, edges)
+
+        if self.density is not None and (low, high, width) != self.density_range:
+            self._apply_density(low, high, width // 2)
+            self.density_range = (low, high, width)
+
+    def _apply_density(self, low, high, bins):
+        """Re-bin the event timeline over the visible range"""
+        try:
+            counts = np.asarray(self.density(low, high, bins), dtype=float)
+        except Exception as e:
+            print(f"Error reading event density: {e}")
+            return
+        self.density_stairs.set_data(counts, np.linspace(low, high, bins + 1))
+        self.density_stairs.axes.set_ylim(0, nice_ceiling(counts.max() * 1.05) if len(counts) else 1.0)
+
+    def update(self, series, idle_bins, heatmap):
+        """
+        series: {'mouse_clicks' | 'key_strokes' | 'key_strokes_avg': (x, y)} with x in date numbers
+        idle_bins: (edges, values) of daily idle minutes, edges in date numbers
+        heatmap: 7 x 24 array of active hours
+        """
+        self.series = {name: (np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+                       for name, (x, y) in series.items()}
+        self.idle_bins = (np.asarray(idle_bins[0], dtype=float), np.asarray(idle_bins[1], dtype=float))
+        self.heatmap.set_data(heatmap)
+        self.heatmap.set_clim(0, max(float(heatmap.max()), 1e-9))
+        # Events recorded since the last update are read again
+        self.density_range = None
+
+        has_data = any(len(x) for x, _ in self.series.values())
+        for text in self.empty_texts:
+            text.set_visible(not has_data)
+
+        limits = self._limits() if has_data else None
+        changed = limits is not None and limits != self.limits
+        if changed:
+            self.limits = limits
+            xlim, trend_ylim, idle_ylim = limits
+            # Keep the user's zoom unless the x range was still the automatic one
+            if self.auto_xlim is None or self.trend_axes.get_xlim() == self.auto_xlim:
+                self.trend_axes.set_xlim(xlim)
+                self.auto_xlim = self.trend_axes.get_xlim()
+            self.trend_axes.set_ylim(trend_ylim)
+            self.idle_axes.set_ylim(idle_ylim)
+
+        self._apply_visible()
+        if changed or self.background is None or not has_data:
+            self.canvas.draw_idle()
+        else:
+            self.canvas.restore_region(self.background)
+            self._draw_animated()
+            self.canvas.blit(self.figure.bbox)
+
+    def _limits(self):
+        xs = [x for x, _ in self.series.values() if len(x)]
+        low = min(x[0] for x in xs) - 0.5
+        high = max(x[-1] for x in xs) + 0.5
+        top = max((y.max() for _, y in self.series.values() if len(y)), default=0)
+        idle_top = self.idle_bins[1].max() if len(self.idle_bins[1]) else 0
+        return (
+            (low, high),
+            (0.0, nice_ceiling(top * 1.05)),
+            (0.0, nice_ceiling(idle_top * 1.05)),
+        )
@@ -0,0 +1,538 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+from diagnostics import metrics, file_size
+from file_lock import FileLock
+from session_store import SessionStore, TIME_FORMAT
+from session_journal import SessionJournal
+from uploader import create_uploader, session_record
+from key_stats import KeyStats
+from idle_detector import IdleDetector
+from event_timeline import EventTimeline, KEY, CLICK, FOCUS, IDLE
+from window_events import FocusTracker, create_window_event_source
+from screenshots import ScreenshotEncoder
+from tile_store import TileStore
+
+
+class ActivityLogger:
+    def __init__(self, window_source=None):
+        self.mouse_clicks = 0
+        self.key_strokes = 0
+        self.idle_time = 0
+        self.last_active = "N/A"
+        self.is_logging = False
+        self.key_stats = KeyStats()
+        self.start_time = None
+        self.session_id = None
+        self.project = None
+        self.task = None
+        # Idle intervals: input gaps longer than 1 minute
+        self.idle_detector = IdleDetector(threshold=60)
+        # Foreground window time, counted from focus change events while logging
+        self.window_tracker = FocusTracker(window_source or create_window_event_source())
+        self.window_usage = self.window_tracker.usage
+        # Input hooks only queue (timestamp, key) pairs; key is None for a click
+        self.input_events = deque()
+        self.publish_rate = 10  # counter updates per second
+        # Screenshot configuration
+        self.screenshot_interval = 300  # 5 minutes
+        self.is_screenshot_enabled = False
+        self.screenshot_thread = None
+        self.screenshot_lock = threading.Lock()
+        self.screenshot_folder = Path("screenshots")
+        # Deduplicated tile storage, used by the TILES format
+        self.screenshot_tiles = TileStore(self.screenshot_folder / "tiles")
+        # Frames are encoded off the capture thread (format, quality, scale, duplicate skipping);
+        # all saved screenshots are kept under 1 GB and 30 days by background compaction
+        self.screenshot_encoder = ScreenshotEncoder(
+            self.screenshot_folder, image_format='JPEG', quality=80, tile_store=self.screenshot_tiles,
+            max_bytes=1024 ** 3, max_age_days=30
+        )
+
+    def reset(self):
+        self.mouse_clicks = 0
+        self.key_strokes = 0
+        self.idle_time = 0
+        self.key_stats.clear()
+        self.start_time = None
+        self.session_id = None
+        self.input_events.clear()
+        self.window_tracker.clear()
+
+    def take_screenshot(self):
+        """Capture a screenshot and hand it to the encoder pool"""
+        try:
+            from PIL import ImageGrab
+
+            # Capture the screen
+            t0 = time.perf_counter()
+            screenshot = ImageGrab.grab()
+            if metrics.enabled:
+                metrics.record('screenshot.capture', time.perf_counter() - t0)
+
+            # Encoding and saving happen on the encoder's worker threads
+            self.screenshot_encoder.start()
+            if not self.screenshot_encoder.submit(screenshot, datetime.now()):
+                print("Screenshot dropped: encoder is busy")
+
+        except Exception as e:
+            print(f"Error taking screenshot: {e}")
+
+
+class Collector:
+    """
+    Runs the activity collectors (input hooks, window tracking, idle detection,
+    screenshots) without any UI and publishes their state to subscribers
+    Subscribers are called as callback(event, data) with event one of
+    'counters', 'session_started', 'session_ended' or 'idle_started'.
+    """
+
+    def __init__(self, store=None, window_source=None, journal=None, uploader='env', timeline=None):
+        """uploader: a SessionUploader, None for no uploads, or 'env' for create_uploader()"""
+        self.logger = ActivityLogger(window_source)
+        self.store = store or SessionStore()
+        # Running sessions are checkpointed here so a crash loses at most one interval
+        self.journal = journal or SessionJournal()
+        # First window interval the next checkpoint writes (earlier ones are journaled)
+        self.checkpoint_first = 0
+        # Finished sessions also go to the team server when one is configured
+        self.uploader = create_uploader() if uploader == 'env' else uploader
+        # Every input and focus event of a session, for activity density within sessions
+        self.timeline = timeline or EventTimeline()
+        # Held while running: one collector per store, so none closes another's sessions
+        self.instance_lock = FileLock(self.store.path + ".lock")
+        self.subscribers = []
+        self.subscribers_lock = threading.Lock()
+        self.session_lock = threading.Lock()
+        # Set by input, window changes, idle starts and session changes: wakes publish_counters()
+        self.wake = threading.Event()
+        self.is_started = False
+        self.logger.idle_detector.on_idle = self.on_idle
+        self.logger.window_tracker.on_change = self.on_window_change
+        self.register_gauges()
+
+    def register_gauges(self):
+        """Values sampled by the diagnostics snapshot"""
+        logger = self.logger
+        metrics.register_gauge('queue.input_events', lambda: len(logger.input_events))
+        metrics.register_gauge('queue.screenshots', logger.screenshot_encoder.queue.qsize)
+        metrics.register_gauge('screenshots', logger.screenshot_encoder.stats)
+        metrics.register_gauge('window_caches', logger.window_tracker.source.cache_stats)
+        metrics.register_gauge('window_intervals', lambda: len(logger.window_usage))
+        metrics.register_gauge('subscribers', lambda: len(self.subscribers))
+        metrics.register_gauge(
+            'file.store_bytes', lambda: file_size(self.store.path, self.store.path + "-wal")
+        )
+        metrics.register_gauge('file.journal_bytes', lambda: file_size(self.journal.path))
+        metrics.register_gauge('timeline_days', lambda: len(self.timeline.days()))
+        metrics.register_gauge('timeline_late_events', lambda: self.timeline.late_events)
+        if self.uploader is not None:
+            metrics.register_gauge('uploads', self.uploader.stats)
+
+    def subscribe(self, callback):
+        with self.subscribers_lock:
+            self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self.subscribers_lock:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def publish(self, event, data):
+        with self.subscribers_lock:
+            subscribers = list(self.subscribers)
+        for callback in subscribers:
+            try:
+                callback(event, data)
+            except Exception as e:
+                print(f"Error publishing {event}: {e}")
+
+    def start(self):
+        """
+        Start window tracking and the background threads (only once)
+        Raises RuntimeError when another collector is already running on the same store.
+        """
+        if self.is_started:
+            return
+        if not self.instance_lock.acquire(timeout=0):
+            raise RuntimeError(f"Another collector is already running on {self.store.path}")
+        self.is_started = True
+        self.recover_sessions()
+        self.logger.window_tracker.start()
+        # Publish the initial state right away
+        self.wake.set()
+        threading.Thread(target=self.publish_counters, daemon=True).start()
+        threading.Thread(target=self.checkpoint_loop, daemon=True).start()
+
+    def recover_sessions(self):
+        """Close sessions left open by a previous run that crashed or was killed"""
+        try:
+            recovered = self.journal.recover(self.store)
+            if recovered:
+                print(f"Recovered {len(recovered)} unfinished session(s)")
+            for session_id in recovered:
+                self.upload_session(session_id)
+        except Exception as e:
+            print(f"Error recovering sessions: {e}")
+
+    # Input hooks run on the global hook thread: they only queue the event
+    # and leave counting to drain_input_events()
+    def on_mouse_click(self):
+        enabled = metrics.enabled
+        if enabled:
+            t0 = time.perf_counter()
+        if self.logger.is_logging:
+            self.logger.input_events.append((time.time(), None))
+            if not self.wake.is_set():
+                self.wake.set()
+        if enabled:
+            metrics.record('hook.mouse_click', time.perf_counter() - t0)
+
+    def on_key_press(self, event):
+        enabled = metrics.enabled
+        if enabled:
+            t0 = time.perf_counter()
+        if self.logger.is_logging:
+            self.logger.input_events.append((time.time(), event.name))
+            if not self.wake.is_set():
+                self.wake.set()
+        if enabled:
+            metrics.record('hook.key_press', time.perf_counter() - t0)
+
+    def install_hooks(self):
+        import keyboard
+        import mouse
+
+        # Set up mouse hook
+        mouse.on_click(self.on_mouse_click)
+
+        # Set up keyboard hook
+        keyboard.on_press(self.on_key_press)
+
+    def remove_hooks(self):
+        import keyboard
+        import mouse
+
+        mouse.unhook_all()
+        keyboard.unhook_all()
+
+    def drain_input_events(self):
+        """Apply queued input events to the session counters"""
+        logger = self.logger
+        last_event_time = None
+        record = self.timeline.record
+        for _ in range(len(logger.input_events)):
+            last_event_time, key = logger.input_events.popleft()
+            if key is None:
+                logger.mouse_clicks += 1
+                record(last_event_time, CLICK)
+            else:
+                logger.key_strokes += 1
+                logger.key_stats.add(key)
+                record(last_event_time, KEY, str(key))
+
+        if last_event_time is not None:
+            if metrics.enabled:
+                # How long the newest event waited in the queue
+                metrics.record('input.queue_delay', time.time() - last_event_time)
+            logger.idle_detector.activity(last_event_time)
+            logger.last_active = time.strftime("%I:%M:%S %p", time.localtime(last_event_time))
+        logger.idle_time = int(logger.idle_detector.total() // 60)
+
+    def snapshot(self):
+        """Current session state as a plain dict"""
+        logger = self.logger
+        return {
+            'is_logging': logger.is_logging,
+            'session_id': logger.session_id,
+            'project': logger.project,
+            'task': logger.task,
+            'start_time': logger.start_time,
+            'mouse_clicks': logger.mouse_clicks,
+            'key_strokes': logger.key_strokes,
+            'idle_time': logger.idle_time,
+            'last_active': logger.last_active,
+            'current_window': logger.window_tracker.current_window,
+        }
+
+    def publish_counters(self):
+        """
+        Thread function: drain input and publish the counters when they change
+        Sleeps until woken by input, a window change, an idle start or a session
+        start/stop, at most publish_rate times per second; while the user is idle it
+        also wakes when the idle minutes tick over, and while not logging it never does.
+        """
+        last_published = None
+        timeout = None
+        while True:
+            self.wake.wait(timeout)
+            self.wake.clear()
+            timeout = None
+            try:
+                with self.session_lock:
+                    logger = self.logger
+                    if logger.is_logging:
+                        self.drain_input_events()
+                        if logger.idle_detector.is_idle():
+                            timeout = 60 - logger.idle_detector.total() % 60
+                    state = self.snapshot()
+                if state != last_published:
+                    self.publish('counters', state)
+                    last_published = state
+            except Exception as e:
+                print(f"Error publishing counters: {e}")
+            # Input arriving meanwhile is drained together on the next pass
+            interval = 1 / self.logger.publish_rate
+            expected = time.monotonic() + interval
+            time.sleep(interval)
+            if metrics.enabled:
+                metrics.loop_lag('publish_counters', expected)
+
+    def on_idle(self, start):
+        """Called by the idle detector when no input was seen for its threshold"""
+        self.timeline.record(start, IDLE)
+        self.wake.set()
+        self.publish('idle_started', {'session_id': self.logger.session_id, 'start': start})
+
+    def on_window_change(self, window, info):
+        """Called by the focus tracker on every foreground window change"""
+        if self.logger.is_logging:
+            self.timeline.record(info['timestamp'], FOCUS, window)
+            self.wake.set()
+
+    def checkpoint(self):
+        """Write the running session to the journal and the buffered timeline events to disk"""
+        with self.session_lock:
+            logger = self.logger
+            if not logger.is_logging or logger.session_id is None:
+                return
+            self.drain_input_events()
+            session_id = logger.session_id
+            data, self.checkpoint_first = self.session_data(self.checkpoint_first)
+        self.journal.checkpoint(session_id, data)
+        self.timeline.flush()
+
+    def checkpoint_loop(self):
+        """Thread function: checkpoint the running session every checkpoint_interval seconds"""
+        while True:
+            expected = time.monotonic() + self.journal.checkpoint_interval
+            time.sleep(self.journal.checkpoint_interval)
+            if metrics.enabled:
+                metrics.loop_lag('checkpoint', expected)
+            try:
+                self.checkpoint()
+            except Exception as e:
+                print(f"Error writing session checkpoint: {e}")
+
+    def screenshot_loop(self):
+        """Thread function to take periodic screenshots"""
+        while True:
+            if self.logger.is_logging and self.logger.is_screenshot_enabled:
+                self.logger.take_screenshot()
+            expected = time.monotonic() + self.logger.screenshot_interval
+            time.sleep(self.logger.screenshot_interval)
+            if metrics.enabled:
+                metrics.loop_lag('screenshots', expected)
+
+    def ensure_screenshot_thread(self):
+        """Start the screenshot thread unless one is already running"""
+        logger = self.logger
+        with logger.screenshot_lock:
+            if logger.screenshot_thread is None or not logger.screenshot_thread.is_alive():
+                logger.screenshot_thread = threading.Thread(target=self.screenshot_loop, daemon=True)
+                logger.screenshot_thread.start()
+                logger.screenshot_encoder.start_compaction()
+
+    def configure(self, screenshot_interval=None, is_screenshot_enabled=None,
+                  screenshot_format=None, screenshot_scale=None, publish_rate=None,
+                  skip_duplicate_screenshots=None, screenshot_max_bytes=None, screenshot_max_age_days=None):
+        """
+        Change collector settings; arguments left as None are unchanged
+        screenshot_max_bytes / screenshot_max_age_days: screenshot disk quota, 0 for no limit
+        """
+        logger = self.logger
+        if screenshot_interval is not None:
+            logger.screenshot_interval = screenshot_interval
+        if screenshot_format is not None:
+            logger.screenshot_encoder.image_format = screenshot_format
+        if screenshot_scale is not None:
+            logger.screenshot_encoder.scale = screenshot_scale
+        if skip_duplicate_screenshots is not None:
+            logger.screenshot_encoder.skip_duplicates = skip_duplicate_screenshots
+        if screenshot_max_bytes is not None:
+            logger.screenshot_encoder.max_bytes = screenshot_max_bytes or None
+        if screenshot_max_age_days is not None:
+            logger.screenshot_encoder.max_age_days = screenshot_max_age_days or None
+        if publish_rate is not None:
+            logger.publish_rate = publish_rate
+        if is_screenshot_enabled is not None:
+            logger.is_screenshot_enabled = is_screenshot_enabled
+            if is_screenshot_enabled and logger.is_logging:
+                self.ensure_screenshot_thread()
+
+    def diagnostics(self, enable=None):
+        """Turn instrumentation on or off (None leaves it) and return the current metrics"""
+        if enable is not None:
+            metrics.enable(enable)
+        return metrics.snapshot()
+
+    def start_session(self, project, task, description):
+        """
+        Start logging a session
+        Returns {'session_id': ..., 'input_error': message or None}
+        """
+        logger = self.logger
+        input_error = None
+        with self.session_lock:
+            if logger.is_logging:
+                return {'session_id': logger.session_id, 'input_error': None}
+
+            logger.is_logging = True
+            logger.reset()
+            self.checkpoint_first = 0
+            logger.start_time = time.time()
+            logger.project = project
+            logger.task = task
+            logger.window_tracker.resume(logger.start_time)
+            logger.idle_detector.start(logger.start_time)
+            logger.last_active = time.strftime("%I:%M:%S %p")
+
+            try:
+                self.install_hooks()
+
+                # Start screenshot thread if enabled
+                if logger.is_screenshot_enabled:
+                    self.ensure_screenshot_thread()
+
+            except Exception as e:
+                print(f"Error starting input listeners: {e}")
+                input_error = str(e)
+
+            # Save initial session info
+            self.save_session_start(project, task, description)
+            state = self.snapshot()
+
+        self.wake.set()
+        self.publish('session_started', state)
+        return {'session_id': logger.session_id, 'input_error': input_error}
+
+    def stop_session(self):
+        """Stop logging, save the session and return its summary (None if not logging)"""
+        logger = self.logger
+        with self.session_lock:
+            if not logger.is_logging:
+                return None
+            logger.is_logging = False
+            logger.window_tracker.pause()
+
+            # Remove hooks
+            try:
+                self.remove_hooks()
+            except Exception as e:
+                print(f"Error stopping input listeners: {e}")
+
+            # Count input still waiting for the next drain
+            self.drain_input_events()
+            logger.idle_detector.stop()
+            self.timeline.flush()
+
+            # Save session data
+            session_data, _ = self.session_data()
+            self.save_session_end(session_data)
+
+            summary = {
+                'session_id': logger.session_id,
+                'hours': session_data['hours'],
+                'minutes': session_data['minutes'],
+                'mouse_clicks': logger.mouse_clicks,
+                'key_strokes': logger.key_strokes,
+                'idle_time': session_data['idle_time'],
+                'window_usage': logger.window_usage.totals(),
+            }
+
+        self.wake.set()
+        self.publish('session_ended', summary)
+        return summary
+
+    def save_session_start(self, project, task, description):
+        try:
+            self.logger.session_id = self.store.start_session(
+                project, task, description, time.strftime(TIME_FORMAT)
+            )
+            self.journal.begin(self.logger.session_id)
+        except Exception as e:
+            print(f"Error saving session start: {e}")
+
+    def session_data(self, first_interval=0):
+        """
+        End record of the current session as if it stopped now, with the window intervals
+        from index first_interval on; returns (record, first_interval for the next call)
+        """
+        logger = self.logger
+        now = time.time()
+        duration = now - logger.start_time
+        hours = int(duration // 3600)
+        minutes = int((duration % 3600) // 60)
+        window_totals, window_intervals, next_interval = logger.window_tracker.snapshot(now, first_interval)
+        data = {
+            'end_time': time.strftime(TIME_FORMAT),
+            'duration': f"{hours}h {minutes}m",
+            'hours': hours,
+            'minutes': minutes,
+            'mouse_clicks': logger.mouse_clicks,
+            'key_strokes': logger.key_strokes,
+            'idle_time': int(logger.idle_detector.total(now) // 60),
+            'idle_intervals': logger.idle_detector.idle_intervals(now),
+            'key_counts': logger.key_stats.to_dict(),
+            'window_usage': {
+                window: {
+                    'total_seconds': round(seconds, 1),
+                    'percentage': (seconds / (hours * 3600 + minutes * 60)) * 100 if hours or minutes else 0
+                }
+                for window, seconds in window_totals.items()
+            },
+            'window_intervals': window_intervals
+        }
+        return data, next_interval
+
+    def save_session_end(self, session_data):
+        """Enhanced session end saving with window usage data"""
+        logger = self.logger
+        if logger.session_id is None:
+            return
+        try:
+            self.store.end_session(logger.session_id, session_data)
+            self.journal.end(logger.session_id)
+        except Exception as e:
+            print(f"Error saving session end: {e}")
+            return
+        self.upload_session(logger.session_id)
+
+    def upload_session(self, session_id):
+        """Spool a finished session for the team server, when uploads are configured"""
+        if self.uploader is None:
+            return
+        try:
+            self.uploader.submit(session_record(self.store.get_session(session_id)))
+        except Exception as e:
+            print(f"Error queueing session upload: {e}")
+
+
+if __name__ == "__main__":
+    # Headless daemon: collect activity and serve it to GUI clients over local IPC
+    from ipc import CollectorServer
+
+    collector = Collector()
+    try:
+        collector.start()
+    except RuntimeError as e:
+        raise SystemExit(str(e))
+    print("WebTracker collector running, waiting for clients...")
+    try:
+        CollectorServer(collector).serve_forever()
+    except KeyboardInterrupt:
+        collector.stop_session()
+        print("\nCollector stopped")
@@ -0,0 +1,152 @@
+import json
+import os
+import sys
+import threading
+import time
+from array import array
+
+# Histogram buckets are powers of two microseconds: bucket i counts samples below 2**i us
+BUCKETS = 28  # up to ~134 s
+
+
+class Histogram:
+    """Latency histogram with logarithmic buckets (fixed memory, O(1) record)"""
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = array('Q', bytes(8 * BUCKETS))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[min(BUCKETS - 1, int(seconds * 1e6).bit_length())] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples, in seconds"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self.max, (1 << index) / 1e6)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(0.50) * 1000, 3),
+            'p90_ms': round(self.percentile(0.90) * 1000, 3),
+            'p99_ms': round(self.percentile(0.99) * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+        }
+
+
+class Diagnostics:
+    """
+    Registry of the tracker's internal metrics
+    Instrumented code checks `metrics.enabled` before taking any timestamp, so
+    the cost while disabled is one attribute lookup per call site. Updates are
+    not locked and may drop a sample under contention, which is fine for
+    diagnostics.
+    """
+
+    def __init__(self):
+        self.enabled = bool(os.environ.get('WEBTRACKER_DIAGNOSTICS'))
+        self.started = time.time()
+        self.histograms = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+
+    def enable(self, enabled=True):
+        if enabled and not self.enabled:
+            self.reset()
+        self.enabled = enabled
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.started = time.time()
+
+    def _histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        return histogram
+
+    def record(self, name, seconds):
+        """Add one latency sample (seconds) to a histogram"""
+        self._histogram(name).record(seconds)
+
+    def loop_lag(self, name, expected):
+        """Record how late a loop woke up compared to when it expected to (time.monotonic())"""
+        self._histogram(f"lag.{name}").record(max(0.0, time.monotonic() - expected))
+
+    def register_gauge(self, name, read):
+        """Register a callable sampled on every snapshot (queue depths, file sizes...)"""
+        self.gauges[name] = read
+
+    def snapshot(self):
+        gauges = {}
+        for name, read in list(self.gauges.items()):
+            try:
+                gauges[name] = read()
+            except Exception as e:
+                gauges[name] = f"error: {e}"
+        with self.lock:
+            histograms = {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())}
+        return {
+            'enabled': self.enabled,
+            'pid': os.getpid(),
+            'seconds': round(time.time() - self.started, 1),
+            'histograms': histograms,
+            'gauges': gauges,
+        }
+
+
+# Process-wide registry used by all instrumented modules
+metrics = Diagnostics()
+
+
+def file_size(*paths):
+    """Gauge helper: total size in bytes of the files that exist"""
+    return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+
+
+if __name__ == "__main__":
+    # Sample a running collector daemon: python diagnostics.py [interval seconds]
+    from ipc import CollectorClient
+
+    try:
+        client = CollectorClient()
+    except OSError:
+        print("No collector daemon is running (start it with python collector.py)")
+        sys.exit(1)
+
+    interval = float(sys.argv[1]) if len(sys.argv) > 1 else None
+    # Instrumentation is left the way it was found (e.g. on for an open diagnostics tab)
+    was_enabled = client.call('diagnostics')['enabled']
+    try:
+        while True:
+            print(json.dumps(client.call('diagnostics', enable=True), indent=2), flush=True)
+            if interval is None:
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        try:
+            if not was_enabled:
+                client.call('diagnostics', enable=False)
+        except Exception as e:
+            print(f"Error restoring diagnostics: {e}")
+        client.close()
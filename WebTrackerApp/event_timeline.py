@@ -0,0 +1,293 @@
+import json
+import mmap
+import os
+import struct
+import threading
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+# Event types
+KEY = 1
+CLICK = 2
+FOCUS = 3
+IDLE = 4
+EVENT_TYPES = {KEY: 'key', CLICK: 'click', FOCUS: 'focus', IDLE: 'idle'}
+
+# One event: milliseconds since the day file's local midnight, type, and the id of
+# its key or "process - title" window in the day's name table (0 when unused)
+RECORD = struct.Struct('<IBxH')
+RECORD_DTYPE = np.dtype([('ms', '<u4'), ('type', 'u1'), ('pad', 'u1'), ('id', '<u2')])
+# Sparse index entry: the first record of each minute that has events
+INDEX = struct.Struct('<HI')
+INDEX_DTYPE = np.dtype([('minute', '<u2'), ('record', '<u4')])
+
+# Names past the 65534th of a day share the last id
+MAX_ID = 0xFFFF
+OTHER_NAME = "<other>"
+FLUSH_BYTES = 64 * 1024
+
+
+class DayWriter:
+    """Append-only files of one day: events, sparse minute index and name table"""
+
+    def __init__(self, folder, day):
+        self.day = day
+        self.midnight = datetime.combine(day, datetime.min.time()).timestamp()
+        self.next_midnight = datetime.combine(day + timedelta(days=1), datetime.min.time()).timestamp()
+        base = os.path.join(folder, day.isoformat())
+        names_path = base + ".names"
+
+        # Reopening a day (restart) continues its ids, record count and clock
+        self.names = {}
+        if os.path.exists(names_path):
+            with open(names_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn by a crash
+                    self.names[entry['name']] = entry['id']
+        self.records = open(base + ".events", 'ab')
+        # Drop a torn record left by a crash
+        size = self.records.tell()
+        if size % RECORD.size:
+            self.records.truncate(size - size % RECORD.size)
+            self.records.seek(0, os.SEEK_END)
+        self.count = self.records.tell() // RECORD.size
+        self.index = open(base + ".index", 'ab')
+        self.names_file = open(names_path, 'a', encoding='utf-8')
+        self.last_ms = 0
+        self.last_minute = -1
+        if self.count:
+            with open(base + ".events", 'rb') as f:
+                f.seek((self.count - 1) * RECORD.size)
+                self.last_ms = RECORD.unpack(f.read(RECORD.size))[0]
+            self.last_minute = self.last_ms // 60000
+
+        self.buffer = bytearray()
+        self.index_buffer = bytearray()
+        self.names_buffer = []
+
+    def name_id(self, name):
+        name_id = self.names.get(name)
+        if name_id is None:
+            if len(self.names) + 1 >= MAX_ID:
+                return MAX_ID
+            name_id = self.names[name] = len(self.names) + 1
+            self.names_buffer.append(json.dumps({'id': name_id, 'name': name}) + "\n")
+        return name_id
+
+    def append(self, timestamp, event_type, name):
+        # Events arrive up to one drain interval late: keep the file sorted by time
+        ms = max(self.last_ms, int((timestamp - self.midnight) * 1000))
+        minute = ms // 60000
+        if minute != self.last_minute:
+            self.index_buffer += INDEX.pack(minute, self.count)
+            self.last_minute = minute
+        self.buffer += RECORD.pack(ms, event_type, self.name_id(name) if name is not None else 0)
+        self.last_ms = ms
+        self.count += 1
+
+    def flush(self):
+        # Names first: a record must never refer to an id that is not on disk
+        if self.names_buffer:
+            self.names_file.writelines(self.names_buffer)
+            self.names_file.flush()
+            self.names_buffer = []
+        if self.buffer:
+            self.records.write(self.buffer)
+            self.records.flush()
+            self.buffer = bytearray()
+        if self.index_buffer:
+            self.index.write(self.index_buffer)
+            self.index.flush()
+            self.index_buffer = bytearray()
+
+    def close(self):
+        self.flush()
+        for f in (self.records, self.index, self.names_file):
+            f.close()
+
+
+class EventTimeline:
+    """
+    Every input and focus event as an 8-byte record in per-day append-only files
+    folder/YYYY-MM-DD.events holds the records in time order, .index the first
+    record of each minute, .names the key and window names by id. Readers mmap
+    the events and use the index to jump to a time range without parsing.
+    """
+
+    def __init__(self, folder="timeline"):
+        self.folder = folder
+        self.lock = threading.Lock()
+        self.writer = None
+        # The day before the current one stays open for events drained after midnight
+        self.previous = None
+        self.late_events = 0
+
+    # Writing
+
+    def record(self, timestamp, event_type, name=None):
+        """Buffer one event (name: key name or "process - title" window); thread-safe"""
+        with self.lock:
+            writer = self.writer
+            if writer is None or not writer.midnight <= timestamp < writer.next_midnight:
+                writer = self._open_day(timestamp)
+            writer.append(timestamp, event_type, name)
+            if len(writer.buffer) >= FLUSH_BYTES:
+                writer.flush()
+
+    def _open_day(self, timestamp):
+        day = datetime.fromtimestamp(timestamp).date()
+        if self.writer is not None and day < self.writer.day:
+            # A late event from before midnight goes to the file of its own day
+            self.late_events += 1
+            if self.previous is None or self.previous.day != day:
+                if self.previous is not None:
+                    self.previous.close()
+                self.previous = DayWriter(self.folder, day)
+            return self.previous
+
+        if self.previous is not None:
+            self.previous.close()
+        self.previous = self.writer
+        os.makedirs(self.folder, exist_ok=True)
+        self.writer = DayWriter(self.folder, day)
+        return self.writer
+
+    def flush(self):
+        """Write buffered events to the day files"""
+        with self.lock:
+            for writer in (self.previous, self.writer):
+                if writer is not None:
+                    writer.flush()
+
+    def close(self):
+        with self.lock:
+            for writer in (self.previous, self.writer):
+                if writer is not None:
+                    writer.close()
+            self.writer = None
+            self.previous = None
+
+    # Reading
+
+    def days(self):
+        """Days with an event file, oldest first"""
+        if not os.path.isdir(self.folder):
+            return []
+        return sorted(
+            date.fromisoformat(name[:-len(".events")])
+            for name in os.listdir(self.folder) if name.endswith(".events")
+        )
+
+    def names(self, day):
+        """{id: name} table of one day"""
+        names = {MAX_ID: OTHER_NAME}
+        path = os.path.join(self.folder, day.isoformat() + ".names")
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    names[entry['id']] = entry['name']
+        return names
+
+    def _day_records(self, day):
+        """The day's records as a NumPy view over an mmap (empty array if none)"""
+        path = os.path.join(self.folder, day.isoformat() + ".events")
+        if not os.path.exists(path):
+            return np.empty(0, dtype=RECORD_DTYPE)
+        with open(path, 'rb') as f:
+            length = os.fstat(f.fileno()).st_size // RECORD.size * RECORD.size
+            if not length:
+                return np.empty(0, dtype=RECORD_DTYPE)
+            # The mapping stays valid after the file is closed
+            mapped = mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ)
+        return np.frombuffer(mapped, dtype=RECORD_DTYPE)
+
+    def _day_index(self, day):
+        path = os.path.join(self.folder, day.isoformat() + ".index")
+        if not os.path.exists(path):
+            return np.empty(0, dtype=INDEX_DTYPE)
+        with open(path, 'rb') as f:
+            data = f.read()
+        return np.frombuffer(data[:len(data) // INDEX.size * INDEX.size], dtype=INDEX_DTYPE)
+
+    def _day_slice(self, day, start_ms, end_ms):
+        """Records of one day with start_ms <= ms < end_ms, found through the minute index"""
+        records = self._day_records(day)
+        index = self._day_index(day)
+        # The index narrows the range to whole minutes; only those records are searched
+        minutes = index['minute']
+        position = int(np.searchsorted(minutes, start_ms // 60000, 'right')) - 1
+        first = int(index['record'][position]) if position >= 0 else 0
+        position = int(np.searchsorted(minutes, (end_ms - 1) // 60000, 'right'))
+        last = int(index['record'][position]) if position < len(index) else len(records)
+        first = min(first, len(records))
+        window = records[first:min(last, len(records))]
+        low = first + int(np.searchsorted(window['ms'], start_ms, 'left'))
+        high = first + int(np.searchsorted(window['ms'], end_ms, 'left'))
+        return records[low:high]
+
+    def _ranges(self, start, end):
+        """(day, start_ms, end_ms, midnight) for each day overlapping [start, end) epoch seconds"""
+        day = datetime.fromtimestamp(start).date()
+        while True:
+            midnight = datetime.combine(day, datetime.min.time()).timestamp()
+            if midnight >= end:
+                return
+            next_midnight = datetime.combine(day + timedelta(days=1), datetime.min.time()).timestamp()
+            start_ms = max(0, int((start - midnight) * 1000))
+            end_ms = int((min(end, next_midnight) - midnight) * 1000)
+            yield day, start_ms, end_ms, midnight
+            day += timedelta(days=1)
+
+    def events(self, start, end, event_type=None):
+        """
+        Events in [start, end) (epoch seconds) as NumPy arrays
+        Returns (timestamps float64, types uint8, ids uint16); ids index the day's names().
+        """
+        timestamps, types, ids = [], [], []
+        for day, start_ms, end_ms, midnight in self._ranges(start, end):
+            records = self._day_slice(day, start_ms, end_ms)
+            if event_type is not None:
+                records = records[records['type'] == event_type]
+            timestamps.append(midnight + records['ms'] / 1000.0)
+            types.append(np.array(records['type']))
+            ids.append(np.array(records['id']))
+        if not timestamps:
+            return np.empty(0), np.empty(0, dtype=np.uint8), np.empty(0, dtype=np.uint16)
+        return np.concatenate(timestamps), np.concatenate(types), np.concatenate(ids)
+
+    def density(self, start, end, bins=500, event_type=None):
+        """
+        Event counts in `bins` equal bins over [start, end), for zooming from months to seconds
+        Returns (edges as epoch seconds, counts). Counts of all events in bins of a minute
+        or more come from the sparse index alone, without reading any records.
+        """
+        edges = np.linspace(start, end, bins + 1)
+        counts = np.zeros(bins, dtype=np.int64)
+        coarse = event_type is None and (end - start) / bins >= 60
+        for day, start_ms, end_ms, midnight in self._ranges(start, end):
+            if coarse:
+                index = self._day_index(day)
+                if not len(index):
+                    continue
+                per_minute = np.diff(index['record'].astype(np.int64), append=self._event_count(day))
+                times = midnight + index['minute'] * 60.0
+                inside = (times >= midnight + start_ms / 1000.0) & (times < midnight + end_ms / 1000.0)
+                counts += np.histogram(times[inside], bins=edges, weights=per_minute[inside])[0].astype(np.int64)
+            else:
+                records = self._day_slice(day, start_ms, end_ms)
+                if event_type is not None:
+                    records = records[records['type'] == event_type]
+                counts += np.histogram(midnight + records['ms'] / 1000.0, bins=edges)[0]
+        return edges, counts
+
+    def _event_count(self, day):
+        path = os.path.join(self.folder, day.isoformat() + ".events")
+        return os.path.getsize(path) // RECORD.size if os.path.exists(path) else 0
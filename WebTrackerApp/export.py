@@ -0,0 +1,234 @@
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import struct
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from session_store import SessionStore, TIME_FORMAT
+
+# Columns of each export with their columnar type ('i8', 'f8' or 'str')
+EXPORTS = {
+    'sessions': (
+        ('id', 'i8'), ('project', 'str'), ('task', 'str'), ('description', 'str'),
+        ('start_time', 'str'), ('end_time', 'str'), ('duration', 'str'),
+        ('mouse_clicks', 'i8'), ('key_strokes', 'i8'), ('idle_time', 'i8'),
+        ('key_counts', 'str'), ('window_usage', 'str'),
+    ),
+    'window_intervals': (
+        ('interval_id', 'i8'), ('session_id', 'i8'), ('start_ts', 'f8'), ('end_ts', 'f8'),
+        ('process', 'str'), ('title', 'str'),
+    ),
+    'rollups': (
+        ('bucket', 'str'), ('project', 'str'), ('task', 'str'), ('sessions', 'i8'),
+        ('active_seconds', 'i8'), ('mouse_clicks', 'i8'), ('key_strokes', 'i8'), ('idle_time', 'i8'),
+    ),
+}
+
+# Keyset of each export: the columns identifying where the previous chunk stopped
+EXPORT_KEYS = {
+    'sessions': ('start_time', 'id'),
+    'window_intervals': ('start_ts', 'interval_id'),
+    'rollups': ('bucket', 'project', 'task'),
+}
+
+FORMATS = ('csv', 'ndjson', 'columnar')
+
+# Compressed columnar files start with this; each chunk follows as a frame:
+# <u32 header length><JSON header {"rows": n, "columns": [[name, type, bytes], ...]}><zlib'd columns>
+COLUMNAR_MAGIC = b"WTCOLS1\n"
+
+
+def guess_format(path):
+    """Export format from a file name (.csv, .ndjson/.jsonl, .wtc; optionally .gz)"""
+    name = path[:-3] if path.endswith('.gz') else path
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl', '.json')):
+        return 'ndjson'
+    return 'columnar'
+
+
+def encode_csv(kind, rows, header):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    columns = [name for name, _ in EXPORTS[kind]]
+    if header:
+        writer.writerow(columns)
+    for row in rows:
+        writer.writerow([row[name] for name in columns])
+    return out.getvalue().encode('utf-8')
+
+
+def encode_ndjson(kind, rows, header):
+    if not rows:
+        return b""
+    lines = []
+    for row in rows:
+        if kind == 'sessions':
+            row = dict(row, key_counts=json.loads(row['key_counts'] or '{}'),
+                       window_usage=json.loads(row['window_usage'] or '{}'))
+        lines.append(json.dumps(row))
+    return ("\n".join(lines) + "\n").encode('utf-8')
+
+
+def encode_columnar(kind, rows, header):
+    """One frame of zlib-compressed column arrays; missing counters are written as 0"""
+    columns = []
+    blobs = []
+    for name, column_type in EXPORTS[kind]:
+        values = [row[name] for row in rows]
+        if column_type == 'i8':
+            data = np.array([value or 0 for value in values], dtype='<i8').tobytes()
+        elif column_type == 'f8':
+            data = np.array([np.nan if value is None else value for value in values], dtype='<f8').tobytes()
+        else:
+            data = json.dumps(values).encode('utf-8')
+        blob = zlib.compress(data, 6)
+        columns.append([name, column_type, len(blob)])
+        blobs.append(blob)
+    frame_header = json.dumps({'rows': len(rows), 'columns': columns}).encode('utf-8')
+    return (COLUMNAR_MAGIC if header else b"") + struct.pack('<I', len(frame_header)) + frame_header + b"".join(blobs)
+
+
+ENCODERS = {'csv': encode_csv, 'ndjson': encode_ndjson, 'columnar': encode_columnar}
+
+
+def read_columnar(path):
+    """Yield each chunk of a columnar export as {column: NumPy array} (strings as object arrays)"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f"{path} is not a columnar export")
+        while True:
+            size = f.read(4)
+            if not size:
+                return
+            frame = json.loads(f.read(struct.unpack('<I', size)[0]).decode('utf-8'))
+            chunk = {}
+            for name, column_type, length in frame['columns']:
+                data = zlib.decompress(f.read(length))
+                if column_type == 'str':
+                    chunk[name] = np.array(json.loads(data.decode('utf-8')), dtype=object)
+                else:
+                    chunk[name] = np.frombuffer(data, dtype='<' + column_type)
+            yield chunk
+
+
+def fetch_chunk(store, kind, start, end, projects, period, after, limit):
+    if kind == 'sessions':
+        return store.export_sessions(start, end, projects, after, limit)
+    if kind == 'window_intervals':
+        # Intervals are stored in epoch seconds
+        start_ts = datetime.strptime(start, TIME_FORMAT).timestamp() if start else None
+        end_ts = datetime.strptime(end, TIME_FORMAT).timestamp() if end else None
+        return store.export_window_intervals(start_ts, end_ts, projects, after, limit)
+    return store.export_rollups(period, start, end, projects, after, limit)
+
+
+def _save_progress(path, progress):
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(progress, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def export(store, path, kind='sessions', fmt=None, start=None, end=None, projects=None,
+           period='day', chunk_size=5000, resume=False):
+    """
+    Stream one table of the store to a file, a chunk at a time
+    kind: 'sessions', 'window_intervals' or 'rollups' (period 'day' or 'hour')
+    fmt: 'csv', 'ndjson' or 'columnar' (guessed from the file name by default);
+         a .gz path gzips each chunk as its own member
+    start/end: TIME_FORMAT bounds of the start time (or rollup bucket), end exclusive
+    projects: only these projects (all when empty)
+    resume: continue an interrupted export from its <path>.progress file
+
+    Memory use is bounded by chunk_size. After every chunk the file is synced and
+    the keyset position saved, so a resumed export truncates the partial chunk
+    and carries on. Returns the number of rows in the file.
+    """
+    fmt = fmt or guess_format(path)
+    if kind not in EXPORTS or fmt not in FORMATS:
+        raise ValueError(f"Unknown export {kind!r} / format {fmt!r}")
+    progress_path = path + ".progress"
+    settings = {
+        'kind': kind, 'format': fmt, 'start': start, 'end': end,
+        'projects': sorted(projects or []), 'period': period,
+    }
+
+    progress = None
+    if resume and os.path.exists(progress_path):
+        with open(progress_path, 'r', encoding='utf-8') as f:
+            progress = json.load(f)
+        if any(progress.get(key) != value for key, value in settings.items()):
+            raise ValueError(f"{progress_path} belongs to an export with different settings")
+    if progress is None:
+        progress = dict(settings, offset=0, after=None, rows=0)
+
+    encode = ENCODERS[fmt]
+    compress = path.endswith('.gz')
+    key = EXPORT_KEYS[kind]
+    with open(path, 'r+b' if progress['offset'] else 'wb') as f:
+        # Drop whatever was written after the last completed chunk
+        f.truncate(progress['offset'])
+        f.seek(progress['offset'])
+        while True:
+            after = tuple(progress['after']) if progress['after'] is not None else None
+            rows = fetch_chunk(store, kind, start, end, projects, period, after, chunk_size)
+            if not rows and progress['offset']:
+                break
+
+            data = encode(kind, rows, progress['offset'] == 0)
+            if compress:
+                data = gzip.compress(data)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+            progress['offset'] += len(data)
+            progress['rows'] += len(rows)
+            if rows:
+                progress['after'] = [rows[-1][column] for column in key]
+            _save_progress(progress_path, progress)
+            if len(rows) < chunk_size:
+                break
+
+    os.remove(progress_path)
+    return progress['rows']
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export tracked sessions in constant memory")
+    parser.add_argument('kind', choices=sorted(EXPORTS), help="what to export")
+    parser.add_argument('output', help="file to write (.csv, .ndjson, .wtc, optionally .gz)")
+    parser.add_argument('--format', choices=FORMATS, help="defaults to the output's extension")
+    parser.add_argument('--start', help="first day, YYYY-MM-DD")
+    parser.add_argument('--end', help="last day (inclusive), YYYY-MM-DD")
+    parser.add_argument('--project', action='append', help="only this project (repeatable)")
+    parser.add_argument('--period', choices=('day', 'hour'), default='day', help="rollup period")
+    parser.add_argument('--db', default="activity_log.db", help="session database")
+    parser.add_argument('--chunk-size', type=int, default=5000, help="rows per chunk")
+    parser.add_argument('--resume', action='store_true', help="continue an interrupted export")
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.start, "%Y-%m-%d").strftime(TIME_FORMAT) if args.start else None
+    end = (
+        (datetime.strptime(args.end, "%Y-%m-%d") + timedelta(days=1)).strftime(TIME_FORMAT)
+        if args.end else None
+    )
+
+    store = SessionStore(args.db, legacy_log=None)
+    try:
+        rows = export(store, args.output, args.kind, args.format, start, end, args.project,
+                      args.period, args.chunk_size, args.resume)
+        print(f"Exported {rows} {args.kind} rows to {args.output}")
+    finally:
+        store.close()
@@ -0,0 +1,66 @@
+import sys
+import time
+
+
+class FileLock:
+    """
+    Exclusive lock on a lock file, shared by every process using the same path
+    The operating system releases it when the process exits, so a crash never
+    leaves a stale lock behind.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def acquire(self, timeout=None):
+        """Take the lock, waiting up to timeout seconds (forever when None); returns whether it was taken"""
+        if self.file is not None:
+            return True
+        f = open(self.path, 'a+b')
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                _lock(f)
+                self.file = f
+                return True
+            except OSError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    f.close()
+                    return False
+                time.sleep(0.05)
+
+    def release(self):
+        if self.file is not None:
+            try:
+                _unlock(self.file)
+            finally:
+                self.file.close()
+                self.file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+if sys.platform == 'win32':
+    import msvcrt
+
+    def _lock(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+
+    def _unlock(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _lock(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _unlock(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,195 @@
+import queue
+import threading
+import tkinter as tk
+from collections import OrderedDict
+from tkinter import font as tkfont
+
+# Rows fetched per store query
+PAGE_SIZE = 200
+
+
+def session_row(session):
+    """One line of the History list for a session summary"""
+    text = f"{session['start_time']} - {session['project']} - {session['task']}"
+    if session.get('duration'):
+        text += f" ({session['duration']})"
+    if session.get('description') and session['description'].strip():
+        text += f" - {' '.join(session['description'].split())}"
+    if session.get('matched_seconds') is not None:
+        text += f" [matched {format_seconds(session['matched_seconds'])}]"
+    return text
+
+
+def format_seconds(seconds):
+    minutes = int(seconds // 60)
+    return f"{minutes // 60}h {minutes % 60}m"
+
+
+class HistoryView:
+    """
+    Virtualized session list: the Listbox only ever holds the rows in view
+    The scrollbar is mapped to the total row count and rows are fetched a page at
+    a time on a background thread, keeping at most max_pages pages in memory.
+    """
+
+    def __init__(self, parent, max_pages=20, **listbox_options):
+        self.listbox = tk.Listbox(parent, **listbox_options)
+        self.listbox.pack(side=tk.LEFT, fill="both", expand=True, padx=5)
+        self.scrollbar = tk.Scrollbar(parent, command=self.on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.row_height = tkfont.Font(font=self.listbox.cget('font')).metrics('linespace') + 1
+        self.max_pages = max_pages
+        self.count = None
+        self.fetch = None
+        self.on_count = None
+        self.total = None
+        self.top = 0
+        self.error = None
+        self.generation = 0
+        self.pages = OrderedDict()
+        self.requested = set()
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.polling = False
+
+        threading.Thread(target=self._worker, daemon=True).start()
+
+        self.listbox.bind('<Configure>', lambda event: self.render())
+        self.listbox.bind('<MouseWheel>', lambda event: self._scroll_units(-3 if event.delta > 0 else 3))
+        self.listbox.bind('<Button-4>', lambda event: self._scroll_units(-3))
+        self.listbox.bind('<Button-5>', lambda event: self._scroll_units(3))
+        self.listbox.bind('<Up>', lambda event: self._scroll_units(-1))
+        self.listbox.bind('<Down>', lambda event: self._scroll_units(1))
+        self.listbox.bind('<Prior>', lambda event: self._scroll_units(-self.visible_rows()))
+        self.listbox.bind('<Next>', lambda event: self._scroll_units(self.visible_rows()))
+
+    def set_query(self, count, fetch, on_count=None):
+        """
+        Show a new result set
+        count(): number of rows, or a dict with it in 'sessions'; fetch(offset, limit):
+        that slice of session summaries. Both run on the background thread.
+        on_count(result): called on the Tk thread with count()'s result
+        """
+        self.generation += 1
+        self.count = count
+        self.fetch = fetch
+        self.on_count = on_count
+        self.total = None
+        self.top = 0
+        self.error = None
+        self.pages.clear()
+        self.requested.clear()
+        self.requests.put((self.generation, 'count', None))
+        self._poll_soon()
+        self.render()
+
+    def refresh(self):
+        """Re-run the current query, e.g. after a session was saved"""
+        if self.count is not None:
+            top = self.top
+            self.set_query(self.count, self.fetch, self.on_count)
+            self.top = top
+
+    def visible_rows(self):
+        return max(1, self.listbox.winfo_height() // self.row_height)
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.top = int(float(amount) * (self.total or 0))
+            self.render()
+        elif unit == 'pages':
+            self._scroll_units(int(amount) * self.visible_rows())
+        else:
+            self._scroll_units(int(amount))
+
+    def _scroll_units(self, rows):
+        self.top += rows
+        self.render()
+        return "break"
+
+    def render(self):
+        """Fill the Listbox with just the rows in view, requesting pages not in memory"""
+        visible = self.visible_rows()
+        total = self.total or 0
+        self.top = max(0, min(self.top, total - visible))
+
+        if self.error is not None:
+            rows = [f"Error loading history: {self.error}"]
+        elif self.total is None:
+            rows = ["Loading history..."]
+        elif not total:
+            rows = ["No activity history found"]
+        else:
+            rows = []
+            for index in range(self.top, min(total, self.top + visible)):
+                page = self.pages.get(index // PAGE_SIZE)
+                if page is None:
+                    self._request(index // PAGE_SIZE)
+                    rows.append("Loading...")
+                else:
+                    self.pages.move_to_end(index // PAGE_SIZE)
+                    offset = index % PAGE_SIZE
+                    rows.append(session_row(page[offset]) if offset < len(page) else "")
+
+        self.listbox.delete(0, tk.END)
+        self.listbox.insert(tk.END, *rows)
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + visible) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _request(self, page):
+        if page not in self.requested:
+            self.requested.add(page)
+            self.requests.put((self.generation, 'page', page))
+            self._poll_soon()
+
+    def _worker(self):
+        while True:
+            generation, kind, page = self.requests.get()
+            if generation != self.generation:
+                continue  # The filters changed since this was requested
+            try:
+                if kind == 'count':
+                    result = self.count()
+                else:
+                    result = self.fetch(page * PAGE_SIZE, PAGE_SIZE)
+                self.results.put((generation, kind, page, result, None))
+            except Exception as e:
+                self.results.put((generation, kind, page, None, e))
+
+    def _poll_soon(self):
+        if not self.polling:
+            self.polling = True
+            self.listbox.after(20, self._poll)
+
+    def _poll(self):
+        """Apply finished queries on the Tk thread"""
+        self.polling = False
+        changed = False
+        while True:
+            try:
+                generation, kind, page, result, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self.generation:
+                continue
+            changed = True
+            if error is not None:
+                self.error = error
+            elif kind == 'count':
+                self.total = result['sessions'] if isinstance(result, dict) else result
+                if self.on_count is not None:
+                    self.on_count(result)
+            else:
+                self.pages[page] = result
+                while len(self.pages) > self.max_pages:
+                    evicted, _ = self.pages.popitem(last=False)
+                    self.requested.discard(evicted)
+
+        if changed:
+            self.render()
+        waiting = self.total is None or len(self.pages) < len(self.requested)
+        if waiting and self.error is None:
+            self._poll_soon()
@@ -0,0 +1,115 @@
+import threading
+import time
+
+from diagnostics import metrics
+
+
+class IdleDetector:
+    """
+    Records idle intervals: gaps between input events longer than the threshold
+    A single timer thread sleeps until the threshold could next be crossed
+    (last activity + threshold) and is re-armed by activity; it does not wake
+    up at all while nothing is being monitored or the user is already idle.
+    """
+
+    def __init__(self, threshold=60, on_idle=None):
+        """
+        threshold: seconds without input after which the user counts as idle
+        on_idle: optional callback(start) called by the timer thread when an idle interval begins
+        """
+        self.threshold = threshold
+        self.on_idle = on_idle
+        self.condition = threading.Condition()
+        self.is_running = False
+        self.last_activity = None
+        self.idle_since = None  # start of the current idle interval, set by the timer
+        self.intervals = []     # closed (start, end) idle intervals
+        self.idle_seconds = 0.0  # total length of the closed intervals
+        self.thread = None
+
+    def start(self, timestamp=None):
+        """Start monitoring (at session start); previous intervals are cleared"""
+        with self.condition:
+            self.is_running = True
+            self.last_activity = timestamp or time.time()
+            self.idle_since = None
+            self.intervals = []
+            self.idle_seconds = 0.0
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def stop(self, timestamp=None):
+        """Stop monitoring, closing an idle interval still open at timestamp"""
+        with self.condition:
+            if self.is_running:
+                self._close(timestamp or time.time())
+                self.is_running = False
+                self.condition.notify()
+
+    def activity(self, timestamp):
+        """Input seen at timestamp: ends the current idle interval and moves the deadline"""
+        with self.condition:
+            if not self.is_running or timestamp <= self.last_activity:
+                return
+            was_idle = self.idle_since is not None
+            self._close(timestamp)
+            self.last_activity = timestamp
+            # A sleeping timer only needs waking when it is waiting indefinitely;
+            # otherwise it finds the later deadline when it wakes up
+            if was_idle:
+                self.condition.notify()
+
+    def _close(self, timestamp):
+        """Record [last_activity, timestamp) if it is long enough to be idle"""
+        if timestamp - self.last_activity >= self.threshold:
+            self.intervals.append((self.last_activity, timestamp))
+            self.idle_seconds += timestamp - self.last_activity
+        self.idle_since = None
+
+    def total(self, now=None):
+        """Cumulative idle seconds, including the interval in progress"""
+        now = now or time.time()
+        with self.condition:
+            total = self.idle_seconds
+            if self.is_running and now - self.last_activity >= self.threshold:
+                total += now - self.last_activity
+        return total
+
+    def idle_intervals(self, now=None):
+        """Closed idle intervals plus the one in progress, ending at now"""
+        now = now or time.time()
+        with self.condition:
+            intervals = list(self.intervals)
+            if self.is_running and now - self.last_activity >= self.threshold:
+                intervals.append((self.last_activity, now))
+        return intervals
+
+    def is_idle(self, now=None):
+        now = now or time.time()
+        with self.condition:
+            return self.is_running and now - self.last_activity >= self.threshold
+
+    def _run(self):
+        while True:
+            with self.condition:
+                if not self.is_running or self.idle_since is not None:
+                    self.condition.wait()
+                    continue
+
+                remaining = self.last_activity + self.threshold - time.time()
+                if remaining > 0:
+                    self.condition.wait(remaining)
+                    continue
+
+                if metrics.enabled:
+                    metrics.record('lag.idle_timer', -remaining)
+                self.idle_since = self.last_activity
+                start = self.idle_since
+
+            if self.on_idle is not None:
+                try:
+                    self.on_idle(start)
+                except Exception as e:
+                    print(f"Error handling idle start: {e}")
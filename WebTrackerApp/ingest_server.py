@@ -0,0 +1,244 @@
+import argparse
+import gzip
+import hmac
+import io
+import json
+import queue
+import sqlite3
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Largest accepted request body, compressed and decompressed
+MAX_BODY_BYTES = 16 * 1024 ** 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    uid TEXT NOT NULL UNIQUE,
+    machine TEXT,
+    user TEXT,
+    project TEXT,
+    task TEXT,
+    description TEXT,
+    start_ts REAL,
+    end_ts REAL,
+    duration_seconds REAL,
+    mouse_clicks INTEGER,
+    key_strokes INTEGER,
+    idle_time INTEGER,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions(user, start_ts);
+CREATE INDEX IF NOT EXISTS idx_sessions_start ON sessions(start_ts);
+"""
+
+INSERT_COLUMNS = (
+    'uid', 'machine', 'user', 'project', 'task', 'description', 'start_ts', 'end_ts',
+    'duration_seconds', 'mouse_clicks', 'key_strokes', 'idle_time', 'details'
+)
+
+
+class ConnectionPool:
+    """Fixed set of SQLite connections shared by the request threads"""
+
+    def __init__(self, path, size=4):
+        self.connections = queue.Queue()
+        for _ in range(size):
+            conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            self.connections.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.connections.get()
+        try:
+            yield conn
+        finally:
+            self.connections.put(conn)
+
+    def close(self):
+        while not self.connections.empty():
+            self.connections.get_nowait().close()
+
+
+class TeamStore:
+    """Shared store of the sessions uploaded by every machine"""
+
+    def __init__(self, path="team_sessions.db", pool_size=4):
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        conn.close()
+        self.pool = ConnectionPool(path, pool_size)
+
+    def insert_sessions(self, records):
+        """Bulk insert uploaded sessions in one transaction; returns how many were new"""
+        rows = []
+        for record in records:
+            if not isinstance(record, dict) or not record.get('uid'):
+                raise ValueError("Every session needs a uid")
+            rows.append(tuple(
+                json.dumps(record.get('details') or {}) if column == 'details' else record.get(column)
+                for column in INSERT_COLUMNS
+            ))
+
+        with self.pool.connection() as conn:
+            before = conn.total_changes
+            with conn:
+                # Retried batches carry uids that are already stored
+                conn.executemany(
+                    f"INSERT OR IGNORE INTO sessions ({', '.join(INSERT_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' for _ in INSERT_COLUMNS)})",
+                    rows
+                )
+            return conn.total_changes - before
+
+    def sessions(self, start=None, end=None, user=None, limit=1000):
+        """Uploaded sessions starting in [start, end) (epoch seconds), newest first"""
+        clauses = []
+        params = []
+        if start is not None:
+            clauses.append("start_ts >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("start_ts < ?")
+            params.append(end)
+        if user:
+            clauses.append("user = ?")
+            params.append(user)
+        query = f"SELECT {', '.join(INSERT_COLUMNS[:-1])} FROM sessions"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY start_ts DESC LIMIT ?"
+        params.append(limit)
+
+        with self.pool.connection() as conn:
+            return [dict(row) for row in conn.execute(query, params)]
+
+    def totals(self, start=None, end=None):
+        """Per user and project totals across all machines"""
+        query = """
+            SELECT user, project, COUNT(*) AS sessions, SUM(duration_seconds) AS duration_seconds,
+                   SUM(mouse_clicks) AS mouse_clicks, SUM(key_strokes) AS key_strokes,
+                   SUM(idle_time) AS idle_time
+            FROM sessions WHERE start_ts >= ? AND start_ts < ?
+            GROUP BY user, project ORDER BY user, project
+        """
+        with self.pool.connection() as conn:
+            rows = conn.execute(query, (start or 0, end or float('inf'))).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        self.pool.close()
+
+
+class IngestHandler(BaseHTTPRequestHandler):
+    """
+    POST /sessions   gzip'd {"sessions": [...]} batch from uploader.SessionUploader
+    GET  /sessions   ?start=&end=&user=&limit=  uploaded sessions
+    GET  /totals     ?start=&end=  per user and project totals
+    """
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self):
+        token = self.server.token
+        if token and not hmac.compare_digest(self.headers.get('X-WebTracker-Token', ''), token):
+            self._send_json(401, {'error': "Invalid token"})
+            return False
+        return True
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/sessions':
+            self._send_json(404, {'error': "Not found"})
+            return
+        if not self._authorized():
+            return
+
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {'error': "Batch too large"})
+            return
+        body = self.rfile.read(length)
+
+        try:
+            if self.headers.get('Content-Encoding') == 'gzip':
+                with gzip.GzipFile(fileobj=io.BytesIO(body)) as f:
+                    body = f.read(MAX_BODY_BYTES + 1)
+                if len(body) > MAX_BODY_BYTES:
+                    self._send_json(413, {'error': "Batch too large"})
+                    return
+            sessions = json.loads(body.decode('utf-8'))['sessions']
+            inserted = self.server.store.insert_sessions(sessions)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {'error': f"Invalid batch: {e}"})
+            return
+        except sqlite3.Error as e:
+            self._send_json(503, {'error': f"Store unavailable: {e}"})
+            return
+
+        self._send_json(200, {'received': len(sessions), 'inserted': inserted})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if not self._authorized():
+            return
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        try:
+            start = float(params['start']) if 'start' in params else None
+            end = float(params['end']) if 'end' in params else None
+            if url.path == '/sessions':
+                result = self.server.store.sessions(
+                    start, end, params.get('user'), int(params.get('limit', 1000))
+                )
+            elif url.path == '/totals':
+                result = self.server.store.totals(start, end)
+            else:
+                self._send_json(404, {'error': "Not found"})
+                return
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        self._send_json(200, result)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class IngestServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, store, token=None):
+        super().__init__(address, IngestHandler)
+        self.store = store
+        self.token = token
+
+
+def serve(host="127.0.0.1", port=8765, path="team_sessions.db", pool_size=4, token=None):
+    """Create a server; call serve_forever() on it (in a thread for tests)"""
+    return IngestServer((host, port), TeamStore(path, pool_size), token)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collects sessions uploaded by WebTracker clients")
+    parser.add_argument('--host', default="127.0.0.1", help="interface to listen on")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--db', default="team_sessions.db", help="shared SQLite store")
+    parser.add_argument('--pool', type=int, default=4, help="database connections")
+    parser.add_argument('--token', help="shared secret clients must send")
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.db, args.pool, args.token)
+    print(f"WebTracker ingest server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.store.close()
+        print("\nIngest server stopped")
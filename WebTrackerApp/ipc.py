@@ -0,0 +1,194 @@
+import itertools
+import json
+import os
+import sys
+import threading
+from multiprocessing.connection import Listener, Client
+
+# Requests clients may send to the collector
+METHODS = ('start_session', 'stop_session', 'snapshot', 'configure', 'diagnostics')
+
+
+def default_address():
+    """$WEBTRACKER_IPC_ADDRESS, else a named pipe on Windows and a Unix socket in the home directory elsewhere"""
+    if os.environ.get('WEBTRACKER_IPC_ADDRESS'):
+        return os.environ['WEBTRACKER_IPC_ADDRESS']
+    if sys.platform == 'win32':
+        return r'\\.\pipe\webtracker'
+    return os.path.join(os.path.expanduser('~'), '.webtracker.sock')
+
+
+class JsonConnection:
+    """Sends and receives JSON messages over a multiprocessing connection (never pickles)"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.send_lock = threading.Lock()
+
+    def send(self, message):
+        data = json.dumps(message).encode('utf-8')
+        with self.send_lock:
+            self.conn.send_bytes(data)
+
+    def recv(self):
+        return json.loads(self.conn.recv_bytes().decode('utf-8'))
+
+    def close(self):
+        self.conn.close()
+
+
+class CollectorServer:
+    """Publishes a Collector's events to any number of local clients and serves their requests"""
+
+    def __init__(self, collector, address=None):
+        self.collector = collector
+        self.address = address or default_address()
+        self.listener = None
+
+    def serve_forever(self):
+        if sys.platform != 'win32' and os.path.exists(self.address):
+            # Left behind by a previous run; a live daemon would still accept connections
+            try:
+                Client(self.address).close()
+                raise RuntimeError(f"A collector is already listening on {self.address}")
+            except OSError:
+                os.remove(self.address)
+
+        if sys.platform == 'win32':
+            self.listener = Listener(self.address)
+        else:
+            # The socket is created owner-only, so no other user can connect before the chmod
+            previous_umask = os.umask(0o077)
+            try:
+                self.listener = Listener(self.address)
+            finally:
+                os.umask(previous_umask)
+            os.chmod(self.address, 0o600)
+
+        while True:
+            try:
+                conn = JsonConnection(self.listener.accept())
+            except OSError:
+                break
+            threading.Thread(target=self._handle_client, args=(conn,), daemon=True).start()
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.close()
+
+    def _handle_client(self, conn):
+        def on_event(event, data):
+            try:
+                conn.send({'type': 'event', 'event': event, 'data': data})
+            except (OSError, EOFError):
+                pass
+
+        self.collector.subscribe(on_event)
+        try:
+            on_event('counters', self.collector.snapshot())
+            while True:
+                request = conn.recv()
+                response = {'type': 'response', 'id': request.get('id')}
+                try:
+                    if request.get('method') not in METHODS:
+                        raise ValueError(f"Unknown method: {request.get('method')}")
+                    method = getattr(self.collector, request['method'])
+                    response['result'] = method(**request.get('params', {}))
+                except Exception as e:
+                    response['error'] = str(e)
+                conn.send(response)
+        except (OSError, EOFError, ValueError):
+            pass
+        finally:
+            self.collector.unsubscribe(on_event)
+            conn.close()
+
+
+class CollectorClient:
+    """
+    Thin client of a collector daemon with the same interface as Collector
+    Counter updates are pushed by the daemon, so snapshot() needs no round trip.
+    """
+
+    def __init__(self, address=None, timeout=10):
+        """
+        address: daemon address (default: default_address())
+        timeout: seconds to wait for a response before giving up
+        Raises OSError if no daemon is listening
+        """
+        self.conn = JsonConnection(Client(address or default_address()))
+        self.timeout = timeout
+        self.latest = {}
+        self.subscribers = []
+        self.pending = {}
+        self.request_ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.is_connected = True
+        self.reader = threading.Thread(target=self._read_loop, daemon=True)
+        self.reader.start()
+
+    def _read_loop(self):
+        try:
+            while True:
+                message = self.conn.recv()
+                if message['type'] == 'event':
+                    if message['event'] in ('counters', 'session_started'):
+                        self.latest = message['data']
+                    for callback in list(self.subscribers):
+                        callback(message['event'], message['data'])
+                elif message['type'] == 'response':
+                    with self.lock:
+                        waiter = self.pending.get(message['id'])
+                    if waiter is not None:
+                        waiter['response'] = message
+                        waiter['done'].set()
+        except (OSError, EOFError):
+            pass
+        finally:
+            self.is_connected = False
+            with self.lock:
+                for waiter in self.pending.values():
+                    waiter['done'].set()
+
+    def call(self, method, **params):
+        """Send a request to the daemon and return its result"""
+        request_id = next(self.request_ids)
+        waiter = {'done': threading.Event(), 'response': None}
+        with self.lock:
+            self.pending[request_id] = waiter
+        try:
+            self.conn.send({'type': 'request', 'id': request_id, 'method': method, 'params': params})
+            if not waiter['done'].wait(self.timeout) or waiter['response'] is None:
+                raise ConnectionError("No response from the collector daemon")
+        finally:
+            with self.lock:
+                self.pending.pop(request_id, None)
+
+        if 'error' in waiter['response']:
+            raise RuntimeError(waiter['response']['error'])
+        return waiter['response'].get('result')
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def snapshot(self):
+        return self.latest
+
+    def start_session(self, project, task, description):
+        return self.call('start_session', project=project, task=task, description=description)
+
+    def stop_session(self):
+        return self.call('stop_session')
+
+    def configure(self, **settings):
+        return self.call('configure', **settings)
+
+    def diagnostics(self, enable=None):
+        return self.call('diagnostics', enable=enable)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,76 @@
+import sys
+from array import array
+
+OTHER_KEY = "<other>"
+
+
+class KeyStats:
+    """Per-key press counts in a fixed-size table, with an optional ring buffer of recent keys"""
+
+    __slots__ = ('max_keys', 'codes', 'names', 'counts', 'recent', 'recent_index', 'recent_size')
+
+    def __init__(self, max_keys=256, recent_capacity=0):
+        """
+        max_keys: number of distinct keys counted individually; the rest share OTHER_KEY
+        recent_capacity: number of most recent keys remembered (0 disables the buffer)
+        """
+        self.max_keys = max_keys
+        self.codes = {OTHER_KEY: 0}
+        self.names = [OTHER_KEY]
+        self.counts = array('L', bytes(array('L').itemsize * max_keys))
+        self.recent = array('H', bytes(array('H').itemsize * recent_capacity))
+        self.recent_index = 0
+        self.recent_size = 0
+
+    def _intern(self, name):
+        """Assign the next free code to a key name, or the OTHER_KEY code when full"""
+        if len(self.names) >= self.max_keys:
+            return 0
+        code = len(self.names)
+        name = sys.intern(name)
+        self.names.append(name)
+        self.codes[name] = code
+        return code
+
+    def add(self, name):
+        """Count one press of a key"""
+        name = str(name)
+        code = self.codes.get(name)
+        if code is None:
+            code = self._intern(name)
+        self.counts[code] += 1
+
+        if self.recent:
+            self.recent[self.recent_index] = code
+            self.recent_index = (self.recent_index + 1) % len(self.recent)
+            self.recent_size = min(self.recent_size + 1, len(self.recent))
+
+    def clear(self):
+        """Reset all counts (interned key codes are kept)"""
+        for index in range(len(self.names)):
+            self.counts[index] = 0
+        self.recent_index = 0
+        self.recent_size = 0
+
+    def total(self):
+        return sum(self.counts)
+
+    def recent_keys(self, n=None):
+        """Return up to n of the most recent keys, oldest first"""
+        size = self.recent_size if n is None else min(n, self.recent_size)
+        capacity = len(self.recent)
+        start = self.recent_index - size
+        return [self.names[self.recent[(start + i) % capacity]] for i in range(size)]
+
+    def most_common(self, n=None):
+        """Return (key, count) pairs sorted by count, highest first"""
+        pairs = sorted(self.to_dict().items(), key=lambda x: x[1], reverse=True)
+        return pairs if n is None else pairs[:n]
+
+    def to_dict(self):
+        """Return the non-zero counts keyed by key name"""
+        return {
+            name: self.counts[code]
+            for code, name in enumerate(self.names)
+            if self.counts[code]
+        }
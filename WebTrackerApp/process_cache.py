@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+
+import psutil
+
+
+class ProcessCache:
+    """LRU cache of pid -> process name, re-checked against the process create time now and then"""
+
+    def __init__(self, max_size=256, revalidate_interval=30):
+        """
+        max_size: number of processes remembered before the least recently used is evicted
+        revalidate_interval: seconds an entry is trusted before its create time is read again
+                             to detect a reused pid
+        """
+        self.max_size = max_size
+        self.revalidate_interval = revalidate_interval
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reused = 0
+        self.evictions = 0
+
+    def name(self, pid):
+        """Return the name of a process, or "unknown" if it cannot be read"""
+        with self.lock:
+            entry = self.entries.get(pid)
+
+        now = time.monotonic()
+        if entry is not None:
+            create_time, name, validated = entry
+            if now - validated < self.revalidate_interval:
+                with self.lock:
+                    self.entries.move_to_end(pid)
+                    self.hits += 1
+                return name
+            # A reused pid belongs to a process with another create time
+            try:
+                same = psutil.Process(pid).create_time() == create_time
+            except (psutil.Error, ValueError):
+                same = False
+            if same:
+                with self.lock:
+                    self.entries[pid] = (create_time, name, now)
+                    self.entries.move_to_end(pid)
+                    self.hits += 1
+                return name
+            with self.lock:
+                self.reused += 1
+
+        try:
+            process = psutil.Process(pid)
+            name = process.name()
+            create_time = process.create_time()
+        except (psutil.Error, ValueError):
+            return "unknown"
+
+        with self.lock:
+            self.misses += 1
+            self.entries[pid] = (create_time, name, now)
+            self.entries.move_to_end(pid)
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return name
+
+    def stats(self):
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'reused_pids': self.reused,
+                'evictions': self.evictions,
+                'size': len(self.entries),
+            }
+
+
+class WindowHandleCache:
+    """Remembers the (pid, title) lookup of the last window handle until it changes"""
+
+    def __init__(self):
+        self.handle = None
+        self.value = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, handle, lookup):
+        """Return the cached value for handle, calling lookup(handle) when it changed"""
+        if handle == self.handle and self.value is not None:
+            self.hits += 1
+            return self.value
+
+        self.misses += 1
+        self.value = lookup(handle)
+        self.handle = handle
+        return self.value
+
+    def invalidate(self):
+        """Forget the cached value (e.g. after the window title changed)"""
+        self.handle = None
+        self.value = None
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,248 @@
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from diagnostics import metrics
+
+# Supported output formats and their file extensions
+FORMATS = {
+    'PNG': '.png',
+    'JPEG': '.jpg',
+    'WEBP': '.webp',
+}
+
+# Format that stores frames as deduplicated tiles in a TileStore
+TILES = 'TILES'
+
+
+def tile_signatures(image, tile_size, cell=8):
+    """
+    Perceptual signature of each tile of a frame, row by row: the tile shrunk to
+    cell x cell grayscale pixels, so each value averages a block of screen pixels
+    """
+    from PIL import Image
+
+    columns = (image.width + tile_size - 1) // tile_size
+    rows = (image.height + tile_size - 1) // tile_size
+    # One resize of the whole frame instead of one per tile
+    data = image.convert('L').resize((columns * cell, rows * cell), Image.BOX).tobytes()
+    stride = columns * cell
+    return [
+        b''.join(
+            data[(row * cell + y) * stride + column * cell:(row * cell + y) * stride + (column + 1) * cell]
+            for y in range(cell)
+        )
+        for row in range(rows)
+        for column in range(columns)
+    ]
+
+
+def changed_tiles(a, b, tolerance=0):
+    """
+    Number of tiles differing between two frames' signature lists (all of them if the
+    sizes differ); a tile differs when some thumbnail pixel moved by more than tolerance
+    """
+    if len(a) != len(b):
+        return max(len(a), len(b))
+    return sum(1 for x, y in zip(a, b) if x != y and max(abs(p - q) for p, q in zip(x, y)) > tolerance)
+
+
+class ScreenshotEncoder:
+    """Scales, encodes and saves captured frames on a bounded pool of worker threads"""
+
+    def __init__(self, folder, image_format='PNG', quality=80, scale=1.0, workers=1,
+                 max_pending=4, skip_duplicates=True, max_changed_tiles=2, tile_tolerance=8, tile_size=64,
+                 tile_store=None,
+                 max_bytes=1024 ** 3, max_age_days=30, compaction_interval=3600):
+        """
+        folder: directory the encoded screenshots are written to
+        image_format: 'PNG', 'JPEG', 'WEBP' or TILES
+        quality: 1-100, used by JPEG and WEBP
+        scale: downscale factor applied before encoding (1.0 keeps full resolution)
+        workers: number of encoding threads
+        max_pending: frames waiting to be encoded before new frames are dropped
+        skip_duplicates: skip frames unchanged since the last saved one
+        max_changed_tiles: tiles that may differ for a frame to still count as unchanged, so a
+                           ticking clock or blinking caret alone does not save a new frame
+                           (changes add up: frames are compared with the last saved one)
+        tile_tolerance: brightness change (0-255) of a tile's 8x8 thumbnail pixels ignored as noise
+        tile_size: width and height in pixels of the tiles frames are compared by
+        tile_store: TileStore receiving frames when image_format is TILES
+        max_bytes: disk quota shared by the encoded files and the tile store (None: no limit)
+        max_age_days: screenshots older than this are deleted by compaction (None keeps them)
+        compaction_interval: seconds between background compactions
+        """
+        self.folder = Path(folder)
+        self.image_format = image_format
+        self.quality = quality
+        self.scale = scale
+        self.skip_duplicates = skip_duplicates
+        self.max_changed_tiles = max_changed_tiles
+        self.tile_tolerance = tile_tolerance
+        self.tile_size = tile_size
+        self.worker_count = workers
+        self.tile_store = tile_store
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.compaction_interval = compaction_interval
+        self.compaction_thread = None
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.workers = []
+        self.lock = threading.Lock()
+        self.last_tiles = None
+        self.saved = 0
+        self.skipped = 0
+        self.dropped = 0
+
+    def start(self):
+        """Start the worker threads (no-op if they are already running)"""
+        with self.lock:
+            self.workers = [worker for worker in self.workers if worker.is_alive()]
+            while len(self.workers) < self.worker_count:
+                worker = threading.Thread(target=self._worker, daemon=True)
+                worker.start()
+                self.workers.append(worker)
+
+    def submit(self, image, timestamp=None):
+        """
+        Queue a captured frame for encoding without blocking the caller
+        Returns False if the frame was dropped because the pool is busy
+        """
+        timestamp = timestamp or datetime.now()
+        try:
+            self.queue.put_nowait((image, timestamp))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _worker(self):
+        while True:
+            image, timestamp = self.queue.get()
+            try:
+                enabled = metrics.enabled
+                if enabled:
+                    t0 = time.perf_counter()
+                self.encode(image, timestamp)
+                if enabled:
+                    metrics.record('screenshot.encode', time.perf_counter() - t0)
+            except Exception as e:
+                print(f"Error encoding screenshot: {e}")
+            finally:
+                self.queue.task_done()
+
+    def is_duplicate(self, image):
+        """
+        Check a frame tile by tile against the last saved one, remembering it if it differs
+        Tiles are compared by perceptual signature, not content hash: frames saved to a
+        tile store are hashed once, by the store.
+        """
+        tiles = tile_signatures(image, self.tile_size)
+        with self.lock:
+            if (self.last_tiles is not None
+                    and changed_tiles(tiles, self.last_tiles, self.tile_tolerance) <= self.max_changed_tiles):
+                return True
+            self.last_tiles = tiles
+        return False
+
+    def encode(self, image, timestamp):
+        """Encode and save one frame; returns the file name (or tile frame id), or None if it was skipped"""
+        if self.skip_duplicates and self.is_duplicate(image):
+            self.skipped += 1
+            return None
+
+        if self.scale != 1.0:
+            from PIL import Image
+
+            size = (max(1, int(image.width * self.scale)), max(1, int(image.height * self.scale)))
+            image = image.resize(size, Image.LANCZOS)
+
+        image_format = self.image_format.upper()
+        if image_format == TILES:
+            frame_id = self.tile_store.save_frame(image, timestamp)
+            self.saved += 1
+            return frame_id
+
+        if image_format == 'JPEG':
+            image = image.convert('RGB')
+            options = {'quality': self.quality, 'optimize': True}
+        elif image_format == 'WEBP':
+            options = {'quality': self.quality, 'method': 4}
+        else:
+            options = {'optimize': True}
+
+        self.folder.mkdir(exist_ok=True)
+        filename = self.folder / f"screenshot_{timestamp.strftime('%Y%m%d_%H%M%S')}{FORMATS[image_format]}"
+        image.save(filename, image_format, **options)
+        self.saved += 1
+        print(f"Screenshot saved: {filename}")
+        return filename
+
+    def encoded_files(self):
+        """Return the encoded screenshot files, oldest first"""
+        if not self.folder.exists():
+            return []
+        extensions = set(FORMATS.values())
+        return sorted(
+            path for path in self.folder.glob("screenshot_*")
+            if path.suffix in extensions and path.is_file()
+        )
+
+    def compact(self):
+        """
+        Enforce the age and size quota on everything saved so far: the tile store is
+        compacted first, then the oldest encoded files are deleted until both fit
+        """
+        tile_bytes = 0
+        if self.tile_store is not None:
+            self.tile_store.max_bytes = self.max_bytes
+            self.tile_store.max_age_days = self.max_age_days
+            tile_bytes = self.tile_store.compact()['bytes']
+
+        files = []
+        removed_files = 0
+        cutoff = time.time() - self.max_age_days * 86400 if self.max_age_days is not None else None
+        for path in self.encoded_files():
+            stat = path.stat()
+            if cutoff is not None and stat.st_mtime < cutoff:
+                path.unlink()
+                removed_files += 1
+            else:
+                files.append((path, stat.st_size))
+
+        file_bytes = sum(size for _, size in files)
+        while files and self.max_bytes is not None and tile_bytes + file_bytes > self.max_bytes:
+            path, size = files.pop(0)
+            path.unlink()
+            removed_files += 1
+            file_bytes -= size
+
+        return {'removed_files': removed_files, 'bytes': tile_bytes + file_bytes}
+
+    def _compaction_loop(self):
+        while True:
+            try:
+                t0 = time.perf_counter()
+                self.compact()
+                if metrics.enabled:
+                    metrics.record('screenshot.compact', time.perf_counter() - t0)
+            except Exception as e:
+                print(f"Error compacting screenshots: {e}")
+            time.sleep(self.compaction_interval)
+
+    def start_compaction(self):
+        """Run compact() now and every compaction_interval seconds on a background thread"""
+        with self.lock:
+            if self.compaction_thread is None or not self.compaction_thread.is_alive():
+                self.compaction_thread = threading.Thread(target=self._compaction_loop, daemon=True)
+                self.compaction_thread.start()
+
+    def stats(self):
+        return {
+            'saved': self.saved,
+            'skipped': self.skipped,
+            'dropped': self.dropped,
+            'pending': self.queue.qsize(),
+        }
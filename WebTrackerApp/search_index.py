@@ -0,0 +1,61 @@
+import re
+
+# Longer "words" are hashes, base64 blobs and the like, not worth indexing
+MAX_TERM_LENGTH = 64
+
+TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Lower-cased word terms of a piece of text (single characters are dropped)"""
+    if not text:
+        return []
+    return [
+        term for term in TOKEN.findall(str(text).lower())
+        if 2 <= len(term) <= MAX_TERM_LENGTH
+    ]
+
+
+def window_seconds(usage):
+    """Seconds from a window_usage entry ({'total_seconds': ...} or a plain number in old records)"""
+    if isinstance(usage, dict):
+        return float(usage.get('total_seconds') or usage.get('time') or 0)
+    try:
+        return float(usage or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def session_terms(project, task, description, session_seconds, window_usage):
+    """
+    Terms of one completed session with the seconds spent on each
+    Window terms count the time their windows were in front; project, task and
+    description terms count the whole session.
+    """
+    terms = {}
+    for window, usage in (window_usage or {}).items():
+        seconds = window_seconds(usage)
+        # "process - title": a window's repeated words are counted once
+        for term in set(tokenize(window)):
+            terms[term] = terms.get(term, 0.0) + seconds
+
+    for text in (project, task, description):
+        for term in tokenize(text):
+            terms[term] = max(terms.get(term, 0.0), session_seconds)
+
+    return {term: min(seconds, session_seconds) if session_seconds else seconds
+            for term, seconds in terms.items()}
+
+
+def parse_query(text):
+    """
+    Split a search box query into (term, is_prefix) pairs, all of which must match
+    A trailing * makes a word a prefix query: "invoic*" matches invoice and invoicing.
+    """
+    parsed = []
+    for word in str(text or '').split():
+        prefix = word.endswith('*')
+        terms = tokenize(word.rstrip('*'))
+        for index, term in enumerate(terms):
+            parsed.append((term, prefix and index == len(terms) - 1))
+    return parsed
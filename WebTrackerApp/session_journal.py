@@ -0,0 +1,188 @@
+import json
+import os
+import threading
+import time
+
+import psutil
+
+
+def current_owner():
+    """[pid, create time] of this process, identifying it even after its pid is reused"""
+    return [os.getpid(), psutil.Process().create_time()]
+
+
+def owner_alive(owner):
+    """Whether the process that wrote a journal record is still running"""
+    if not owner:
+        return False
+    try:
+        return psutil.Process(owner[0]).create_time() == owner[1]
+    except (psutil.Error, ValueError):
+        return False
+
+
+def merge_intervals(merged, intervals):
+    """
+    Add (start, end, process, title) intervals to merged, a {(start, process, title): end}
+    dict; an interval seen again (still open at an earlier checkpoint) keeps its latest end
+    """
+    for start, end, process, title in intervals:
+        key = (start, process, title)
+        previous = merged.get(key)
+        if previous is None or end > previous:
+            merged[key] = end
+
+
+def merged_intervals(merged):
+    return [[start, end, process, title] for (start, process, title), end in merged.items()]
+
+
+class SessionJournal:
+    """
+    Append-only JSON-lines journal of the sessions being logged
+    Each checkpoint holds the end record a session would be saved with if it
+    stopped at that moment, so a session cut short by a crash can be closed
+    from its last checkpoint on the next launch. Records carry the process that
+    owns the session: recovery leaves the sessions of live processes alone.
+    Window intervals are written incrementally: a checkpoint holds only those
+    added since the previous one, and reading merges them back together.
+    """
+
+    def __init__(self, path="session_journal.log", checkpoint_interval=30, max_bytes=4 * 1024 ** 2):
+        """
+        path: journal file
+        checkpoint_interval: seconds between checkpoints of the running session
+        max_bytes: size above which the journal is rewritten with only the latest checkpoints
+        """
+        self.path = path
+        self.checkpoint_interval = checkpoint_interval
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.latest = {}  # session id -> last checkpoint record
+        self.intervals = {}  # session id -> merged window intervals of its checkpoints
+        self.owner = current_owner()
+        self.file = None
+
+    def _open(self):
+        if self.file is None:
+            self.file = open(self.path, 'a', encoding='utf-8')
+        return self.file
+
+    def _write(self, lines):
+        """Append lines with a single write and fsync"""
+        f = self._open()
+        f.write(''.join(lines))
+        f.flush()
+        os.fsync(f.fileno())
+
+    def _rewrite(self):
+        """Replace the journal with the latest checkpoint of each open session"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(self._full_record(record)) + "\n" for record in self.latest.values()))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+    def _full_record(self, record):
+        """record with every window interval of its session, not just the latest ones"""
+        merged = self.intervals.get(record['session_id'])
+        if not merged or record['data'] is None:
+            return record
+        return dict(record, data=dict(record['data'], window_intervals=merged_intervals(merged)))
+
+    def begin(self, session_id):
+        """Claim a newly started session for this process, before its first checkpoint"""
+        self.checkpoint(session_id, None)
+
+    def checkpoint(self, session_id, data):
+        """
+        Durably record the current state of a running session (data None: nothing counted yet)
+        data['window_intervals'] only needs the intervals added since the previous checkpoint.
+        """
+        record = {'session_id': session_id, 'owner': self.owner, 'checkpoint_time': time.time(), 'data': data}
+        with self.lock:
+            self.latest[session_id] = record
+            if data is not None:
+                merge_intervals(self.intervals.setdefault(session_id, {}), data.get('window_intervals', ()))
+            self._write([json.dumps(record) + "\n"])
+            if self.file.tell() > self.max_bytes:
+                self._rewrite()
+
+    def end(self, session_id):
+        """Forget a session once its end record is saved"""
+        with self.lock:
+            self.latest.pop(session_id, None)
+            self.intervals.pop(session_id, None)
+            self._rewrite()
+
+    def read(self):
+        """
+        Return the last checkpoint of every session in the journal, with the window
+        intervals of all its checkpoints (torn lines are skipped)
+        """
+        records = {}
+        intervals = {}
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                records[record['session_id']] = record
+                if record['data'] is not None:
+                    merge_intervals(intervals.setdefault(record['session_id'], {}),
+                                    record['data'].get('window_intervals', ()))
+
+        for session_id, merged in intervals.items():
+            record = records[session_id]
+            if record['data'] is not None:
+                record['data']['window_intervals'] = merged_intervals(merged)
+        return records
+
+    def recover(self, store):
+        """
+        Close the sessions a previous run left open in store, using their last
+        checkpoint when there is one; returns the ids of the closed sessions
+        Sessions owned by another process that is still running are kept open.
+        """
+        with self.lock:
+            records = self.read()
+            recovered = []
+            kept = {}
+            for session in store.open_sessions():
+                record = records.get(session['id'])
+                if record is not None and record.get('owner') != self.owner and owner_alive(record.get('owner')):
+                    kept[session['id']] = record
+                    continue
+                if record is not None and record['data'] is not None:
+                    data = record['data']
+                else:
+                    # Crashed before the first checkpoint: nothing was counted
+                    data = {'end_time': session['start_time'], 'duration': "0h 0m"}
+                try:
+                    store.end_session(session['id'], data)
+                    recovered.append(session['id'])
+                except Exception as e:
+                    print(f"Error recovering session {session['id']}: {e}")
+
+            # The live owners' records stay in the journal until they end their sessions
+            self.latest = kept
+            self.intervals = {}
+            for session_id, record in kept.items():
+                if record['data'] is not None:
+                    merge_intervals(self.intervals.setdefault(session_id, {}),
+                                    record['data'].get('window_intervals', ()))
+            self._rewrite()
+        return recovered
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
@@ -0,0 +1,749 @@
+import sqlite3
+import threading
+import json
+import os
+import bisect
+from collections import Counter
+from datetime import datetime, timedelta
+from search_index import parse_query, session_terms
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Columns needed to list sessions; the bulky per-session payloads
+# (key_counts, window_usage) are only read by get_session()
+SUMMARY_COLUMNS = (
+    "id, project, task, description, start_time, end_time, duration, "
+    "mouse_clicks, key_strokes, idle_time"
+)
+
+# Each entry upgrades the schema by one version (tracked in PRAGMA user_version)
+MIGRATIONS = [
+    """
+    CREATE TABLE sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        project TEXT,
+        task TEXT,
+        description TEXT,
+        start_time TEXT NOT NULL,
+        end_time TEXT,
+        duration TEXT,
+        mouse_clicks INTEGER DEFAULT 0,
+        key_strokes INTEGER DEFAULT 0,
+        idle_time INTEGER DEFAULT 0,
+        pressed_keys TEXT,
+        window_usage TEXT
+    );
+    CREATE INDEX idx_sessions_start_time ON sessions(start_time);
+    CREATE INDEX idx_sessions_project ON sessions(project, start_time);
+    CREATE INDEX idx_sessions_task ON sessions(task, start_time);
+    CREATE TABLE meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+    """,
+    """
+    CREATE TABLE rollup_hourly (
+        bucket TEXT NOT NULL,
+        project TEXT NOT NULL,
+        task TEXT NOT NULL,
+        sessions INTEGER DEFAULT 0,
+        active_seconds INTEGER DEFAULT 0,
+        mouse_clicks INTEGER DEFAULT 0,
+        key_strokes INTEGER DEFAULT 0,
+        idle_time INTEGER DEFAULT 0,
+        seq INTEGER NOT NULL,
+        PRIMARY KEY (bucket, project, task)
+    );
+    CREATE INDEX idx_rollup_hourly_seq ON rollup_hourly(seq);
+    CREATE TABLE rollup_daily (
+        bucket TEXT NOT NULL,
+        project TEXT NOT NULL,
+        task TEXT NOT NULL,
+        sessions INTEGER DEFAULT 0,
+        active_seconds INTEGER DEFAULT 0,
+        mouse_clicks INTEGER DEFAULT 0,
+        key_strokes INTEGER DEFAULT 0,
+        idle_time INTEGER DEFAULT 0,
+        seq INTEGER NOT NULL,
+        PRIMARY KEY (bucket, project, task)
+    );
+    CREATE INDEX idx_rollup_daily_seq ON rollup_daily(seq);
+    INSERT INTO rollup_hourly
+    SELECT substr(start_time, 1, 13) || ':00:00', COALESCE(project, ''), COALESCE(task, ''),
+           COUNT(*), SUM(strftime('%s', end_time) - strftime('%s', start_time)),
+           SUM(mouse_clicks), SUM(key_strokes), SUM(idle_time), 1
+    FROM sessions WHERE end_time IS NOT NULL GROUP BY 1, 2, 3;
+    INSERT INTO rollup_daily
+    SELECT substr(start_time, 1, 10), COALESCE(project, ''), COALESCE(task, ''),
+           COUNT(*), SUM(strftime('%s', end_time) - strftime('%s', start_time)),
+           SUM(mouse_clicks), SUM(key_strokes), SUM(idle_time), 1
+    FROM sessions WHERE end_time IS NOT NULL GROUP BY 1, 2, 3;
+    INSERT OR REPLACE INTO meta (key, value) VALUES ('rollup_seq', '1');
+    """,
+    """
+    ALTER TABLE sessions ADD COLUMN key_counts TEXT;
+    UPDATE sessions SET key_counts = (
+        SELECT json_group_object(value, n)
+        FROM (SELECT value, COUNT(*) AS n FROM json_each(sessions.pressed_keys) GROUP BY value)
+    )
+    WHERE pressed_keys IS NOT NULL;
+    ALTER TABLE sessions DROP COLUMN pressed_keys;
+    """,
+    """
+    CREATE TABLE windows (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        process TEXT NOT NULL,
+        title TEXT NOT NULL,
+        UNIQUE (process, title)
+    );
+    CREATE TABLE window_intervals (
+        session_id INTEGER NOT NULL,
+        start_ts REAL NOT NULL,
+        end_ts REAL NOT NULL,
+        window_id INTEGER NOT NULL
+    );
+    CREATE INDEX idx_window_intervals_start ON window_intervals(start_ts);
+    CREATE INDEX idx_window_intervals_session ON window_intervals(session_id);
+    """,
+    """
+    CREATE TABLE idle_intervals (
+        session_id INTEGER NOT NULL,
+        start_ts REAL NOT NULL,
+        end_ts REAL NOT NULL
+    );
+    CREATE INDEX idx_idle_intervals_start ON idle_intervals(start_ts);
+    CREATE INDEX idx_idle_intervals_session ON idle_intervals(session_id);
+    """,
+    # Inverted index for search(): prefix queries are range scans on the unique term index
+    """
+    CREATE TABLE search_terms (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        term TEXT NOT NULL UNIQUE
+    );
+    CREATE TABLE search_postings (
+        term_id INTEGER NOT NULL,
+        session_id INTEGER NOT NULL,
+        seconds REAL NOT NULL,
+        PRIMARY KEY (term_id, session_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX idx_search_postings_session ON search_postings(session_id);
+    """,
+]
+
+# Rollup tables by period, with the start_time prefix and suffix forming their bucket
+ROLLUP_PERIODS = {
+    'hour': ('rollup_hourly', 13, ':00:00'),
+    'day': ('rollup_daily', 10, ''),
+}
+
+ROLLUP_STEPS = {'hour': timedelta(hours=1), 'day': timedelta(days=1)}
+
+ROLLUP_COLUMNS = ('sessions', 'active_seconds', 'mouse_clicks', 'key_strokes', 'idle_time')
+
+# Window and idle intervals never span more than a session, so this bounds how far
+# before a range an overlapping interval can start (keeps range queries on the index)
+MAX_INTERVAL_SECONDS = 7 * 24 * 3600
+
+
+def active_seconds(start_time, end_time):
+    """Whole seconds between two TIME_FORMAT times (0 if either is missing or malformed)"""
+    try:
+        return int((
+            datetime.strptime(end_time, TIME_FORMAT) - datetime.strptime(start_time, TIME_FORMAT)
+        ).total_seconds())
+    except (TypeError, ValueError):
+        return 0
+
+
+def split_by_period(start_time, end_time, period):
+    """
+    [(bucket, seconds)] of each hour or day bucket a session covers, oldest first
+    A session without a readable, positive duration lies wholly in its start bucket.
+    """
+    table, length, suffix = ROLLUP_PERIODS[period]
+    first = start_time[:length] + suffix
+    try:
+        start = datetime.strptime(start_time, TIME_FORMAT)
+        end = datetime.strptime(end_time, TIME_FORMAT)
+    except (TypeError, ValueError):
+        return [(first, 0)]
+    if end <= start:
+        return [(first, 0)]
+
+    pieces = []
+    bucket = datetime.strptime(first, TIME_FORMAT if period == 'hour' else "%Y-%m-%d")
+    while bucket < end:
+        next_bucket = bucket + ROLLUP_STEPS[period]
+        seconds = int((min(end, next_bucket) - max(start, bucket)).total_seconds())
+        pieces.append((bucket.strftime(TIME_FORMAT)[:length] + suffix, seconds))
+        bucket = next_bucket
+    return pieces
+
+
+class SessionStore:
+    def __init__(self, path="activity_log.db", legacy_log="activity_log.json"):
+        """
+        Open (or create) the session database
+        path: SQLite file holding the sessions
+        legacy_log: JSON-lines log imported once on first open
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        # The collector daemon writes while GUI clients read the same file
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._migrate()
+        self._index_existing_sessions()
+        self._split_existing_rollups()
+
+        if legacy_log and os.path.exists(legacy_log):
+            self.import_legacy_log(legacy_log)
+
+    def _migrate(self):
+        """Bring the schema up to the latest version"""
+        with self.lock:
+            version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+            for index in range(version, len(MIGRATIONS)):
+                self.conn.executescript(MIGRATIONS[index])
+                self.conn.execute(f"PRAGMA user_version = {index + 1}")
+            self.conn.commit()
+
+    def _get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+        )
+
+    def _index_existing_sessions(self):
+        """Add sessions completed before the search index existed (runs once)"""
+        with self.lock:
+            if self._get_meta("search_indexed"):
+                return
+            rows = self.conn.execute(
+                "SELECT id, project, task, description, start_time, end_time, window_usage "
+                "FROM sessions WHERE end_time IS NOT NULL"
+            ).fetchall()
+            for row in rows:
+                try:
+                    window_usage = json.loads(row['window_usage'] or '{}')
+                except ValueError:
+                    window_usage = {}
+                self._index_session(row['id'], row, dict(row, window_usage=window_usage))
+            self._set_meta("search_indexed", "1")
+            self.conn.commit()
+
+    def _split_existing_rollups(self):
+        """Rebuild rollups that credited whole sessions to their start hour and day (runs once)"""
+        with self.lock:
+            if self._get_meta("rollups_split"):
+                return
+            for table, _, _ in ROLLUP_PERIODS.values():
+                self.conn.execute(f"DELETE FROM {table}")
+            rows = self.conn.execute(
+                "SELECT project, task, start_time, end_time, mouse_clicks, key_strokes, idle_time "
+                "FROM sessions WHERE end_time IS NOT NULL"
+            ).fetchall()
+            for row in rows:
+                self._apply_rollups(row['project'], row['task'], row['start_time'], dict(row))
+            self._set_meta("rollups_split", "1")
+            self.conn.commit()
+
+    def import_legacy_log(self, filename):
+        """Import start/end record pairs from the old activity_log.json (runs once)"""
+        with self.lock:
+            if self._get_meta("legacy_imported"):
+                return
+
+            session_id = None
+            with open(filename, 'r') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        data = json.loads(line)
+                    except ValueError:
+                        continue
+
+                    if 'start_time' in data:
+                        session_id = self._insert_start(
+                            data.get('project'), data.get('task'),
+                            data.get('description'), data['start_time']
+                        )
+                    elif 'end_time' in data and session_id is not None:
+                        data['key_counts'] = dict(Counter(data.pop('pressed_keys', [])))
+                        self._update_end(session_id, data)
+                        session_id = None
+
+            self._set_meta("legacy_imported", filename)
+            self.conn.commit()
+
+    def _insert_start(self, project, task, description, start_time):
+        cursor = self.conn.execute(
+            "INSERT INTO sessions (project, task, description, start_time) VALUES (?, ?, ?, ?)",
+            (project, task, description, start_time)
+        )
+        return cursor.lastrowid
+
+    def _update_end(self, session_id, data):
+        row = self.conn.execute(
+            "SELECT project, task, description, start_time, end_time, mouse_clicks, key_strokes, idle_time "
+            "FROM sessions WHERE id = ?",
+            (session_id,)
+        ).fetchone()
+        if row is None:
+            return
+        if row['end_time'] is not None:
+            # Ended before, e.g. closed from a checkpoint by recovery: this record replaces that one
+            self._remove_session_details(session_id, row)
+
+        self.conn.execute(
+            """
+            UPDATE sessions
+            SET end_time = ?, duration = ?, mouse_clicks = ?, key_strokes = ?,
+                idle_time = ?, key_counts = ?, window_usage = ?
+            WHERE id = ?
+            """,
+            (
+                data['end_time'],
+                data.get('duration'),
+                data.get('mouse_clicks', 0),
+                data.get('key_strokes', 0),
+                data.get('idle_time', 0),
+                json.dumps(data.get('key_counts', {})),
+                json.dumps(data.get('window_usage', {})),
+                session_id,
+            )
+        )
+
+        self._apply_rollups(row['project'], row['task'], row['start_time'], data)
+        self._index_session(session_id, row, data)
+        self._insert_intervals(session_id, data.get('window_intervals', ()))
+        self.conn.executemany(
+            "INSERT INTO idle_intervals (session_id, start_ts, end_ts) VALUES (?, ?, ?)",
+            [(session_id, start, end) for start, end in data.get('idle_intervals', ())]
+        )
+
+    def _remove_session_details(self, session_id, row):
+        """Take an ended session back out of the rollups, the search index and the interval tables"""
+        self._apply_rollups(row['project'], row['task'], row['start_time'], dict(row), sign=-1)
+        for table in ('search_postings', 'window_intervals', 'idle_intervals'):
+            self.conn.execute(f"DELETE FROM {table} WHERE session_id = ?", (session_id,))
+
+    def _window_id(self, process, title):
+        """Intern a (process, title) pair in the windows table"""
+        self.conn.execute(
+            "INSERT OR IGNORE INTO windows (process, title) VALUES (?, ?)", (process, title)
+        )
+        return self.conn.execute(
+            "SELECT id FROM windows WHERE process = ? AND title = ?", (process, title)
+        ).fetchone()[0]
+
+    def _insert_intervals(self, session_id, intervals):
+        window_ids = {}
+        rows = []
+        for start, end, process, title in intervals:
+            window_id = window_ids.get((process, title))
+            if window_id is None:
+                window_id = window_ids[(process, title)] = self._window_id(process, title)
+            rows.append((session_id, start, end, window_id))
+        self.conn.executemany(
+            "INSERT INTO window_intervals (session_id, start_ts, end_ts, window_id) VALUES (?, ?, ?, ?)",
+            rows
+        )
+
+    def _index_session(self, session_id, row, data):
+        """Add one completed session's window, project, task and description terms to the search index"""
+        terms = session_terms(
+            row['project'], row['task'], row['description'],
+            max(0, active_seconds(row['start_time'], data['end_time'])), data.get('window_usage')
+        )
+        if not terms:
+            return
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO search_terms (term) VALUES (?)", [(term,) for term in terms]
+        )
+        self.conn.executemany(
+            """
+            INSERT OR REPLACE INTO search_postings (term_id, session_id, seconds)
+            SELECT id, ?, ? FROM search_terms WHERE term = ?
+            """,
+            [(session_id, seconds, term) for term, seconds in terms.items()]
+        )
+
+    def _apply_rollups(self, project, task, start_time, data, sign=1):
+        """
+        Add one completed session to the hourly and daily rollups (sign=-1 takes it out)
+        A session spanning several hours or days is split across them: its active
+        seconds by the time in each, its counters in proportion (rounded so that
+        they still add up), and the session itself counts in its start bucket.
+        """
+        seq = int(self._get_meta("rollup_seq") or 0) + 1
+        self._set_meta("rollup_seq", str(seq))
+
+        counters = [data.get(column) or 0 for column in ('mouse_clicks', 'key_strokes', 'idle_time')]
+        rows = []
+        for period, (table, _, _) in ROLLUP_PERIODS.items():
+            pieces = split_by_period(start_time, data['end_time'], period)
+            duration = sum(seconds for _, seconds in pieces)
+            covered = 0
+            for index, (bucket, seconds) in enumerate(pieces):
+                before = covered / duration if duration else 0.0
+                covered += seconds
+                after = covered / duration if duration else 1.0
+                values = [1 if index == 0 else 0, seconds] + [
+                    round(count * after) - round(count * before) for count in counters
+                ]
+                rows.append((table, (bucket, project or '', task or '')
+                             + tuple(sign * value for value in values) + (seq,)))
+
+        for table, params in rows:
+            self.conn.execute(
+                f"""
+                INSERT INTO {table} (bucket, project, task, sessions, active_seconds,
+                                     mouse_clicks, key_strokes, idle_time, seq)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (bucket, project, task) DO UPDATE SET
+                    sessions = sessions + excluded.sessions,
+                    active_seconds = active_seconds + excluded.active_seconds,
+                    mouse_clicks = mouse_clicks + excluded.mouse_clicks,
+                    key_strokes = key_strokes + excluded.key_strokes,
+                    idle_time = idle_time + excluded.idle_time,
+                    seq = excluded.seq
+                """,
+                params
+            )
+
+    def start_session(self, project, task, description, start_time):
+        """Record the start of a session and return its id"""
+        with self.lock:
+            session_id = self._insert_start(project, task, description, start_time)
+            self.conn.commit()
+        return session_id
+
+    def end_session(self, session_id, data):
+        """
+        Complete a session started with start_session()
+        data: end record with end_time, duration, counters, key_counts, window_usage,
+              window_intervals ((start, end, process, title) tuples)
+              and idle_intervals ((start, end) tuples)
+        """
+        with self.lock:
+            self._update_end(session_id, data)
+            self.conn.commit()
+
+    def _filter_clauses(self, start, end, project, task, completed_only):
+        clauses = []
+        params = []
+        if start is not None:
+            clauses.append("start_time >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("start_time < ?")
+            params.append(end)
+        if project:
+            clauses.append("project = ?")
+            params.append(project)
+        if task:
+            clauses.append("task = ?")
+            params.append(task)
+        if completed_only:
+            clauses.append("end_time IS NOT NULL")
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def sessions_between(self, start=None, end=None, project=None, task=None,
+                         limit=None, newest_first=True, completed_only=False, offset=0):
+        """
+        Return session summaries whose start_time falls in [start, end)
+        start/end: times formatted with TIME_FORMAT (either may be None)
+        limit/offset: page through the results
+        """
+        where, params = self._filter_clauses(start, end, project, task, completed_only)
+        query = f"SELECT {SUMMARY_COLUMNS} FROM sessions{where}"
+        query += " ORDER BY start_time " + ("DESC" if newest_first else "ASC")
+        if limit:
+            query += " LIMIT ? OFFSET ?"
+            params.extend((limit, offset))
+
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(query, params)]
+
+    def count_sessions(self, start=None, end=None, project=None, task=None, completed_only=False):
+        """Number of sessions sessions_between() would return with the same filters"""
+        where, params = self._filter_clauses(start, end, project, task, completed_only)
+        with self.lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM sessions{where}", params).fetchone()[0]
+
+    def filter_values(self):
+        """Distinct projects and tasks, for filter dropdowns"""
+        with self.lock:
+            return {
+                column: [row[0] for row in self.conn.execute(
+                    f"SELECT DISTINCT {column} FROM sessions WHERE {column} IS NOT NULL "
+                    f"AND {column} != '' ORDER BY {column}"
+                )]
+                for column in ('project', 'task')
+            }
+
+    def _search_query(self, query, start, end, project, task):
+        """
+        FROM/WHERE clauses and parameters selecting the sessions matching every query term,
+        with matched_seconds: the time spent on the least-covered term
+        """
+        joins = []
+        params = []
+        for index, (term, prefix) in enumerate(parse_query(query)):
+            condition = "t.term >= ? AND t.term < ?" if prefix else "t.term = ?"
+            joins.append(
+                f"JOIN (SELECT p.session_id, MAX(p.seconds) AS seconds "
+                f"FROM search_terms t JOIN search_postings p ON p.term_id = t.id "
+                f"WHERE {condition} GROUP BY p.session_id) m{index} ON m{index}.session_id = sessions.id"
+            )
+            params.extend((term, term + "\uffff") if prefix else (term,))
+        if not joins:
+            return None
+        matched = "m0.seconds" if len(joins) == 1 else \
+            "MIN(" + ", ".join(f"m{i}.seconds" for i in range(len(joins))) + ")"
+        where, filter_params = self._filter_clauses(start, end, project, task, True)
+        return f"sessions {' '.join(joins)}{where}", params + filter_params, matched
+
+    def search(self, query, start=None, end=None, project=None, task=None, limit=None, offset=0):
+        """
+        Completed sessions matching a search_index.parse_query() query, newest first
+        Each summary has matched_seconds, the time spent on what matched.
+        """
+        search = self._search_query(query, start, end, project, task)
+        if search is None:
+            return []
+        source, params, matched = search
+        sql = f"SELECT {', '.join('sessions.' + c for c in SUMMARY_COLUMNS.split(', '))}, " \
+              f"{matched} AS matched_seconds FROM {source} ORDER BY sessions.start_time DESC"
+        if limit:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend((limit, offset))
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def search_totals(self, query, start=None, end=None, project=None, task=None):
+        """{'sessions': matching sessions, 'seconds': total matched_seconds} for a search"""
+        search = self._search_query(query, start, end, project, task)
+        if search is None:
+            return {'sessions': 0, 'seconds': 0.0}
+        source, params, matched = search
+        with self.lock:
+            row = self.conn.execute(
+                f"SELECT COUNT(*), TOTAL({matched}) FROM {source}", params
+            ).fetchone()
+        return {'sessions': row[0], 'seconds': row[1]}
+
+    def open_sessions(self):
+        """Return summaries of the sessions that were started but never ended"""
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {SUMMARY_COLUMNS} FROM sessions WHERE end_time IS NULL ORDER BY start_time"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_session(self, session_id):
+        """Return the full record of one session, or None"""
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+
+        session = dict(row)
+        session['key_counts'] = json.loads(session['key_counts'] or '{}')
+        session['window_usage'] = json.loads(session['window_usage'] or '{}')
+        return session
+
+    def window_intervals_between(self, start, end):
+        """
+        Return (start, end, process, title) foreground intervals overlapping [start, end),
+        clipped to the range
+        start/end: epoch seconds
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                """
+                SELECT MAX(i.start_ts, ?), MIN(i.end_ts, ?), w.process, w.title
+                FROM window_intervals i JOIN windows w ON w.id = i.window_id
+                WHERE i.start_ts < ? AND i.end_ts > ? AND i.start_ts > ?
+                ORDER BY i.start_ts
+                """,
+                (start, end, end, start, start - MAX_INTERVAL_SECONDS)
+            ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def idle_intervals_between(self, start, end):
+        """
+        Return (start, end) idle intervals overlapping [start, end), clipped to the range
+        start/end: epoch seconds
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                """
+                SELECT MAX(start_ts, ?), MIN(end_ts, ?) FROM idle_intervals
+                WHERE start_ts < ? AND end_ts > ? AND start_ts > ?
+                ORDER BY start_ts
+                """,
+                (start, end, end, start, start - MAX_INTERVAL_SECONDS)
+            ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def window_usage_between(self, start, end):
+        """Return seconds in front per "process - title" window within [start, end)"""
+        totals = {}
+        for interval_start, interval_end, process, title in self.window_intervals_between(start, end):
+            key = f"{process} - {title}"
+            totals[key] = totals.get(key, 0.0) + interval_end - interval_start
+        return totals
+
+    def _export_chunk(self, query, clauses, params, order, after, limit):
+        """One keyset-paginated chunk: rows ordered by `order` columns, strictly after the `after` key"""
+        clauses = list(clauses)
+        params = list(params)
+        if after is not None:
+            clauses.append(f"({', '.join(order)}) > ({', '.join('?' for _ in order)})")
+            params.extend(after)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += f" ORDER BY {', '.join(order)} LIMIT ?"
+        params.append(limit)
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(query, params)]
+
+    def export_sessions(self, start=None, end=None, projects=None, after=None, limit=5000):
+        """
+        Full session records starting in [start, end), oldest first, a chunk at a time
+        after: (start_time, id) of the last row of the previous chunk
+        """
+        clauses = []
+        params = []
+        if start:
+            clauses.append("start_time >= ?")
+            params.append(start)
+        if end:
+            clauses.append("start_time < ?")
+            params.append(end)
+        if projects:
+            clauses.append(f"project IN ({', '.join('?' for _ in projects)})")
+            params.extend(projects)
+        return self._export_chunk(
+            f"SELECT {SUMMARY_COLUMNS}, key_counts, window_usage FROM sessions",
+            clauses, params, ('start_time', 'id'), after, limit
+        )
+
+    def export_window_intervals(self, start=None, end=None, projects=None, after=None, limit=5000):
+        """
+        Window intervals starting in [start, end) (epoch seconds), oldest first, a chunk at a time
+        after: (start_ts, rowid) of the last row of the previous chunk
+        """
+        clauses = []
+        params = []
+        if start is not None:
+            clauses.append("i.start_ts >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("i.start_ts < ?")
+            params.append(end)
+        if projects:
+            clauses.append(
+                f"i.session_id IN (SELECT id FROM sessions WHERE project IN ({', '.join('?' for _ in projects)}))"
+            )
+            params.extend(projects)
+        return self._export_chunk(
+            "SELECT i.rowid AS interval_id, i.session_id, i.start_ts, i.end_ts, w.process, w.title "
+            "FROM window_intervals i JOIN windows w ON w.id = i.window_id",
+            clauses, params, ('i.start_ts', 'i.rowid'), after, limit
+        )
+
+    def export_rollups(self, period='day', start=None, end=None, projects=None, after=None, limit=5000):
+        """
+        Rollup rows whose bucket falls in [start, end), in bucket order, a chunk at a time
+        after: (bucket, project, task) of the last row of the previous chunk
+        """
+        table, length, suffix = ROLLUP_PERIODS[period]
+        clauses = []
+        params = []
+        if start:
+            clauses.append("bucket >= ?")
+            params.append(start[:length] + suffix)
+        if end:
+            clauses.append("bucket < ?")
+            params.append(end[:length] + suffix)
+        if projects:
+            clauses.append(f"project IN ({', '.join('?' for _ in projects)})")
+            params.extend(projects)
+        return self._export_chunk(
+            f"SELECT bucket, project, task, {', '.join(ROLLUP_COLUMNS)} FROM {table}",
+            clauses, params, ('bucket', 'project', 'task'), after, limit
+        )
+
+    def rollups_since(self, period, seq=0, start=None):
+        """
+        Return rollup rows changed after seq (oldest change first)
+        period: 'hour' or 'day'
+        start: optional lower bound on the bucket
+        """
+        table, length, suffix = ROLLUP_PERIODS[period]
+        query = f"SELECT * FROM {table} WHERE seq > ?"
+        params = [seq]
+        if start is not None:
+            query += " AND bucket >= ?"
+            params.append(start[:length] + suffix)
+        query += " ORDER BY seq"
+
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(query, params)]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class RollupFollower:
+    def __init__(self, store, period='day', start=None):
+        """
+        Keep per-bucket totals of a rollup table up to date by tailing its changes
+        period: 'hour' or 'day'
+        start: optional lower bound on the bucket
+        """
+        self.store = store
+        self.period = period
+        self.start = start
+        self.last_seq = 0
+        self.rows = {}
+        self.totals = {}
+        self.buckets = []
+        self.dates = {}
+
+    def refresh(self):
+        """Apply rollup rows written since the last refresh; return how many changed"""
+        changed = self.store.rollups_since(self.period, self.last_seq, self.start)
+        for row in changed:
+            key = (row['bucket'], row['project'], row['task'])
+            previous = self.rows.get(key)
+            self.rows[key] = row
+            self.last_seq = max(self.last_seq, row['seq'])
+
+            bucket = row['bucket']
+            totals = self.totals.get(bucket)
+            if totals is None:
+                totals = self.totals[bucket] = dict.fromkeys(ROLLUP_COLUMNS, 0)
+                bisect.insort(self.buckets, bucket)
+                self.dates[bucket] = datetime.strptime(
+                    bucket, TIME_FORMAT if self.period == 'hour' else "%Y-%m-%d"
+                )
+            for column in ROLLUP_COLUMNS:
+                totals[column] += row[column] - (previous[column] if previous else 0)
+        return len(changed)
+
+    def series(self, column):
+        """Return (dates, values) of one rollup column across all projects and tasks"""
+        return (
+            [self.dates[bucket] for bucket in self.buckets],
+            [self.totals[bucket][column] for bucket in self.buckets],
+        )
@@ -0,0 +1,204 @@
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from diagnostics import metrics
+
+
+def iter_tiles(image, tile_size):
+    """Yield (tile, digest) for each tile of an RGB image, row by row"""
+    width, height = image.size
+    for top in range(0, height, tile_size):
+        for left in range(0, width, tile_size):
+            tile = image.crop((left, top, min(left + tile_size, width), min(top + tile_size, height)))
+            yield tile, hashlib.sha1(f"{tile.width}x{tile.height}".encode() + tile.tobytes()).hexdigest()
+
+
+class TileStore:
+    """
+    Content-addressed screenshot storage
+    Frames are split into tiles; each distinct tile is written once under tiles/
+    and a small JSON manifest under frames/ lists the tiles of each frame.
+    """
+
+    def __init__(self, folder, tile_size=64, max_bytes=1024 ** 3, max_age_days=30,
+                 compaction_interval=3600):
+        """
+        folder: root directory of the store
+        tile_size: width and height of a tile in pixels
+        max_bytes: disk quota; compaction deletes the oldest frames above it
+        max_age_days: frames older than this are deleted by compaction (None keeps them)
+        compaction_interval: seconds between background compactions
+        """
+        self.folder = Path(folder)
+        self.tiles_folder = self.folder / "tiles"
+        self.frames_folder = self.folder / "frames"
+        self.tile_size = tile_size
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.compaction_interval = compaction_interval
+        self.lock = threading.Lock()
+        self.compaction_thread = None
+        self.stop_event = threading.Event()
+
+    def _tile_path(self, digest):
+        return self.tiles_folder / digest[:2] / f"{digest}.png"
+
+    def _write_atomic(self, path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(path.name + ".tmp")
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def save_frame(self, image, timestamp=None):
+        """Store a frame, writing only tiles not already in the store; returns the frame id"""
+        timestamp = timestamp or datetime.now()
+        image = image.convert('RGB')
+        width, height = image.size
+        tiles = []
+        new_tiles = 0
+
+        with self.lock:
+            for tile, digest in iter_tiles(image, self.tile_size):
+                tiles.append(digest)
+
+                path = self._tile_path(digest)
+                if not path.exists():
+                    buffer = io.BytesIO()
+                    tile.save(buffer, 'PNG', optimize=True)
+                    self._write_atomic(path, buffer.getvalue())
+                    new_tiles += 1
+
+            frame_id = timestamp.strftime('%Y%m%d_%H%M%S')
+            suffix = 1
+            while (self.frames_folder / f"{frame_id}.json").exists():
+                frame_id = f"{timestamp.strftime('%Y%m%d_%H%M%S')}_{suffix}"
+                suffix += 1
+
+            manifest = {
+                'width': width,
+                'height': height,
+                'tile_size': self.tile_size,
+                'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+                'tiles': tiles,
+            }
+            self._write_atomic(self.frames_folder / f"{frame_id}.json", json.dumps(manifest).encode())
+
+        print(f"Screenshot saved: frame {frame_id} ({new_tiles} new of {len(tiles)} tiles)")
+        return frame_id
+
+    def frames(self):
+        """Return the stored frame ids, oldest first"""
+        if not self.frames_folder.exists():
+            return []
+        return sorted(path.stem for path in self.frames_folder.glob("*.json"))
+
+    def load_frame(self, frame_id):
+        """Rebuild a stored frame as a PIL image"""
+        from PIL import Image
+
+        with open(self.frames_folder / f"{frame_id}.json", 'r') as f:
+            manifest = json.load(f)
+
+        tile_size = manifest['tile_size']
+        columns = (manifest['width'] + tile_size - 1) // tile_size
+        image = Image.new('RGB', (manifest['width'], manifest['height']))
+        for index, digest in enumerate(manifest['tiles']):
+            with Image.open(self._tile_path(digest)) as tile:
+                image.paste(tile, ((index % columns) * tile_size, (index // columns) * tile_size))
+        return image
+
+    def disk_usage(self):
+        """Total bytes used by tiles and manifests"""
+        total = 0
+        for folder in (self.tiles_folder, self.frames_folder):
+            if folder.exists():
+                total += sum(path.stat().st_size for path in folder.rglob("*") if path.is_file())
+        return total
+
+    def compact(self):
+        """
+        Enforce the age and size quota: delete expired frames, then the oldest
+        frames until the store fits in max_bytes, then tiles no frame refers to
+        """
+        with self.lock:
+            frames = self.frames()
+            removed_frames = 0
+            if self.max_age_days is not None:
+                cutoff = time.time() - self.max_age_days * 86400
+                for frame_id in list(frames):
+                    path = self.frames_folder / f"{frame_id}.json"
+                    if path.stat().st_mtime < cutoff:
+                        path.unlink()
+                        frames.remove(frame_id)
+                        removed_frames += 1
+
+            # Tile sizes and which frames use them
+            tile_sizes = {}
+            if self.tiles_folder.exists():
+                for path in self.tiles_folder.rglob("*.png"):
+                    tile_sizes[path.stem] = path.stat().st_size
+            frame_tiles = {}
+            for frame_id in frames:
+                with open(self.frames_folder / f"{frame_id}.json", 'r') as f:
+                    frame_tiles[frame_id] = set(json.load(f)['tiles'])
+
+            references = {}
+            for tiles in frame_tiles.values():
+                for digest in tiles:
+                    references[digest] = references.get(digest, 0) + 1
+            used_bytes = sum(tile_sizes.get(digest, 0) for digest in references)
+
+            # Drop the oldest frames until the tiles still referenced fit the quota
+            while frames and self.max_bytes is not None and used_bytes > self.max_bytes:
+                frame_id = frames.pop(0)
+                (self.frames_folder / f"{frame_id}.json").unlink()
+                removed_frames += 1
+                for digest in frame_tiles.pop(frame_id):
+                    references[digest] -= 1
+                    if references[digest] == 0:
+                        del references[digest]
+                        used_bytes -= tile_sizes.get(digest, 0)
+
+            removed_tiles = 0
+            for digest in tile_sizes:
+                if digest not in references:
+                    self._tile_path(digest).unlink()
+                    removed_tiles += 1
+
+        return {'removed_frames': removed_frames, 'removed_tiles': removed_tiles, 'bytes': used_bytes}
+
+    def _compaction_loop(self):
+        while not self.stop_event.wait(self.compaction_interval):
+            try:
+                t0 = time.perf_counter()
+                self.compact()
+                if metrics.enabled:
+                    metrics.record('screenshot.compact', time.perf_counter() - t0)
+            except Exception as e:
+                print(f"Error compacting screenshots: {e}")
+
+    def start_compaction(self):
+        """Run compact() every compaction_interval seconds on a background thread"""
+        if self.compaction_thread is None or not self.compaction_thread.is_alive():
+            self.stop_event.clear()
+            self.compaction_thread = threading.Thread(target=self._compaction_loop, daemon=True)
+            self.compaction_thread.start()
+
+    def stop_compaction(self):
+        self.stop_event.set()
+
+
+if __name__ == "__main__":
+    # Rebuild a stored frame: python tile_store.py <store folder> <frame id> <output file>
+    if len(sys.argv) != 4:
+        print("Usage: python tile_store.py <store folder> <frame id> <output file>")
+        sys.exit(1)
+    TileStore(sys.argv[1]).load_frame(sys.argv[2]).save(sys.argv[3])
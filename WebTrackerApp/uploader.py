@@ -0,0 +1,233 @@
+import getpass
+import gzip
+import json
+import os
+import random
+import socket
+import threading
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+from file_lock import FileLock
+from session_store import TIME_FORMAT
+
+
+def session_record(session, source="webtracker", user=None, machine=None):
+    """
+    Turn a finished session from SessionStore.get_session() into an upload record
+    uid identifies the session across retries, so the server can ignore duplicates.
+    """
+    machine = machine or socket.gethostname()
+    duration = 0
+    start_ts = end_ts = None
+    try:
+        start_ts = datetime.strptime(session['start_time'], TIME_FORMAT).timestamp()
+        end_ts = datetime.strptime(session['end_time'], TIME_FORMAT).timestamp()
+        duration = end_ts - start_ts
+    except (TypeError, ValueError):
+        pass
+
+    return {
+        'uid': f"{machine}:{source}:{session['id']}",
+        'machine': machine,
+        'user': user or getpass.getuser(),
+        'project': session.get('project'),
+        'task': session.get('task'),
+        'description': session.get('description'),
+        'start_ts': start_ts,
+        'end_ts': end_ts,
+        'duration_seconds': duration,
+        'mouse_clicks': session.get('mouse_clicks') or 0,
+        'key_strokes': session.get('key_strokes') or 0,
+        'idle_time': session.get('idle_time') or 0,
+        'details': {
+            'key_counts': session.get('key_counts') or {},
+            'window_usage': session.get('window_usage') or {},
+        },
+    }
+
+
+class SessionUploader:
+    """
+    Uploads finished sessions to an ingest server (ingest_server.py) in gzip'd batches
+    Sessions are first appended to an on-disk spool, so nothing is lost while the
+    server is unreachable; a background thread sends the spool in batches and
+    retries with exponential backoff. The spool is only appended to: a persisted
+    byte offset marks what the server has accepted, and the file is emptied once
+    everything in it was sent.
+    """
+
+    def __init__(self, url, token=None, spool_folder="upload_spool", batch_size=100,
+                 flush_interval=30, max_backoff=600, timeout=10):
+        """
+        url: base URL of the ingest server, e.g. http://127.0.0.1:8765
+        token: shared secret sent in the X-WebTracker-Token header (optional)
+        spool_folder: directory holding sessions not yet accepted by the server
+        batch_size: sessions per request
+        flush_interval: seconds between upload attempts when nothing new arrives
+        max_backoff: upper bound of the retry delay after failures, in seconds
+        timeout: HTTP request timeout in seconds
+        """
+        self.url = url.rstrip('/') + "/sessions"
+        self.token = token
+        self.spool_folder = spool_folder
+        self.pending_path = os.path.join(spool_folder, "pending.jsonl")
+        self.offset_path = os.path.join(spool_folder, "pending.offset")
+        self.rejected_path = os.path.join(spool_folder, "rejected.jsonl")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        # Other processes (app.py, another collector) may share the spool folder
+        self.spool_lock = FileLock(os.path.join(spool_folder, "spool.lock"))
+        self.wakeup = threading.Event()
+        self.thread = None
+        self.failures = 0
+        self.uploaded = 0
+
+    def start(self):
+        """Start the upload thread (no-op if it is already running)"""
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def submit(self, record):
+        """Spool one session record for upload; returns once it is on disk"""
+        line = json.dumps(record) + "\n"
+        os.makedirs(self.spool_folder, exist_ok=True)
+        with self.lock, self.spool_lock:
+            with open(self.pending_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+        self.wakeup.set()
+
+    def pending(self):
+        """Number of spooled sessions not yet accepted by the server"""
+        if not os.path.exists(self.pending_path):
+            return 0
+        with self.lock, self.spool_lock:
+            with open(self.pending_path, 'rb') as f:
+                f.seek(self._read_offset())
+                return sum(1 for line in f if line.strip())
+
+    def _read_offset(self):
+        """Byte offset of the first spooled line not yet accepted by the server"""
+        try:
+            with open(self.offset_path, 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_offset(self, offset):
+        temp_path = self.offset_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.offset_path)
+
+    def _read_batch(self, limit):
+        """Up to limit spooled lines from the offset on, and the offset just past them"""
+        if not os.path.exists(self.pending_path):
+            return [], 0
+        with self.lock, self.spool_lock:
+            offset = self._read_offset()
+            lines = []
+            with open(self.pending_path, 'rb') as f:
+                f.seek(offset)
+                while len(lines) < limit:
+                    line = f.readline()
+                    if not line.endswith(b"\n"):
+                        break  # End of the spool
+                    offset = f.tell()
+                    if line.strip():
+                        lines.append(line.decode('utf-8'))
+        return lines, offset
+
+    def _drop_pending(self, lines, offset, rejected=False):
+        """Mark the spool as sent up to offset (lines: the batch that ended there)"""
+        with self.lock, self.spool_lock:
+            if rejected:
+                with open(self.rejected_path, 'a', encoding='utf-8') as f:
+                    f.writelines(lines)
+            if offset >= os.path.getsize(self.pending_path):
+                # Everything was sent: start the spool over. The offset is reset first,
+                # so a crash in between can only resend sessions, which the server ignores.
+                self._write_offset(0)
+                with open(self.pending_path, 'r+b') as f:
+                    f.truncate(0)
+            else:
+                self._write_offset(offset)
+
+    def _post(self, lines):
+        body = gzip.compress(
+            ('{"sessions": [' + ",".join(line.strip() for line in lines) + ']}').encode('utf-8')
+        )
+        request = urllib.request.Request(self.url, data=body, method='POST', headers={
+            'Content-Type': 'application/json',
+            'Content-Encoding': 'gzip',
+        })
+        if self.token:
+            request.add_header('X-WebTracker-Token', self.token)
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+
+    def flush(self):
+        """
+        Send spooled sessions until the spool is empty
+        Returns True on success; raises on the first failed request
+        A batch larger than the server accepts (413) is sent again in halves.
+        """
+        limit = self.batch_size
+        while True:
+            lines, offset = self._read_batch(limit)
+            if not lines:
+                if offset:
+                    self._drop_pending(lines, offset)  # Only blank lines were left
+                return True
+            try:
+                self._post(lines)
+            except urllib.error.HTTPError as e:
+                if e.code == 413 and len(lines) > 1:
+                    limit = max(1, len(lines) // 2)
+                    continue
+                # The server refused this batch itself; retrying would not help
+                if 400 <= e.code < 500 and e.code not in (401, 403, 408, 429):
+                    print(f"Upload batch rejected ({e.code}), moved to {self.rejected_path}")
+                    self._drop_pending(lines, offset, rejected=True)
+                    continue
+                raise
+            self._drop_pending(lines, offset)
+            self.uploaded += len(lines)
+
+    def _run(self):
+        while True:
+            try:
+                self.flush()
+                self.failures = 0
+                delay = self.flush_interval
+            except Exception as e:
+                self.failures += 1
+                delay = min(self.max_backoff, 2 ** self.failures) * random.uniform(0.5, 1.0)
+                print(f"Error uploading sessions (retrying in {delay:.0f}s): {e}")
+            self.wakeup.wait(delay)
+            self.wakeup.clear()
+
+    def stats(self):
+        return {'pending': self.pending(), 'uploaded': self.uploaded, 'failures': self.failures}
+
+
+def create_uploader():
+    """
+    Return a started SessionUploader for the server in WEBTRACKER_UPLOAD_URL
+    (token in WEBTRACKER_UPLOAD_TOKEN), or None when uploads are not configured
+    """
+    url = os.environ.get('WEBTRACKER_UPLOAD_URL')
+    if not url:
+        return None
+    uploader = SessionUploader(url, token=os.environ.get('WEBTRACKER_UPLOAD_TOKEN'))
+    uploader.start()
+    return uploader
@@ -1,155 +1,30 @@
 import tkinter as tk
 from ttkbootstrap import Style, ScrolledText
-from ttkbootstrap.widgets import Button, Combobox, Entry, Frame, Label, Meter
+from ttkbootstrap.widgets import Button, Checkbutton, Combobox, Entry, Frame, Label, Meter
 from ttkbootstrap.constants import *
 from tkinter import messagebox
-import threading
 import time
 import json
-from datetime import datetime
-import matplotlib
-matplotlib.use('TkAgg')
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import win32gui
-import win32process
-import psutil
-from collections import defaultdict
-from PIL import Image, ImageGrab
-Image.CUBIC = Image.BICUBIC
-import keyboard
-import mouse
+import threading
+from datetime import datetime, timedelta
 import os
-from pathlib import Path
-
-
-# Patch the _Stack issue
-import matplotlib.cbook as cbook
-if not hasattr(cbook, '_Stack'):        
-    cbook._Stack = cbook.Stack
-
-class ActivityLogger:
-    def __init__(self):
-        self.mouse_clicks = 0
-        self.key_strokes = 0
-        self.idle_time = 0
-        self.last_active = "N/A"
-        self.is_logging = False
-        self.pressed_keys = []
-        self.start_time = None
-        self.last_activity = time.time()
-        self.idle_threshold = 60  # 1 minute
-        self.window_usage = defaultdict(int)
-        self.current_window = None
-        self.window_check_interval = 5
-        self.mouse_listener = None
-        self.keyboard_listener = None
-        # Screenshot configuration
-        self.screenshot_interval = 300  # 5 minutes
-        self.is_screenshot_enabled = False
-        self.screenshot_thread = None
-        self.screenshot_folder = Path("screenshots")
-        
-    def reset(self):
-        self.mouse_clicks = 0
-        self.key_strokes = 0
-        self.idle_time = 0
-        self.pressed_keys = []
-        self.start_time = None
-        self.window_usage.clear()
-
-    def take_screenshot(self):
-        """Capture and save screenshot"""
-        try:
-            # Create screenshots directory if it doesn't exist
-            self.screenshot_folder.mkdir(exist_ok=True)
-            
-            # Capture the screen
-            screenshot = ImageGrab.grab()
-            
-            # Generate filename with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = self.screenshot_folder / f"screenshot_{timestamp}.png"
-            
-            # Save the screenshot
-            screenshot.save(filename)
-            print(f"Screenshot saved: {filename}")
-            
-        except Exception as e:
-            print(f"Error taking screenshot: {e}")
-    
-    def get_active_window_info(self):
-        try:
-            window = win32gui.GetForegroundWindow()
-            title = win32gui.GetWindowText(window)
-            
-            _, pid = win32process.GetWindowThreadProcessId(window)
-            process = psutil.Process(pid)
-            process_name = process.name()
-            
-            return {
-                'title': title,
-                'process': process_name,
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-        except Exception as e:
-            print(f"Error getting window info: {e}")
-            return None
-        
-def screenshot_thread():
-    """Thread function to take periodic screenshots"""
-    while True:
-        if logger.is_logging and logger.is_screenshot_enabled:
-            logger.take_screenshot()
-        time.sleep(logger.screenshot_interval)
-
-
-def window_tracking_thread():
-    """Thread function to track active windows"""
-    while True:
-        if logger.is_logging:
-            window_info = logger.get_active_window_info()
-            if window_info:
-                key = f"{window_info['process']} - {window_info['title']}"
-                logger.window_usage[key] += logger.window_check_interval
-                logger.current_window = key
-                
-                # Update the UI with current window info
-                update_window_label()
-        time.sleep(logger.window_check_interval)
-
-
-def update_window_label():
+from session_store import SessionStore, RollupFollower, TIME_FORMAT
+from ipc import CollectorClient
+from diagnostics import metrics
+
+# Set to the launch time (epoch seconds) by benchmarks/cold_start.py: the app
+# prints the time to its first frame and exits
+STARTUP_PROBE = os.environ.get('WEBTRACKER_STARTUP_PROBE')
+
+
+def update_window_label(state):
     """Update the UI with current window information"""
     if hasattr(root, 'current_window_label'):
-        current_window = logger.current_window or "N/A"
-        root.current_window_label.config(text=f"Current Window: {current_window}")
-
-def save_session_end(hours, minutes):
-    """Enhanced session end saving with window usage data"""
-    session_data = {
-        'end_time': time.strftime("%Y-%m-%d %H:%M:%S"),
-        'duration': f"{hours}h {minutes}m",
-        'mouse_clicks': logger.mouse_clicks,
-        'key_strokes': logger.key_strokes,
-        'idle_time': logger.idle_time,
-        'pressed_keys': logger.pressed_keys,
-        'window_usage': {
-            window: {
-                'total_seconds': seconds,
-                'percentage': (seconds / (hours * 3600 + minutes * 60)) * 100 if hours or minutes else 0
-            }
-            for window, seconds in logger.window_usage.items()
-        }
-    }
-    try:
-        with open('activity_log.json', 'a+') as f:
-            json.dump(session_data, f)
-            f.write('\n')
-    except Exception as e:
-        print(f"Error saving session end: {e}")
+        text = f"Current Window: {state.get('current_window') or 'N/A'}"
+        if root.current_window_label.cget('text') != text:
+            root.current_window_label.config(text=text)
 
-def show_window_usage_summary():
+def show_window_usage_summary(window_totals):
     """Display window usage summary in a new window"""
     summary_window = tk.Toplevel(root)
     summary_window.title("Window Usage Summary")
@@ -159,17 +34,18 @@ def show_window_usage_summary():
     summary_text = ScrolledText(summary_window, wrap=tk.WORD, width=70, height=20)
     summary_text.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
     
-    # Calculate total time
-    total_seconds = sum(logger.window_usage.values())
+    # Share of the total time per window
+    from analytics import window_shares
+    shares = window_shares(window_totals)
     
     # Sort windows by usage time
-    sorted_usage = sorted(logger.window_usage.items(), key=lambda x: x[1], reverse=True)
+    sorted_usage = sorted(window_totals.items(), key=lambda x: x[1], reverse=True)
     
     # Format summary text
     summary = "Window Usage Summary:\n\n"
     for window, seconds in sorted_usage:
         minutes = seconds / 60
-        percentage = (seconds / total_seconds * 100) if total_seconds > 0 else 0
+        percentage = shares[window]
         summary += f"Window: {window}\n"
         summary += f"Time spent: {minutes:.2f} minutes ({percentage:.1f}%)\n\n"
     
@@ -177,261 +53,313 @@ def show_window_usage_summary():
     summary_text.config(state=tk.DISABLED)
 
 
-logger = ActivityLogger()
-
-def on_mouse_click():
-    if logger.is_logging:
-        logger.mouse_clicks += 1
-        logger.last_active = time.strftime("%I:%M:%S %p")
-        logger.last_activity = time.time()
-        update_labels()
-
-def on_key_press(event):
-    if logger.is_logging:
-        logger.key_strokes += 1
-        logger.pressed_keys.append(event.name)
-        logger.last_active = time.strftime("%I:%M:%S %p")
-        logger.last_activity = time.time()
-        update_labels()
-
-def calculate_idle_time():
-    last_check_time = None
-    while True:
-        if logger.is_logging:
-            current_time = time.time()
-            
-            # Calculate idle time only if there's a last check time
-            if last_check_time is not None:
-                time_gap = current_time - logger.last_activity
-                
-                # Reset idle time if activity detected
-                if time_gap > logger.idle_threshold:
-                    logger.idle_time = int(time_gap // 60)
-                    update_labels()
-            
-            last_check_time = current_time
-        else:
-            last_check_time = None
-        
-        time.sleep(1)
+# Opening the store may upgrade it (migrations, one-time indexing, legacy import),
+# so it happens on a worker thread by open_store() and the window appears at once
+store = None
+store_error = None
 
-def start_logging():
-    if not logger.is_logging:
-        logger.is_logging = True
-        logger.reset()
-        logger.start_time = time.time()
-        logger.last_active = time.strftime("%I:%M:%S %p")
-        
-        try:
-            # Set up mouse hook
-            mouse.on_click(on_mouse_click)
-            
-            # Set up keyboard hook
-            keyboard.on_press(on_key_press)
-            
-            # Start screenshot thread if enabled
-            if logger.is_screenshot_enabled and logger.screenshot_thread is None:
-                logger.screenshot_thread = threading.Thread(target=screenshot_thread, daemon=True)
-                logger.screenshot_thread.start()
-            
-        except Exception as e:
-            print(f"Error starting input listeners: {e}")
-            messagebox.showerror("Error", 
-                "Failed to start input tracking. The application will continue without input tracking.")
-        
-        # Update UI
-        start_button.config(state='disabled')
-        stop_button.config(state='normal')
-        update_labels()
-        
-        # Save initial session info
-        save_session_start()
+# Attach to a running collector daemon (python collector.py), or collect in
+# this process when there is none, once open_store() has the store ready
+try:
+    client = CollectorClient()
+except OSError:
+    client = None
 
-def stop_logging():
-    if logger.is_logging:
-        logger.is_logging = False
-        
-        # Remove hooks
+# Settings changed before the in-process collector is up, sent once it is
+pending_settings = {}
+
+def run_in_background(work, done):
+    """Run work() on a worker thread, then done(result, error) on the Tk thread"""
+    outcome = {}
+    
+    def worker():
         try:
-            mouse.unhook_all()
-            keyboard.unhook_all()
+            outcome['result'] = work()
         except Exception as e:
-            print(f"Error stopping input listeners: {e}")
-        
-        # Calculate session duration
-        duration = time.time() - logger.start_time
-        hours = int(duration // 3600)
-        minutes = int((duration % 3600) // 60)
-        
-        # Save session data
-        save_session_end(hours, minutes)
-        
-        # Update UI
-        start_button.config(state='normal')
-        stop_button.config(state='disabled')
+            outcome['error'] = e
+    
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    
+    def poll():
+        if thread.is_alive():
+            root.after(20, poll)
+        else:
+            done(outcome.get('result'), outcome.get('error'))
+    
+    root.after(20, poll)
+
+def open_store():
+    """Worker thread: open the store, then start the in-process collector if there is no daemon"""
+    global store, client
+    store = SessionStore()
+    if client is None:
+        from collector import Collector
+        collector = Collector(store)
+        collector.start()
+        client = collector
+
+def on_store_open(result, error):
+    global store_error
+    if isinstance(error, RuntimeError):
+        # Another window is collecting in its own process: only a daemon can be shared
+        messagebox.showerror(
+            "WebTracker", "WebTracker is already running. Start collector.py to use several windows at once."
+        )
+        raise SystemExit(1)
+    if error is not None:
+        store_error = error
+        print(f"Error opening session store: {error}")
+        return
+    configure_collector()
+
+def configure_collector(**settings):
+    """Send settings to the collector, or keep them until it has started"""
+    pending_settings.update(settings)
+    if client is not None and pending_settings:
+        client.configure(**pending_settings)
+        pending_settings.clear()
+
+# Redraws per second of the live session stats
+ui_refresh_rate = 10
+
+# Number of days of history loaded into the History and Analytics tabs
+history_days = 90
+
+def refresh_ui(expected=None):
+    """Redraw the live session stats, at most ui_refresh_rate times per second"""
+    enabled = metrics.enabled
+    if enabled and expected is not None:
+        metrics.loop_lag('ui_refresh', expected)
+    t0 = time.perf_counter()
+    try:
+        # The in-process collector starts once the store is open
+        state = client.snapshot() if client is not None else {}
+        is_logging = bool(state.get('is_logging'))
         
-        # Show summary
-        summary = f"""
-        Session Summary:
-        Duration: {hours}h {minutes}m
-        Mouse Clicks: {logger.mouse_clicks}
-        Keystrokes: {logger.key_strokes}
-        Idle Time: {logger.idle_time} minutes
-        """
-        messagebox.showinfo("Activity Logger", summary)
+        # Another client may have started or stopped the session
+        start_button.config(state='disabled' if is_logging or client is None else 'normal')
+        stop_button.config(state='normal' if is_logging else 'disabled')
         
-        # Show window usage summary
-        show_window_usage_summary()
-
-def save_session_start():
-    session_data = {
-        'project': project_dropdown.get(),
-        'task': task_dropdown.get(),
-        'description': task_description.get('1.0', 'end-1c'),  # Fixed the text retrieval
-        'start_time': time.strftime("%Y-%m-%d %H:%M:%S"),
-    }
+        if is_logging:
+            update_labels(state)
+            update_window_label(state)
+    except Exception as e:
+        print(f"Error refreshing UI: {e}")
+    if enabled:
+        metrics.record('ui.refresh', time.perf_counter() - t0)
+    delay = max(1, int(1000 / ui_refresh_rate))
+    root.after(delay, refresh_ui, time.monotonic() + delay / 1000)
+
+def start_logging():
     try:
-        with open('activity_log.json', 'a+') as f:
-            json.dump(session_data, f)
-            f.write('\n')
+        result = client.start_session(
+            project_dropdown.get(),
+            task_dropdown.get(),
+            task_description.get('1.0', 'end-1c')  # Fixed the text retrieval
+        )
     except Exception as e:
-        print(f"Error saving session start: {e}")
-
-def save_session_end(hours, minutes):
-    session_data = {
-        'end_time': time.strftime("%Y-%m-%d %H:%M:%S"),
-        'duration': f"{hours}h {minutes}m",
-        'mouse_clicks': logger.mouse_clicks,
-        'key_strokes': logger.key_strokes,
-        'idle_time': logger.idle_time,
-        'pressed_keys': logger.pressed_keys
-    }
+        messagebox.showerror("Error", f"Failed to start logging: {e}")
+        return
+    
+    if result['input_error']:
+        messagebox.showerror("Error", 
+            "Failed to start input tracking. The application will continue without input tracking.")
+    
+    # Update UI
+    start_button.config(state='disabled')
+    stop_button.config(state='normal')
+
+def stop_logging():
     try:
-        with open('activity_log.json', 'a+') as f:
-            json.dump(session_data, f)
-            f.write('\n')
+        summary = client.stop_session()
     except Exception as e:
-        print(f"Error saving session end: {e}")
+        messagebox.showerror("Error", f"Failed to stop logging: {e}")
+        return
+    if summary is None:
+        return
+    
+    # Update UI
+    start_button.config(state='normal')
+    stop_button.config(state='disabled')
+    if past_activities_list is not None:
+        past_activities_list.refresh()
+    
+    # Show summary
+    message = f"""
+    Session Summary:
+    Duration: {summary['hours']}h {summary['minutes']}m
+    Mouse Clicks: {summary['mouse_clicks']}
+    Keystrokes: {summary['key_strokes']}
+    Idle Time: {summary['idle_time']} minutes
+    """
+    messagebox.showinfo("Activity Logger", message)
+    
+    # Show window usage summary
+    show_window_usage_summary(summary['window_usage'])
+
+def history_range_start():
+    """Earliest start time shown in the History and Analytics tabs"""
+    return (datetime.now() - timedelta(days=history_days)).strftime(TIME_FORMAT)
+
+def history_filters():
+    """The History tab's filters as sessions_between() arguments; raises ValueError on a bad date"""
+    filters = {}
+    start = history_start_entry.get().strip()
+    end = history_end_entry.get().strip()
+    if start:
+        filters['start'] = datetime.strptime(start, "%Y-%m-%d").strftime(TIME_FORMAT)
+    if end:
+        # The end date is inclusive
+        filters['end'] = (datetime.strptime(end, "%Y-%m-%d") + timedelta(days=1)).strftime(TIME_FORMAT)
+    for name, dropdown in (('project', history_project_filter), ('task', history_task_filter)):
+        if dropdown.get() and dropdown.get() != "All":
+            filters[name] = dropdown.get()
+    return filters
+
+def show_search_totals(totals):
+    from history_view import format_seconds
+    history_search_label.config(
+        text=f"{totals['sessions']} sessions, {format_seconds(totals['seconds'])} on matching windows and tasks"
+    )
 
 def load_past_activities():
-    activities = []
+    """Point the History list at the sessions matching the filters; pages load as they scroll into view"""
     try:
-        with open('activity_log.json', 'r') as f:
-            for line in f:
-                if line.strip():
-                    data = json.loads(line)
-                    activities.append(data)
-                    
-        # Clear existing items
-        past_activities_list.delete(0, tk.END)
-        
-        # Add activities in reverse order (newest first)
-        for data in reversed(activities):
-            if 'start_time' in data:  # This is a session start record
-                display_text = f"{data['start_time']} - {data['project']} - {data['task']}"
-                if 'description' in data and data['description'].strip():
-                    display_text += f"\nDescription: {data['description']}"
-                past_activities_list.insert(tk.END, display_text)
-                past_activities_list.insert(tk.END, "-" * 50)  # Separator
-                
-        # Update analytics
-        update_analytics(activities)
-    except FileNotFoundError:
-        past_activities_list.insert(tk.END, "No activity history found")
-    except Exception as e:
-        past_activities_list.insert(tk.END, f"Error loading history: {str(e)}")
-
-def update_analytics(activities):
-    # Clear previous plots
-    ax1.clear()
-    ax2.clear()
-    
-    # Extract data for analytics
-    dates = []
-    clicks = []
-    keystrokes = []
-    idle_times = []
-    
-    for i in range(0, len(activities), 2):  # Process in pairs (start and end records)
-        if i + 1 < len(activities) and 'end_time' in activities[i + 1]:
-            start_data = activities[i]
-            end_data = activities[i + 1]
-            
-            # Convert string time to datetime
-            date = datetime.strptime(start_data['start_time'], "%Y-%m-%d %H:%M:%S")
-            dates.append(date)
-            
-            # Collect metrics
-            clicks.append(end_data.get('mouse_clicks', 0))
-            keystrokes.append(end_data.get('key_strokes', 0))
-            idle_times.append(end_data.get('idle_time', 0))
-    
-    if dates:  # Only create plots if we have data
-        # Plot 1: Activity over time
-        ax1.plot(dates, clicks, label='Mouse Clicks', marker='o')
-        ax1.plot(dates, keystrokes, label='Keystrokes', marker='s')
-        ax1.set_title('Activity Trends', color='white')
-        ax1.set_xlabel('Date', color='white')
-        ax1.set_ylabel('Count', color='white')
-        ax1.tick_params(colors='white')
-        ax1.legend()
-        ax1.grid(True, alpha=0.3)
-        
-        # Plot 2: Idle Time Analysis
-        ax2.bar(dates, idle_times, label='Idle Time (minutes)', alpha=0.7)
-        ax2.set_title('Idle Time Analysis', color='white')
-        ax2.set_xlabel('Date', color='white')
-        ax2.set_ylabel('Minutes', color='white')
-        ax2.tick_params(colors='white')
-        ax2.legend()
-        ax2.grid(True, alpha=0.3)
-        
-        # Rotate date labels for better readability
-        plt.setp(ax1.xaxis.get_majorticklabels(), rotation=45)
-        plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45)
-        
-        # Adjust layout to prevent label cutoff
-        fig.tight_layout()
-        
-        # Update canvas
-        canvas.draw()
+        filters = history_filters()
+    except ValueError:
+        messagebox.showerror("Error", "Dates must be formatted as YYYY-MM-DD")
+        return
+    
+    query = history_search_entry.get().strip()
+    if query:
+        # Search the window title / project / task / description index
+        past_activities_list.set_query(
+            lambda: store.search_totals(query, **filters),
+            lambda offset, limit: store.search(query, limit=limit, offset=offset, **filters),
+            show_search_totals,
+        )
     else:
-        # If no data, display message on plots
-        ax1.text(0.5, 0.5, 'No activity data available', 
-                horizontalalignment='center', verticalalignment='center',
-                color='white')
-        ax2.text(0.5, 0.5, 'No activity data available',
-                horizontalalignment='center', verticalalignment='center',
-                color='white')
-        canvas.draw()
-
-def update_labels():
-    if not logger.is_logging:
+        history_search_label.config(text="")
+        past_activities_list.set_query(
+            lambda: store.count_sessions(**filters),
+            # Newest first
+            lambda offset, limit: store.sessions_between(limit=limit, offset=offset, **filters),
+        )
+    
+    # Offer the projects and tasks found in the history as filters
+    run_in_background(store.filter_values, show_filter_values)
+
+def show_filter_values(values, error):
+    if error is not None:
+        print(f"Error loading history filters: {error}")
         return
-    # Update meters
-    clicks_meter.configure(amountused=min(logger.mouse_clicks, 1000))
-    keystrokes_meter.configure(amountused=min(logger.key_strokes, 1000))
-    idle_meter.configure(amountused=min(logger.idle_time, 60))
+    history_project_filter.config(values=["All"] + values['project'])
+    history_task_filter.config(values=["All"] + values['task'])
+
+def update_analytics():
+    import numpy as np
+    from matplotlib.dates import date2num
+    from analytics import fill_days, hour_of_week_totals, rolling_mean
+    
+    t0 = time.perf_counter()
+    daily_rollups = analytics['rollups']
+    hourly_rollups = analytics['hourly_rollups']
+    
+    # Apply only the rollup rows saved since the last refresh
+    daily_rollups.refresh()
+    hourly_rollups.refresh()
+    
+    # Daily totals for analytics; the rolling average and idle bins need the empty days too
+    dates, clicks = daily_rollups.series('mouse_clicks')
+    _, keystrokes = daily_rollups.series('key_strokes')
+    _, idle = daily_rollups.series('idle_time')
+    days, daily_keystrokes = fill_days(dates, keystrokes)
+    _, daily_idle = fill_days(dates, idle)
+    dates = date2num(dates) if dates else np.empty(0)
+    day_numbers = date2num(days) if len(days) else np.empty(0)
+    
+    # Active time per hour of the week
+    hours, active = hourly_rollups.series('active_seconds')
+    
+    # Only the artists' data changes; the charts downsample and redraw themselves
+    analytics['charts'].update(
+        {
+            'mouse_clicks': (dates, clicks),
+            'key_strokes': (dates, keystrokes),
+            'key_strokes_avg': (day_numbers, rolling_mean(daily_keystrokes, 7)),
+        },
+        (np.append(day_numbers, day_numbers[-1] + 1) if len(days) else np.array([0.0, 1.0]),
+         daily_idle if len(days) else np.zeros(1)),
+        hour_of_week_totals(hours, active) / 3600,
+    )
+    
+    if metrics.enabled:
+        metrics.record('ui.analytics_redraw', time.perf_counter() - t0)
+
+def update_labels(state):
+    # Update meters (only when their value changed, redrawing a Meter is costly)
+    for meter, value in (
+        (clicks_meter, min(state['mouse_clicks'], 1000)),
+        (keystrokes_meter, min(state['key_strokes'], 1000)),
+        (idle_meter, min(state['idle_time'], 60)),
+    ):
+        if meter.amountusedvar.get() != value:
+            meter.configure(amountused=value)
     
     # Update labels
-    last_active_label.config(text=f"Last Active: {logger.last_active}")
+    last_active_label.config(text=f"Last Active: {state['last_active']}")
     
     # Calculate session duration
-    if logger.start_time:
-        duration = time.time() - logger.start_time
+    if state['start_time']:
+        duration = time.time() - state['start_time']
         hours = int(duration // 3600)
         minutes = int((duration % 3600) // 60)
         seconds = int(duration % 60)
         session_time_label.config(text=f"Session Duration: {hours:02d}:{minutes:02d}:{seconds:02d}")
 
+def create_refresh_rate_controls(main_frame):
+    refresh_frame = Frame(main_frame, bootstyle="dark")
+    refresh_frame.pack(fill=X, pady=10)
+    
+    # UI refresh rate input
+    Label(refresh_frame, text="UI Refresh Rate (per second):", font=("Helvetica", 12)).pack(side=LEFT, padx=5)
+    rate_entry = Entry(refresh_frame, width=5)
+    rate_entry.insert(0, str(ui_refresh_rate))
+    rate_entry.pack(side=LEFT, padx=5)
+    
+    def update_rate():
+        global ui_refresh_rate
+        try:
+            rate = int(rate_entry.get())
+            if not 1 <= rate <= 60:
+                raise ValueError("Refresh rate must be between 1 and 60")
+            ui_refresh_rate = rate
+            configure_collector(publish_rate=rate)
+            messagebox.showinfo("Success", f"UI refresh rate updated to {rate} per second")
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+    
+    Button(
+        refresh_frame,
+        text="Update Rate",
+        bootstyle="info-outline",
+        command=update_rate
+    ).pack(side=LEFT, padx=5)
+
 def create_screenshot_controls(main_frame):
+    from screenshots import FORMATS, TILES
+    
+    # Shown settings; changes are sent to the collector
+    settings = {'interval': 300, 'enabled': False}
+    
     screenshot_frame = Frame(main_frame, bootstyle="dark")
     screenshot_frame.pack(fill=X, pady=10)
     
     # Screenshot interval input
     Label(screenshot_frame, text="Screenshot Interval (minutes):", font=("Helvetica", 12)).pack(side=LEFT, padx=5)
     interval_entry = Entry(screenshot_frame, width=5)
-    interval_entry.insert(0, str(logger.screenshot_interval // 60))
+    interval_entry.insert(0, str(settings['interval'] // 60))
     interval_entry.pack(side=LEFT, padx=5)
     
     def update_interval():
@@ -439,7 +367,8 @@ def create_screenshot_controls(main_frame):
             minutes = int(interval_entry.get())
             if minutes < 1:
                 raise ValueError("Interval must be at least 1 minute")
-            logger.screenshot_interval = minutes * 60
+            settings['interval'] = minutes * 60
+            configure_collector(screenshot_interval=settings['interval'])
             messagebox.showinfo("Success", f"Screenshot interval updated to {minutes} minutes")
         except ValueError as e:
             messagebox.showerror("Error", str(e))
@@ -451,12 +380,61 @@ def create_screenshot_controls(main_frame):
         command=update_interval
     ).pack(side=LEFT, padx=5)
     
+    # Screenshot encoding options
+    Label(screenshot_frame, text="Format:", font=("Helvetica", 12)).pack(side=LEFT, padx=5)
+    format_dropdown = Combobox(screenshot_frame, values=list(FORMATS) + [TILES], width=6, state="readonly")
+    format_dropdown.set("JPEG")
+    format_dropdown.pack(side=LEFT, padx=5)
+    format_dropdown.bind(
+        "<<ComboboxSelected>>",
+        lambda event: configure_collector(screenshot_format=format_dropdown.get())
+    )
+    
+    Label(screenshot_frame, text="Scale:", font=("Helvetica", 12)).pack(side=LEFT, padx=5)
+    scale_dropdown = Combobox(screenshot_frame, values=["100%", "75%", "50%", "25%"], width=5, state="readonly")
+    scale_dropdown.set("100%")
+    scale_dropdown.pack(side=LEFT, padx=5)
+    scale_dropdown.bind(
+        "<<ComboboxSelected>>",
+        lambda event: configure_collector(screenshot_scale=int(scale_dropdown.get().rstrip('%')) / 100)
+    )
+    
+    # Frames barely changed since the last saved one are skipped unless this is unticked
+    skip_duplicates = tk.BooleanVar(value=True)
+    Checkbutton(
+        screenshot_frame,
+        text="Skip unchanged",
+        variable=skip_duplicates,
+        bootstyle="info-round-toggle",
+        command=lambda: configure_collector(skip_duplicate_screenshots=skip_duplicates.get())
+    ).pack(side=LEFT, padx=5)
+    
+    # Disk quota for saved screenshots; the oldest are deleted beyond it
+    quota_sizes = {"1 GB": 1024 ** 3, "5 GB": 5 * 1024 ** 3, "20 GB": 20 * 1024 ** 3, "No limit": 0}
+    quota_ages = {"7 days": 7, "30 days": 30, "90 days": 90, "Forever": 0}
+    Label(screenshot_frame, text="Keep:", font=("Helvetica", 12)).pack(side=LEFT, padx=5)
+    size_dropdown = Combobox(screenshot_frame, values=list(quota_sizes), width=8, state="readonly")
+    size_dropdown.set("1 GB")
+    size_dropdown.pack(side=LEFT, padx=5)
+    size_dropdown.bind(
+        "<<ComboboxSelected>>",
+        lambda event: configure_collector(screenshot_max_bytes=quota_sizes[size_dropdown.get()])
+    )
+    age_dropdown = Combobox(screenshot_frame, values=list(quota_ages), width=8, state="readonly")
+    age_dropdown.set("30 days")
+    age_dropdown.pack(side=LEFT, padx=5)
+    age_dropdown.bind(
+        "<<ComboboxSelected>>",
+        lambda event: configure_collector(screenshot_max_age_days=quota_ages[age_dropdown.get()])
+    )
+    
     # Screenshot toggle
     def toggle_screenshots():
-        logger.is_screenshot_enabled = not logger.is_screenshot_enabled
+        settings['enabled'] = not settings['enabled']
+        configure_collector(is_screenshot_enabled=settings['enabled'])
         toggle_btn.config(
-            text="🔴 Disable Screenshots" if logger.is_screenshot_enabled else "📸 Enable Screenshots",
-            bootstyle="danger-outline" if logger.is_screenshot_enabled else "success-outline"
+            text="🔴 Disable Screenshots" if settings['enabled'] else "📸 Enable Screenshots",
+            bootstyle="danger-outline" if settings['enabled'] else "success-outline"
         )
     
     toggle_btn = Button(
@@ -473,6 +451,8 @@ root = style.master
 root.title("🎯 WebTracker")
 root.geometry("1200x800")
 
+run_in_background(open_store, on_store_open)
+
 # Create a modern header
 header_frame = Frame(root, bootstyle="dark")
 header_frame.pack(fill=X, padx=10, pady=5)
@@ -500,6 +480,7 @@ main_frame = Frame(active_tab, bootstyle="dark")
 main_frame.pack(fill="both", expand=True, padx=20, pady=10)
 
 create_screenshot_controls(main_frame)
+create_refresh_rate_controls(main_frame)
 
 # Project and Task section with modern dropdowns
 project_frame = Frame(main_frame, bootstyle="dark")
@@ -531,6 +512,11 @@ Label(desc_frame, text="Task Description:", font=("Helvetica", 12)).pack(anchor=
 task_description = ScrolledText(desc_frame, height=3, width=50)
 task_description.pack(fill=X, padx=5, pady=5)
 
+# ttkbootstrap's Meter still draws with Image.CUBIC, which Pillow 10 removed
+# (Pillow is already loaded by ttkbootstrap itself)
+from PIL import Image
+Image.CUBIC = Image.BICUBIC
+
 # Stats display with meters
 stats_frame = Frame(main_frame, bootstyle="dark")
 stats_frame.pack(fill=X, pady=20)
@@ -587,10 +573,6 @@ root.current_window_label = Label(
 )
 root.current_window_label.pack(side=LEFT, padx=10)
 
-# Start window tracking thread
-window_thread = threading.Thread(target=window_tracking_thread, daemon=True)
-window_thread.start()
-
 last_active_label = Label(
     status_frame,
     text="Last Active: N/A",
@@ -629,76 +611,226 @@ stop_button = Button(
 )
 stop_button.pack(side=LEFT, padx=10)
 
-# Past Activities Tab with improved history view
-history_frame = Frame(past_tab, bootstyle="dark")
-history_frame.pack(fill="both", expand=True, padx=20, pady=10)
+# The History and Analytics tabs are built the first time they are opened
+past_activities_list = None
+analytics = None
 
-Label(
-    history_frame,
-    text="Session History",
-    font=("Helvetica", 16, "bold"),
-    bootstyle="inverse-dark"
-).pack(pady=10)
-
-# Enhanced history list with details
-past_activities_frame = Frame(history_frame, bootstyle="dark")
-past_activities_frame.pack(fill="both", expand=True)
-
-past_activities_list = tk.Listbox(
-    past_activities_frame,
-    font=("Helvetica", 11),
-    bg="#2c3e50",
-    fg="white",
-    selectmode="browse",
-    height=20
-)
-past_activities_list.pack(side=LEFT, fill="both", expand=True, padx=5)
+def build_history_tab():
+    global past_activities_list, history_start_entry, history_end_entry
+    global history_project_filter, history_task_filter, history_search_entry, history_search_label
+    from history_view import HistoryView
+    
+    # Past Activities Tab with improved history view
+    history_frame = Frame(past_tab, bootstyle="dark")
+    history_frame.pack(fill="both", expand=True, padx=20, pady=10)
+    
+    Label(
+        history_frame,
+        text="Session History",
+        font=("Helvetica", 16, "bold"),
+        bootstyle="inverse-dark"
+    ).pack(pady=10)
+    
+    # Filters: date range (YYYY-MM-DD, inclusive), project and task
+    filter_frame = Frame(history_frame, bootstyle="dark")
+    filter_frame.pack(fill=X, pady=5)
+    
+    Label(filter_frame, text="From:").pack(side=LEFT, padx=5)
+    history_start_entry = Entry(filter_frame, width=12)
+    history_start_entry.insert(0, history_range_start()[:10])
+    history_start_entry.pack(side=LEFT, padx=5)
+    
+    Label(filter_frame, text="To:").pack(side=LEFT, padx=5)
+    history_end_entry = Entry(filter_frame, width=12)
+    history_end_entry.pack(side=LEFT, padx=5)
+    
+    Label(filter_frame, text="Project:").pack(side=LEFT, padx=5)
+    history_project_filter = Combobox(filter_frame, values=["All"], width=18, bootstyle="success")
+    history_project_filter.set("All")
+    history_project_filter.pack(side=LEFT, padx=5)
+    
+    Label(filter_frame, text="Task:").pack(side=LEFT, padx=5)
+    history_task_filter = Combobox(filter_frame, values=["All"], width=18, bootstyle="success")
+    history_task_filter.set("All")
+    history_task_filter.pack(side=LEFT, padx=5)
+    
+    Button(
+        filter_frame,
+        text="Apply",
+        bootstyle="info-outline",
+        command=load_past_activities
+    ).pack(side=LEFT, padx=10)
+    
+    # Search over window titles, process names, project/task and descriptions
+    search_frame = Frame(history_frame, bootstyle="dark")
+    search_frame.pack(fill=X, pady=5)
+    
+    Label(search_frame, text="Search:").pack(side=LEFT, padx=5)
+    history_search_entry = Entry(search_frame, width=40)
+    history_search_entry.pack(side=LEFT, padx=5)
+    history_search_entry.bind("<Return>", lambda event: load_past_activities())
+    Label(search_frame, text="(end a word with * to match prefixes)").pack(side=LEFT, padx=5)
+    history_search_label = Label(search_frame, text="")
+    history_search_label.pack(side=RIGHT, padx=5)
+    
+    # Only the visible rows are rendered; pages are read from the store on demand
+    past_activities_frame = Frame(history_frame, bootstyle="dark")
+    past_activities_frame.pack(fill="both", expand=True)
+    
+    past_activities_list = HistoryView(
+        past_activities_frame,
+        font=("Helvetica", 11),
+        bg="#2c3e50",
+        fg="white",
+        selectmode="browse",
+        height=20
+    )
+    load_past_activities()
 
-scrollbar = tk.Scrollbar(past_activities_frame)
-scrollbar.pack(side=RIGHT, fill=Y)
+def build_analytics_tab():
+    global analytics
+    
+    # matplotlib is only imported once the charts are needed
+    import matplotlib
+    matplotlib.use('TkAgg')
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+    from matplotlib.dates import num2date
+    from analytics import WEEKDAYS
+    from charts import AnalyticsCharts
+    from event_timeline import EventTimeline
+    
+    # Patch the _Stack issue
+    import matplotlib.cbook as cbook
+    if not hasattr(cbook, '_Stack'):
+        cbook._Stack = cbook.Stack
+    
+    # Analytics Tab
+    analytics_frame = Frame(analytics_tab, bootstyle="dark")
+    analytics_frame.pack(fill="both", expand=True, padx=20, pady=10)
+    
+    Label(
+        analytics_frame,
+        text="Activity Analytics",
+        font=("Helvetica", 16, "bold"),
+        bootstyle="inverse-dark"
+    ).pack(pady=10)
+    
+    # Create figure for analytics with dark theme
+    plt.style.use('dark_background')
+    fig = plt.figure(figsize=(10, 11))
+    fig.patch.set_facecolor('#2c3e50')
+    ax1 = fig.add_subplot(3, 1, 1)
+    ax2 = fig.add_subplot(3, 1, 2, sharex=ax1)
+    ax3 = fig.add_subplot(3, 1, 3)
+    
+    # Configure analytics plots; the toolbar zooms and pans the date axes
+    canvas = FigureCanvasTkAgg(fig, analytics_frame)
+    toolbar = NavigationToolbar2Tk(canvas, analytics_frame, pack_toolbar=False)
+    toolbar.pack(fill=X)
+    canvas.get_tk_widget().pack(fill="both", expand=True, pady=10)
+    
+    # The collector's per-day event files, read through their mmaps at the zoomed range
+    timeline = EventTimeline()
+    
+    def timeline_density(low, high, bins):
+        # Dates are plotted as local wall-clock time
+        start, end = (num2date(x).replace(tzinfo=None).timestamp() for x in (low, high))
+        return timeline.density(start, end, bins)[1]
+    
+    charts = AnalyticsCharts(fig, ax1, ax2, ax3, WEEKDAYS, density=timeline_density)
+    
+    # Layout is computed once, not on every refresh
+    fig.tight_layout()
+    
+    # Add refresh button for analytics
+    refresh_button = Button(
+        analytics_frame,
+        text="🔄 Refresh Analytics",
+        bootstyle="info-outline",
+        command=update_analytics
+    )
+    refresh_button.pack(pady=10)
+    
+    analytics = {
+        'charts': charts,
+        # Daily and hourly rollups backing the analytics plots; each refresh reads only their changes
+        'rollups': RollupFollower(store, 'day', start=history_range_start()),
+        'hourly_rollups': RollupFollower(store, 'hour', start=history_range_start()),
+    }
+    update_analytics()
 
-past_activities_list.config(yscrollcommand=scrollbar.set)
-scrollbar.config(command=past_activities_list.yview)
+def on_tab_changed(event=None):
+    if store is None:
+        # Built once open_store() is done
+        if store_error is None:
+            root.after(100, on_tab_changed)
+        return
+    selected = tabs.select()
+    if selected == str(past_tab) and past_activities_list is None:
+        build_history_tab()
+    elif selected == str(analytics_tab) and analytics is None:
+        build_analytics_tab()
 
-# Analytics Tab
-analytics_frame = Frame(analytics_tab, bootstyle="dark")
-analytics_frame.pack(fill="both", expand=True, padx=20, pady=10)
+tabs.bind("<<NotebookTabChanged>>", on_tab_changed)
 
-Label(
-    analytics_frame,
-    text="Activity Analytics",
-    font=("Helvetica", 16, "bold"),
-    bootstyle="inverse-dark"
-).pack(pady=10)
-
-# Create figure for analytics with dark theme
-plt.style.use('dark_background')
-fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8))
-fig.patch.set_facecolor('#2c3e50')
-
-# Configure analytics plots
-canvas = FigureCanvasTkAgg(fig, analytics_frame)
-canvas.draw()
-canvas.get_tk_widget().pack(fill="both", expand=True, pady=10)
-
-# Add refresh button for analytics
-refresh_button = Button(
-    analytics_frame,
-    text="🔄 Refresh Analytics",
-    bootstyle="info-outline",
-    command=lambda: load_past_activities()
-)
-refresh_button.pack(pady=10)
+# Hidden diagnostics tab, toggled with Ctrl+Shift+D; metrics are only collected while it is open
+diagnostics_tab = None
+diagnostics_text = None
+
+def toggle_diagnostics(event=None):
+    global diagnostics_tab, diagnostics_text
+    try:
+        if diagnostics_tab is None:
+            metrics.enable()
+            diagnostics_tab = Frame(tabs, bootstyle="dark")
+            diagnostics_text = ScrolledText(diagnostics_tab, wrap=tk.NONE, font=("Courier", 10))
+            diagnostics_text.pack(fill="both", expand=True, padx=10, pady=10)
+            tabs.add(diagnostics_tab, text=" 🛠 Diagnostics ")
+            tabs.select(diagnostics_tab)
+            refresh_diagnostics()
+        else:
+            tabs.forget(diagnostics_tab)
+            diagnostics_tab.destroy()
+            diagnostics_tab = None
+            metrics.enable(False)
+            if client is not None:
+                client.diagnostics(enable=False)
+    except Exception as e:
+        print(f"Error toggling diagnostics: {e}")
+
+def refresh_diagnostics():
+    if diagnostics_tab is None:
+        return
+    try:
+        report = {'collector': client.diagnostics(enable=True) if client is not None else {}}
+        if isinstance(client, CollectorClient):
+            # The collector runs in the daemon; UI timings are measured here
+            report['ui'] = metrics.snapshot()
+        text = json.dumps(report, indent=2)
+    except Exception as e:
+        text = f"Error reading diagnostics: {e}"
+    position = diagnostics_text.yview()[0]
+    diagnostics_text.delete('1.0', tk.END)
+    diagnostics_text.insert(tk.END, text)
+    diagnostics_text.yview_moveto(position)
+    root.after(1000, refresh_diagnostics)
+
+root.bind_all("<Control-Shift-D>", toggle_diagnostics)
 
 # Initialize buttons state
 stop_button.config(state='disabled')
 
-# Load past activities
-load_past_activities()
+# Start the UI refresh loop
+refresh_ui()
 
-# Start idle time monitoring thread
-idle_thread = threading.Thread(target=calculate_idle_time, daemon=True)
-idle_thread.start()
+if STARTUP_PROBE:
+    def report_first_frame():
+        print(f"first_frame {time.time() - float(STARTUP_PROBE):.4f}", flush=True)
+        root.destroy()
+    
+    # The first idle callback after the window is mapped runs once it has been drawn
+    root.bind("<Map>", lambda event: root.after_idle(report_first_frame) if event.widget is root else None)
 
 # Run the application
 root.mainloop()
@@ -0,0 +1,413 @@
+import os
+import sys
+import select
+import threading
+import time
+from diagnostics import metrics
+from process_cache import ProcessCache, WindowHandleCache
+from window_usage import WindowUsage
+
+
+class WindowEventSource:
+    """
+    Reports foreground window changes as they happen
+    Backends call _emit() with a window info dict:
+    {'title': ..., 'process': ..., 'timestamp': <epoch seconds>}
+    and emit the current window once when started.
+    """
+
+    def __init__(self):
+        self.callback = None
+        self.current = None
+        self.is_running = False
+        self.processes = ProcessCache()
+        self.windows = WindowHandleCache()
+
+    def start(self, callback):
+        self.callback = callback
+        self.is_running = True
+
+    def stop(self):
+        self.is_running = False
+
+    def get_active_window(self):
+        """Return the last reported window info, or None"""
+        return self.current
+
+    def cache_stats(self):
+        """Hit/miss counters of the process and window handle caches"""
+        return {'processes': self.processes.stats(), 'windows': self.windows.stats()}
+
+    def _emit(self, title, process, timestamp=None):
+        info = {
+            'title': title,
+            'process': process,
+            'timestamp': timestamp if timestamp is not None else time.time()
+        }
+        self.current = info
+        if self.is_running and self.callback:
+            enabled = metrics.enabled
+            if enabled:
+                t0 = time.perf_counter()
+            self.callback(info)
+            if enabled:
+                metrics.record('window.change', time.perf_counter() - t0)
+
+
+class Win32WindowEventSource(WindowEventSource):
+    """Foreground and title changes from SetWinEventHook (Windows)"""
+
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    EVENT_OBJECT_NAMECHANGE = 0x800C
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    OBJID_WINDOW = 0
+    WM_QUIT = 0x0012
+
+    def __init__(self):
+        super().__init__()
+        import ctypes
+        from ctypes import wintypes
+        import win32gui
+        import win32process
+
+        self.ctypes = ctypes
+        self.wintypes = wintypes
+        self.win32gui = win32gui
+        self.win32process = win32process
+        self.user32 = ctypes.windll.user32
+        self.kernel32 = ctypes.windll.kernel32
+        self.WinEventProc = ctypes.WINFUNCTYPE(
+            None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+            wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD
+        )
+        self.user32.SetWinEventHook.restype = wintypes.HANDLE
+        self.user32.SetWinEventHook.argtypes = [
+            wintypes.DWORD, wintypes.DWORD, wintypes.HMODULE, self.WinEventProc,
+            wintypes.DWORD, wintypes.DWORD, wintypes.DWORD
+        ]
+        self.thread = None
+        self.thread_id = None
+        self.ready = threading.Event()
+
+    def _lookup_window(self, hwnd):
+        title = self.win32gui.GetWindowText(hwnd)
+        _, pid = self.win32process.GetWindowThreadProcessId(hwnd)
+        return pid, title
+
+    def window_info(self, hwnd):
+        """Return (title, process name) of a window handle"""
+        enabled = metrics.enabled
+        if enabled:
+            t0 = time.perf_counter()
+        pid, title = self.windows.get(hwnd, self._lookup_window)
+        info = title, self.processes.name(pid)
+        if enabled:
+            metrics.record('window.lookup', time.perf_counter() - t0)
+        return info
+
+    def start(self, callback):
+        super().start(callback)
+        self.ready.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self.ready.wait()
+
+    def stop(self):
+        super().stop()
+        if self.thread_id is not None:
+            self.user32.PostThreadMessageW(self.thread_id, self.WM_QUIT, 0, 0)
+            self.thread.join(timeout=2)
+            self.thread_id = None
+
+    def _on_event(self, hook, event, hwnd, id_object, id_child, thread, event_time):
+        try:
+            if event == self.EVENT_OBJECT_NAMECHANGE and (
+                id_object != self.OBJID_WINDOW or hwnd != self.user32.GetForegroundWindow()
+            ):
+                return
+            if event == self.EVENT_OBJECT_NAMECHANGE:
+                self.windows.invalidate()
+            self._emit(*self.window_info(hwnd))
+        except Exception as e:
+            print(f"Error handling window event: {e}")
+
+    def _run(self):
+        # Hooks deliver their events to the thread that registered them,
+        # so registration and the message loop share this thread
+        self.thread_id = self.kernel32.GetCurrentThreadId()
+        callback = self.WinEventProc(self._on_event)
+        hooks = [
+            self.user32.SetWinEventHook(
+                event, event, 0, callback, 0, 0, self.WINEVENT_OUTOFCONTEXT
+            )
+            for event in (self.EVENT_SYSTEM_FOREGROUND, self.EVENT_OBJECT_NAMECHANGE)
+        ]
+        self.ready.set()
+
+        try:
+            self._emit(*self.window_info(self.user32.GetForegroundWindow()))
+        except Exception as e:
+            print(f"Error getting window info: {e}")
+
+        msg = self.wintypes.MSG()
+        while self.user32.GetMessageW(self.ctypes.byref(msg), 0, 0, 0) > 0:
+            self.user32.TranslateMessage(self.ctypes.byref(msg))
+            self.user32.DispatchMessageW(self.ctypes.byref(msg))
+
+        for hook in hooks:
+            self.user32.UnhookWinEvent(hook)
+
+
+class X11WindowEventSource(WindowEventSource):
+    """Foreground and title changes from _NET_ACTIVE_WINDOW property events (Linux/X11)"""
+
+    def __init__(self):
+        super().__init__()
+        from Xlib import X, display, error
+
+        self.X = X
+        self.XError = error.XError
+        self.display = display.Display()
+        self.root = self.display.screen().root
+        self.NET_ACTIVE_WINDOW = self.display.intern_atom('_NET_ACTIVE_WINDOW')
+        self.NET_WM_NAME = self.display.intern_atom('_NET_WM_NAME')
+        self.NET_WM_PID = self.display.intern_atom('_NET_WM_PID')
+        self.WM_NAME = self.display.intern_atom('WM_NAME')
+        self.UTF8_STRING = self.display.intern_atom('UTF8_STRING')
+        self.active_window = None
+        self.thread = None
+        self.wakeup_read, self.wakeup_write = os.pipe()
+
+    def start(self, callback):
+        super().start(callback)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        super().stop()
+        if self.thread is not None:
+            os.write(self.wakeup_write, b'x')
+            self.thread.join(timeout=2)
+            self.thread = None
+
+    def _get_property(self, window, atom, property_type):
+        prop = window.get_full_property(atom, property_type)
+        return prop.value if prop else None
+
+    def _lookup_window(self, window):
+        title = self._get_property(window, self.NET_WM_NAME, self.UTF8_STRING)
+        if title is None:
+            title = self._get_property(window, self.WM_NAME, self.X.AnyPropertyType)
+        if isinstance(title, bytes):
+            title = title.decode('utf-8', 'replace')
+
+        pid = self._get_property(window, self.NET_WM_PID, self.X.AnyPropertyType)
+        return (int(pid[0]) if pid else None), title or ""
+
+    def _window_info(self, window):
+        enabled = metrics.enabled
+        if enabled:
+            t0 = time.perf_counter()
+        pid, title = self.windows.get(window.id, lambda _: self._lookup_window(window))
+        info = title, (self.processes.name(pid) if pid else "unknown")
+        if enabled:
+            metrics.record('window.lookup', time.perf_counter() - t0)
+        return info
+
+    def _update_active_window(self):
+        """Follow the window named by _NET_ACTIVE_WINDOW and report it"""
+        value = self._get_property(self.root, self.NET_ACTIVE_WINDOW, self.X.AnyPropertyType)
+        if not value or not value[0]:
+            return
+        window = self.display.create_resource_object('window', value[0])
+        if self.active_window is not None and self.active_window.id == window.id:
+            return
+
+        # Title changes arrive as property events on the active window itself
+        window.change_attributes(event_mask=self.X.PropertyChangeMask)
+        self.active_window = window
+        self._emit(*self._window_info(window))
+
+    def _run(self):
+        self.root.change_attributes(event_mask=self.X.PropertyChangeMask)
+        try:
+            self._update_active_window()
+        except self.XError as e:
+            print(f"Error getting window info: {e}")
+
+        while self.is_running:
+            self.display.flush()
+            readable, _, _ = select.select([self.display, self.wakeup_read], [], [])
+            if self.wakeup_read in readable:
+                os.read(self.wakeup_read, 1)
+                break
+
+            while self.display.pending_events():
+                event = self.display.next_event()
+                if event.type != self.X.PropertyNotify:
+                    continue
+                try:
+                    if event.atom == self.NET_ACTIVE_WINDOW:
+                        self._update_active_window()
+                    elif (event.atom in (self.NET_WM_NAME, self.WM_NAME)
+                          and self.active_window is not None
+                          and event.window.id == self.active_window.id):
+                        self.windows.invalidate()
+                        self._emit(*self._window_info(self.active_window))
+                except self.XError as e:
+                    print(f"Error handling window event: {e}")
+
+
+class FakeWindowEventSource(WindowEventSource):
+    """In-process backend driven by switch_to(); for headless runs and benchmarks"""
+
+    def __init__(self, title="", process="idle"):
+        super().__init__()
+        self.initial = (title, process)
+
+    def start(self, callback):
+        super().start(callback)
+        if self.current is None:
+            self._emit(*self.initial)
+        else:
+            callback(self.current)
+
+    def switch_to(self, process, title, timestamp=None):
+        """Pretend the given window came to the foreground"""
+        self._emit(title, process, timestamp)
+
+
+BACKENDS = {
+    'win32': Win32WindowEventSource,
+    'x11': X11WindowEventSource,
+    'fake': FakeWindowEventSource,
+}
+
+
+def create_window_event_source(backend=None):
+    """
+    Create the window event backend for this platform
+    backend: 'win32', 'x11' or 'fake' (default: $WEBTRACKER_WINDOW_BACKEND or auto-detect)
+    """
+    backend = backend or os.environ.get('WEBTRACKER_WINDOW_BACKEND')
+    if backend is None:
+        if sys.platform == 'win32':
+            backend = 'win32'
+        elif os.environ.get('DISPLAY'):
+            backend = 'x11'
+        else:
+            backend = 'fake'
+    return BACKENDS[backend]()
+
+
+class FocusTracker:
+    """Records exact foreground window intervals from a WindowEventSource"""
+
+    def __init__(self, source, on_change=None):
+        """
+        source: WindowEventSource delivering focus changes
+        on_change: optional callback(key, window_info) run after each change
+        """
+        self.source = source
+        self.on_change = on_change
+        self.lock = threading.Lock()
+        self.usage = WindowUsage()
+        self.current = None
+        self.since = None
+        self.is_tracking = False
+
+    @property
+    def current_window(self):
+        """The foreground window as "process - title", or None"""
+        return f"{self.current[0]} - {self.current[1]}" if self.current else None
+
+    def start(self):
+        """Start listening for focus changes (time is only counted while tracking)"""
+        self.source.start(self._handle_change)
+
+    def stop(self):
+        self.pause()
+        self.source.stop()
+
+    def resume(self, timestamp=None):
+        """Start counting time for the foreground window"""
+        with self.lock:
+            self.is_tracking = True
+            self.since = timestamp if timestamp is not None else time.time()
+
+    def pause(self, timestamp=None):
+        """Stop counting time, closing the current window's interval"""
+        with self.lock:
+            if self.is_tracking:
+                self._close_interval(timestamp if timestamp is not None else time.time())
+            self.is_tracking = False
+
+    def clear(self):
+        with self.lock:
+            self.usage.clear()
+            if self.is_tracking:
+                self.since = time.time()
+
+    def drain(self, timestamp=None):
+        """
+        Close the current window's interval at timestamp (it keeps counting from there)
+        and return the (start, end, process, title) intervals so far, clearing them
+        """
+        with self.lock:
+            if self.is_tracking:
+                self._close_interval(timestamp if timestamp is not None else time.time())
+            intervals = list(self.usage.intervals())
+            self.usage.clear()
+        return intervals
+
+    def snapshot(self, timestamp=None, first=0):
+        """
+        Return (totals, intervals, next_first) of the time counted so far, as if the
+        current window's interval closed at timestamp (it keeps counting)
+        intervals: (start, end, process, title) from index first on, ending with the open one
+        next_first: first to pass next time for only the intervals added meanwhile
+        (the last closed interval is repeated, as it may still be extended)
+        """
+        with self.lock:
+            usage = self.usage
+            totals = usage.totals()
+            intervals = [
+                (usage.starts[i], usage.ends[i], usage.apps[usage.app_ids[i]], usage.titles[usage.title_ids[i]])
+                for i in range(min(first, len(usage)), len(usage))
+            ]
+            if self.is_tracking and self.current is not None and self.since is not None:
+                timestamp = max(timestamp if timestamp is not None else time.time(), self.since)
+                if timestamp > self.since:
+                    window = f"{self.current[0]} - {self.current[1]}"
+                    totals[window] = totals.get(window, 0.0) + timestamp - self.since
+                    start = self.since
+                    last = len(usage) - 1
+                    if (last >= 0 and usage.ends[last] == start
+                            and (usage.apps[usage.app_ids[last]], usage.titles[usage.title_ids[last]]) == self.current):
+                        # Closing it will extend the last interval rather than add one
+                        start = usage.starts[last]
+                        if intervals and intervals[-1][0] == start:
+                            intervals.pop()
+                    intervals.append((start, timestamp, *self.current))
+            next_first = max(len(usage) - 1, 0)
+        return totals, intervals, next_first
+
+    def _close_interval(self, timestamp):
+        if self.current is not None and self.since is not None:
+            timestamp = max(timestamp, self.since)
+            self.usage.add(self.since, timestamp, *self.current)
+        self.since = timestamp
+
+    def _handle_change(self, info):
+        window = (info['process'], info['title'])
+        with self.lock:
+            if window == self.current:
+                return
+            if self.is_tracking:
+                self._close_interval(info['timestamp'])
+            else:
+                self.since = info['timestamp']
+            self.current = window
+
+        if self.on_change:
+            self.on_change(self.current_window, info)
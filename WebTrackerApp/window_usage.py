@@ -0,0 +1,115 @@
+import bisect
+import sys
+from array import array
+
+
+class StringTable:
+    """Interns strings to small integer ids so each distinct value is stored once"""
+
+    __slots__ = ('ids', 'values')
+
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def id_for(self, value):
+        index = self.ids.get(value)
+        if index is None:
+            index = len(self.values)
+            value = sys.intern(value)
+            self.values.append(value)
+            self.ids[value] = index
+        return index
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class WindowUsage:
+    """Foreground window history as (start, end, app_id, title_id) intervals in parallel arrays"""
+
+    __slots__ = ('apps', 'titles', 'starts', 'ends', 'app_ids', 'title_ids', 'seconds')
+
+    def __init__(self):
+        self.apps = StringTable()
+        self.titles = StringTable()
+        self.starts = array('d')
+        self.ends = array('d')
+        self.app_ids = array('I')
+        self.title_ids = array('I')
+        # Running seconds per (app_id, title_id), so whole-history totals need no scan
+        self.seconds = {}
+
+    def __len__(self):
+        return len(self.starts)
+
+    def clear(self):
+        # Interned names are kept; only the intervals are dropped
+        del self.starts[:]
+        del self.ends[:]
+        del self.app_ids[:]
+        del self.title_ids[:]
+        self.seconds.clear()
+
+    def add(self, start, end, process, title):
+        """
+        Record that a window was in front from start to end (epoch seconds)
+        Intervals must be added in chronological order
+        """
+        if end <= start:
+            return
+        app_id = self.apps.id_for(process)
+        title_id = self.titles.id_for(title)
+        key = (app_id, title_id)
+        self.seconds[key] = self.seconds.get(key, 0.0) + end - start
+
+        # Extend the previous interval when the same window simply continues
+        last = len(self.starts) - 1
+        if (last >= 0 and self.ends[last] == start
+                and self.app_ids[last] == app_id and self.title_ids[last] == title_id):
+            self.ends[last] = end
+            return
+
+        self.starts.append(start)
+        self.ends.append(end)
+        self.app_ids.append(app_id)
+        self.title_ids.append(title_id)
+
+    def _indexes(self, start=None, end=None):
+        """Indexes of the intervals overlapping [start, end)"""
+        first = 0 if start is None else bisect.bisect_right(self.ends, start)
+        last = len(self.starts) if end is None else bisect.bisect_left(self.starts, end)
+        return range(first, last)
+
+    def intervals(self, start=None, end=None):
+        """Yield (start, end, process, title) overlapping [start, end), clipped to the range"""
+        for i in self._indexes(start, end):
+            yield (
+                self.starts[i] if start is None else max(self.starts[i], start),
+                self.ends[i] if end is None else min(self.ends[i], end),
+                self.apps[self.app_ids[i]],
+                self.titles[self.title_ids[i]],
+            )
+
+    def totals(self, start=None, end=None):
+        """Return seconds in front per "process - title" window, optionally within [start, end)"""
+        if start is None and end is None:
+            seconds = self.seconds
+        else:
+            seconds = {}
+            for i in self._indexes(start, end):
+                key = (self.app_ids[i], self.title_ids[i])
+                interval_start = self.starts[i] if start is None else max(self.starts[i], start)
+                interval_end = self.ends[i] if end is None else min(self.ends[i], end)
+                seconds[key] = seconds.get(key, 0.0) + interval_end - interval_start
+
+        return {
+            f"{self.apps[app_id]} - {self.titles[title_id]}": total
+            for (app_id, title_id), total in seconds.items()
+        }
+
+    def total_seconds(self, start=None, end=None):
+        return sum(self.totals(start, end).values())
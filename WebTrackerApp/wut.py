@@ -1,52 +1,83 @@
-import win32gui
-import win32process
-import psutil
 import time
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
-from collections import defaultdict
+from file_lock import FileLock
+from window_events import FocusTracker, create_window_event_source
 
 class WindowTracker:
-    def __init__(self, interval=5):
+    def __init__(self, interval=5, backend=None, flush_interval=60, folder="."):
         """
         Initialize the window tracker
-        interval: Time in seconds between checks (default 5 seconds)
+        interval: Time in seconds between progress dots (default 5 seconds)
+        backend: Window event backend ('win32', 'x11' or 'fake', default auto-detect)
+        flush_interval: Seconds between saves; a hard kill loses at most this much
+        folder: Directory of the window_usage_YYYYMMDD.json day files
         """
         self.interval = interval
-        self.usage_data = defaultdict(int)
-        self.current_window = None
+        self.flush_interval = flush_interval
+        self.folder = folder
+        self.focus = FocusTracker(create_window_event_source(backend), on_change=self.on_window_change)
         self.start_time = None
+        # Seconds per window over this run, for the summary (the tracker only keeps unsaved intervals)
+        self.run_totals = {}
+        # {day: {window: seconds}} not yet merged into a day file (kept when a save fails)
+        self.pending = {}
         
-    def get_active_window_info(self):
-        """Get the active window title and process name"""
-        try:
-            window = win32gui.GetForegroundWindow()
-            title = win32gui.GetWindowText(window)
-            
-            # Get process name
-            _, pid = win32process.GetWindowThreadProcessId(window)
-            process = psutil.Process(pid)
-            process_name = process.name()
-            
-            return {
-                'title': title,
-                'process': process_name,
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-        except Exception as e:
-            print(f"Error getting window info: {e}")
-            return None
+    def on_window_change(self, key, window_info):
+        """Print the window that just came to the foreground"""
+        print(f"\nCurrently tracking: {key}")
             
+    def day_file(self, day):
+        return os.path.join(self.folder, f"window_usage_{day.strftime('%Y%m%d')}.json")
+
     def save_data(self):
-        """Save usage data to a JSON file"""
-        filename = f"window_usage_{datetime.now().strftime('%Y%m%d')}.json"
-        
-        # Convert defaultdict to regular dict for JSON serialization
-        data_to_save = dict(self.usage_data)
+        """
+        Add the time recorded since the last save to the day files
+        Intervals are split at local midnight, so each day's file only gets that day's time.
+        """
+        for start, end, process, title in self.focus.drain():
+            window = f"{process} - {title}"
+            while start < end:
+                day = datetime.fromtimestamp(start).date()
+                next_midnight = datetime.combine(day + timedelta(days=1), datetime.min.time()).timestamp()
+                part_end = min(end, next_midnight)
+                day_delta = self.pending.setdefault(day, {})
+                day_delta[window] = day_delta.get(window, 0.0) + part_end - start
+                start = part_end
         
-        with open(filename, 'w') as f:
-            json.dump(data_to_save, f, indent=4)
+        for day, delta in list(self.pending.items()):
+            try:
+                self.merge_day(day, delta)
+            except Exception as e:
+                print(f"Error saving window usage for {day}: {e}")
+                continue
+            del self.pending[day]
+            for window, seconds in delta.items():
+                self.run_totals[window] = self.run_totals.get(window, 0.0) + seconds
+
+    def merge_day(self, day, delta):
+        """
+        Add seconds per window to a day file, replacing it atomically (temp file and rename)
+        The read-merge-write holds the day's lock file, so trackers running at the
+        same time never overwrite each other's totals.
+        """
+        filename = self.day_file(day)
+        with FileLock(filename + ".lock"):
+            data = {}
+            if os.path.exists(filename):
+                with open(filename, 'r') as f:
+                    data = json.load(f)
+            
+            for window, seconds in delta.items():
+                data[window] = round(data.get(window, 0) + seconds, 3)
+            
+            temp_filename = filename + ".tmp"
+            with open(temp_filename, 'w') as f:
+                json.dump(data, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_filename, filename)
             
     def track_windows(self, duration_minutes=None):
         """
@@ -54,32 +85,33 @@ class WindowTracker:
         duration_minutes: Optional duration to track (in minutes)
         """
         print("Starting window tracking...")
-        end_time = time.time() + (duration_minutes * 60) if duration_minutes else None
+        self.start_time = time.time()
+        end_time = self.start_time + (duration_minutes * 60) if duration_minutes else None
         
+        # Focus changes are recorded by the event source as they happen;
+        # this loop only waits and shows that tracking is active
+        self.focus.resume(self.start_time)
+        self.focus.start()
+        next_flush = self.start_time + self.flush_interval
         try:
             while True:
                 if end_time and time.time() > end_time:
                     break
                     
-                window_info = self.get_active_window_info()
+                # Print a dot to show tracking is active
+                print(".", end="", flush=True)
                 
-                if window_info:
-                    key = f"{window_info['process']} - {window_info['title']}"
-                    self.usage_data[key] += self.interval
-                    
-                    # Print current window if it changed
-                    if key != self.current_window:
-                        self.current_window = key
-                        print(f"\nCurrently tracking: {key}")
-                        
-                    # Print a dot to show tracking is active
-                    print(".", end="", flush=True)
-                    
-                time.sleep(self.interval)
+                time.sleep(max(0, min(self.interval, end_time - time.time())) if end_time else self.interval)
+                
+                # Save what was recorded so far, merged into the existing day files
+                if time.time() >= next_flush:
+                    self.save_data()
+                    next_flush = time.time() + self.flush_interval
                 
         except KeyboardInterrupt:
             print("\nTracking stopped by user")
         finally:
+            self.focus.stop()
             self.save_data()
             self.display_summary()
             
@@ -88,13 +120,18 @@ class WindowTracker:
         print("\n\n=== Window Usage Summary ===")
         
         # Sort by usage time (descending)
-        sorted_usage = sorted(self.usage_data.items(), key=lambda x: x[1], reverse=True)
+        sorted_usage = sorted(self.run_totals.items(), key=lambda x: x[1], reverse=True)
         
         for window, seconds in sorted_usage:
             minutes = seconds / 60
             print(f"\n{window}")
             print(f"Time spent: {minutes:.2f} minutes")
+            
+        # Show how many lookups the window/process caches saved
+        stats = self.focus.source.cache_stats()
+        print(f"\nProcess cache: {stats['processes']['hits']} hits, {stats['processes']['misses']} misses")
+        print(f"Window cache: {stats['windows']['hits']} hits, {stats['windows']['misses']} misses")
 
 if __name__ == "__main__":
-    tracker = WindowTracker(interval=5)  # Check every 5 seconds
+    tracker = WindowTracker(interval=5)  # Progress dot every 5 seconds
     tracker.track_windows()
\ No newline at end of file